@@ -0,0 +1,64 @@
+"""
+Microbenchmark of the per-call Python overhead of repository reads, without a database.
+
+Compares building a fresh `select()` on every call (what repositories did before the statement registry)
+with taking the prebuilt statement from the registry and binding parameters. Both sides then generate
+the statement's cache key, which SQLAlchemy does on every execution to look up the compiled SQL.
+
+Run from the project root:
+    python -m benchmarks.repository_statements
+"""
+import timeit
+
+from sqlalchemy import select
+
+import src.db  # noqa: F401 Imports the models in the right order
+from src.repositories.cars import CarsRepository
+from src.repositories.orders import OrdersRepository
+from src.utils.enums import EngineType, OrderStatus
+
+NUMBER = 20000
+
+# (name, repository, filter_by, limit) - the query shapes services use the most
+CASES = [
+    ("cars by id", CarsRepository, {"id": 1}, None),
+    ("cars by vin_number", CarsRepository, {"vin_number": "1HGCM82633A004352"}, None),
+    ("cars by engine, page", CarsRepository, {"engine": EngineType.electric}, 51),
+    ("orders by status, page", OrdersRepository, {"status": OrderStatus.pending}, 51),
+]
+
+
+def build_ad_hoc(repository, filter_by, limit):
+    """
+    Builds the statement from scratch, as every call did before the registry.
+    """
+    columns = repository.model.__table__.c
+    statement = select(*(columns[field] for field in repository.schema.model_fields)).filter_by(**filter_by)
+    if limit is not None:
+        statement = statement.order_by(repository.model.id).limit(limit)
+    statement._generate_cache_key()
+
+
+def build_from_registry(repository, filter_by, limit):
+    """
+    Takes the prebuilt statement and binds the parameters, as repositories do now.
+    """
+    order_by = "id" if limit is not None else None
+    statement = repository._read_statement(tuple(sorted(filter_by)), None, order_by, limit is not None)
+    repository._read_params(filter_by, limit)
+    statement._generate_cache_key()
+
+
+def main():
+    print(f"{'query':<26}{'ad hoc, us':>12}{'registry, us':>14}{'speedup':>10}")
+    for name, repository_class, filter_by, limit in CASES:
+        repository = repository_class(session=None)
+        ad_hoc = timeit.timeit(lambda: build_ad_hoc(repository, filter_by, limit), number=NUMBER)
+        registry = timeit.timeit(lambda: build_from_registry(repository, filter_by, limit), number=NUMBER)
+        print(
+            f"{name:<26}{ad_hoc / NUMBER * 1e6:>12.1f}{registry / NUMBER * 1e6:>14.1f}{ad_hoc / registry:>9.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
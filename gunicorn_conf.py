@@ -0,0 +1,60 @@
+# Production server: gunicorn -c gunicorn_conf.py main:app
+# Gunicorn manages the worker processes, each one serves the app with uvicorn on uvloop and httptools.
+# Development server with auto-reload: python main.py
+import os
+import tempfile
+
+from uvicorn_worker import UvicornWorker
+
+from src.db.db import apply_migrations
+from src.utils.cache import entity_cache
+from src.utils.cache_backends import NullBackend
+from src.utils.config import SERVER_WORKERS, SERVER_BIND, SERVER_KEEPALIVE, SERVER_BACKLOG, METRICS_DIR
+from src.utils.metrics import metrics_files
+
+
+class ProductionWorker(UvicornWorker):
+    # Fails at start if uvloop or httptools are missing, instead of silently falling back to asyncio and h11
+    CONFIG_KWARGS = {"loop": "uvloop", "http": "httptools", "lifespan": "on"}
+
+
+def cpu_count() -> int:
+    # CPUs the process may run on (e.g. a container's cpuset), not all CPUs of the host
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+bind = SERVER_BIND
+workers = SERVER_WORKERS or cpu_count()  # One event loop per CPU, async workers don't need more
+worker_class = "gunicorn_conf.ProductionWorker"
+backlog = SERVER_BACKLOG
+keepalive = SERVER_KEEPALIVE
+# Imports the app once in the master before forking, so workers start without importing it again.
+# Connections are opened by each worker after the fork (engines and cache backends connect lazily),
+# and the lifespan (stats refresher, metrics snapshots, closing connections) runs in each worker.
+preload_app = True
+reload = False
+timeout = 30  # Seconds a worker may stay unresponsive, starting up included, before the master restarts it
+graceful_timeout = 30  # Seconds to finish in-flight requests on shutdown or restart
+
+
+def on_starting(server):
+    # Runs in the master before forking: migrations are applied once, without holding up the workers' start-up
+    # (concurrent index builds would outlast the worker timeout)
+    apply_migrations()
+    if server.num_workers <= 1:
+        return
+    if entity_cache.backend.name == "memory":
+        # A write only invalidates the cache of the worker that served it, the others would keep serving
+        # the old records, pages and ETags until they expire: cache in Redis (CACHE_BACKEND=redis) to share it
+        server.log.warning(f"Memory cache turned off, it isn't shared by the {server.num_workers} workers")
+        entity_cache.backend = NullBackend()
+    # Each worker counts its own requests, /metrics merges the snapshots they write to the directory
+    metrics_files.share(METRICS_DIR or tempfile.mkdtemp(prefix="car-marketplace-metrics-"))
+
+
+def child_exit(server, worker):
+    # Runs in the master: keeps the counters of the exited worker in the merged metrics, drops its gauges
+    if metrics_files.enabled:
+        metrics_files.mark_dead(worker.pid)
@@ -1,28 +1,52 @@
 import asyncio
 import uvicorn
 import logging
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 
-from src.db.db import init_db
+from src.db.db import apply_migrations, async_session_maker, engine, pool_metrics, replica_engines
 from src.api.routers import all_routers
+from src.api.middlewares.compression import CompressionMiddleware
+from src.api.middlewares.metrics import MetricsMiddleware
+from src.api.middlewares.read_your_writes import ReadYourWritesMiddleware
+from src.utils.cache import entity_cache
+from src.utils.metrics import http_metrics, metrics_files
+from src.utils.stats_refresher import StatsRefresher
 
 logging.basicConfig(level=logging.ERROR, format="%(asctime)s - %(levelname)s - %(message)s")
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs in each worker, for its own resources only: migrations are applied once before the workers start
+    # Refreshes the /stats materialized views in the background while the app runs
+    stats_refresher_task = asyncio.create_task(StatsRefresher(async_session_maker).run())
+    # Shares the metrics of this worker with the others, if there are several (see gunicorn_conf.py)
+    metrics_task = asyncio.create_task(metrics_files.run(http_metrics, pool_metrics)) if metrics_files.enabled else None
+    yield
+    stats_refresher_task.cancel()
+    if metrics_task is not None:
+        metrics_task.cancel()
+        metrics_files.write(http_metrics, pool_metrics)  # Final figures, merged by the master once the worker exits
+    await entity_cache.backend.close()  # Connections to Redis, if it stores the cache
+    for db_engine in (engine, *replica_engines):
+        await db_engine.dispose()
+
+
 app = FastAPI(
-    title="Car Marketplace API"
+    title="Car Marketplace API",
+    lifespan=lifespan
 )
 
+app.add_middleware(ReadYourWritesMiddleware)  # Pins clients that just wrote to the primary, see src/db/db.py
+app.add_middleware(CompressionMiddleware)  # Compresses JSON/NDJSON bodies from COMPRESSION_MIN_SIZE bytes
+app.add_middleware(MetricsMiddleware)  # Latency, status and size per route for /metrics, outermost to see it all
+
 for router in all_routers:  # Include routers into FastAPI app from src/api/routes (all of them in src/api/routers.py)
     app.include_router(router)
 
 
-async def main():
-    logging.info("Starting init_db()")
-    await init_db()
-
+# Development server with auto-reload, production uses gunicorn_conf.py (see Dockerfile)
+if __name__ == "__main__":
+    apply_migrations()
     logging.info("Starting FastAPI app")
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
-
-
-if __name__ == "__main__":
-    asyncio.run(main())
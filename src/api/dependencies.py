@@ -1,8 +1,12 @@
-from fastapi import Depends
+from typing import Annotated, Callable, List, Optional, Tuple, Type
 
+from fastapi import Depends, Header, Query, Request
+
+from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from src.db.db import get_async_session
+from src.api.middlewares.read_your_writes import SAFE_METHODS, wrote_recently
+from src.db.db import get_async_session, next_replica_session_maker, pool_metrics
 
 from src.repositories.users import UsersRepository
 from src.services.users import UsersService
@@ -11,21 +15,210 @@ from src.repositories.cars import CarsRepository
 from src.services.cars import CarsService
 
 from src.repositories.orders import OrdersRepository
+from src.repositories.sales_rollups import SalesRollupsRepository
 from src.services.orders import OrdersService
 
+from src.repositories.stats import StatsRepository
+from src.services.stats import StatsService
+
+from src.schemas.cars import CarSchema, CarSearchSchema
+from src.schemas.orders import OrderSchema
+from src.schemas.users import UserSchema
+from src.utils.cache import entity_cache, mark_pinned, mark_replica
+from src.utils.enums import CarSortField, EngineType, TransmissionType
+from src.utils.exception_handler import handle_exception
+from src.utils.pagination import CountMode, PageParams, decode_cursor, DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
+from src.utils.streaming import NDJSON_MEDIA_TYPE
+from src.utils.unit_of_work import UnitOfWork
+
+
+async def get_session(request: Request, primary_session: AsyncSession = Depends(get_async_session)):
+    """
+    Yields the session for the request: a read replica for read-only requests, or the primary session
+    for writes, for reads of clients that wrote recently, and when no replicas are configured.
+    Sessions of clients that wrote recently and replica sessions are marked for the entity cache (src/utils/cache.py).
+    """
+    pinned = wrote_recently(request)
+    replica_session_maker = None
+    if request.method in SAFE_METHODS and not pinned:
+        replica_session_maker = next_replica_session_maker()
+
+    if replica_session_maker is None:
+        if pinned:
+            mark_pinned(primary_session)
+        yield primary_session  # Sessions connect lazily, so an unused primary session costs no connection
+        return
+
+    async with replica_session_maker() as replica_session:
+        mark_replica(replica_session)
+        yield replica_session
+
+
+def unit_of_work(session: AsyncSession = Depends(get_session)) -> UnitOfWork:
+    # FastAPI caches get_session per request, so the unit of work and the repositories share one session
+    return UnitOfWork(session)
 
-def users_service(session: AsyncSession = Depends(get_async_session)) -> UsersService:
+
+def users_service(
+        session: AsyncSession = Depends(get_session),
+        uow: UnitOfWork = Depends(unit_of_work)
+) -> UsersService:
     users_repository = UsersRepository(session=session)
-    return UsersService(users_repository)
+    return UsersService(users_repository, uow)
 
 
-def cars_service(session: AsyncSession = Depends(get_async_session)) -> CarsService:
+def cars_service(
+        session: AsyncSession = Depends(get_session),
+        uow: UnitOfWork = Depends(unit_of_work)
+) -> CarsService:
     cars_repository = CarsRepository(session=session)
-    return CarsService(cars_repository)
+    return CarsService(cars_repository, uow)
 
 
-def orders_service(session: AsyncSession = Depends(get_async_session)) -> OrdersService:
+def orders_service(
+        session: AsyncSession = Depends(get_session),
+        uow: UnitOfWork = Depends(unit_of_work)
+) -> OrdersService:
     orders_repository = OrdersRepository(session=session)
     users_repository = UsersRepository(session=session)
     cars_repository = CarsRepository(session=session)
-    return OrdersService(orders_repo=orders_repository, users_repo=users_repository, cars_repo=cars_repository)
+    sales_repository = SalesRollupsRepository(session=session)
+    return OrdersService(
+        orders_repo=orders_repository,
+        users_repo=users_repository,
+        cars_repo=cars_repository,
+        sales_repo=sales_repository,
+        uow=uow
+    )
+
+
+def stats_service(
+        session: AsyncSession = Depends(get_session),
+        uow: UnitOfWork = Depends(unit_of_work)
+) -> StatsService:
+    stats_repository = StatsRepository(session=session)
+    return StatsService(stats_repository, uow, entity_cache, pool_metrics)
+
+
+def page_params(
+        cursor: Annotated[Optional[str], Query(description="Opaque `next_cursor` from the previous page.")] = None,
+        limit: Annotated[int, Query(ge=1, le=MAX_PAGE_LIMIT, description="Maximum number of records per page.")]
+        = DEFAULT_PAGE_LIMIT,
+        count: Annotated[Optional[CountMode], Query(
+            description="Return the number of matching records as `total`: `exact` runs count(*), "
+                        "`estimated` reads the planner's estimate, which is cheap on large results but approximate."
+        )] = None
+) -> PageParams:
+    """
+    Keyset pagination query parameters shared by all list end-points.
+    """
+    if cursor is None:
+        return PageParams(limit=limit, count=count)
+
+    try:
+        decoded_cursor = decode_cursor(cursor)
+    except ValueError:
+        handle_exception(status_code=400, custom_message="Invalid cursor.")
+    return PageParams(limit=limit, cursor=decoded_cursor, count=count)
+
+
+def stream_requested(
+        accept: Annotated[Optional[str], Header(
+            description=f"Send `{NDJSON_MEDIA_TYPE}` to stream every matching record as NDJSON instead of one page."
+        )] = None
+) -> bool:
+    """
+    Checks whether the client asked a list end-point for an NDJSON stream instead of a paginated envelope.
+    """
+    return accept is not None and NDJSON_MEDIA_TYPE in accept
+
+
+def if_none_match(
+        if_none_match: Annotated[Optional[str], Header(
+            description="ETag of the copy the client has, answered with an empty 304 if it is still current."
+        )] = None
+) -> Optional[str]:
+    """
+    Conditional GET header of end-points returning one record, see src/utils/etag.py.
+    """
+    return if_none_match
+
+
+def if_match(
+        if_match: Annotated[Optional[str], Header(
+            description="ETag the record must still have, otherwise nothing is written and 412 is returned."
+        )] = None
+) -> Optional[str]:
+    """
+    Conditional write header of PATCH end-points, which prevents overwriting changes the client has not seen.
+    """
+    return if_match
+
+
+def car_search_params(
+        price_min: Optional[int] = None,
+        price_max: Optional[int] = None,
+        year_min: Optional[int] = None,
+        year_max: Optional[int] = None,
+        mileage_min: Optional[int] = None,
+        mileage_max: Optional[int] = None,
+        brand: Annotated[Optional[List[str]], Query(description="Repeat to match any of the brands.")] = None,
+        model: Annotated[Optional[List[str]], Query(description="Repeat to match any of the models.")] = None,
+        color: Annotated[Optional[List[str]], Query(description="Repeat to match any of the colors.")] = None,
+        engine: Optional[EngineType] = None,
+        transmission: Optional[TransmissionType] = None,
+        sort: Annotated[CarSortField, Query(description="Field to sort by, then by ID.")] = CarSortField.id
+) -> CarSearchSchema:
+    """
+    Filters and sort of car search. Ranges are inclusive, so a minimum greater than its maximum is rejected.
+    """
+    search = CarSearchSchema(
+        price_min=price_min,
+        price_max=price_max,
+        year_min=year_min,
+        year_max=year_max,
+        mileage_min=mileage_min,
+        mileage_max=mileage_max,
+        brand=brand,
+        model=model,
+        color=color,
+        engine=engine,
+        transmission=transmission,
+        sort=sort
+    )
+    for field in ("price", "year", "mileage"):
+        low, high = getattr(search, f"{field}_min"), getattr(search, f"{field}_max")
+        if low is not None and high is not None and low > high:
+            handle_exception(status_code=400, custom_message=f"{field}_min can't be greater than {field}_max.")
+    return search
+
+
+def fields_params(schema: Type[BaseModel]) -> Callable[..., Optional[Tuple[str, ...]]]:
+    """
+    Builds a dependency that parses the `fields` query parameter (sparse fieldsets) for the given read schema.
+    """
+    allowed_fields = list(schema.model_fields)
+
+    def _fields(
+            fields: Annotated[Optional[str], Query(
+                description=f"Comma-separated fields to return, `id` is always included. "
+                            f"Allowed fields: {', '.join(allowed_fields)}."
+            )] = None
+    ) -> Optional[Tuple[str, ...]]:
+        if fields is None:
+            return None  # Return all fields
+
+        requested_fields = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown_fields = [field for field in requested_fields if field not in allowed_fields]
+        if unknown_fields:
+            handle_exception(status_code=400, custom_message=f"Unknown fields: {', '.join(unknown_fields)}.")
+
+        # id is always returned, pagination cursors are built from it
+        return tuple(dict.fromkeys(["id", *requested_fields]))
+
+    return _fields
+
+
+car_fields = fields_params(CarSchema)
+user_fields = fields_params(UserSchema)
+order_fields = fields_params(OrderSchema)
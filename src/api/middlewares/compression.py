@@ -0,0 +1,244 @@
+import enum
+import hashlib
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.utils.config import COMPRESSION_CACHE_BYTES, COMPRESSION_MIN_SIZE
+from src.utils.etag import encoded_etag
+
+# Optional encoders: brotli and zstd are offered only if their package is installed, gzip always is
+try:
+    import brotli
+except ImportError:
+    brotli = None
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+class CompressionLevel(enum.Enum):
+    """
+    Compression level of a route (see compression_level), mapped to each encoding's own scale in LEVELS.
+    """
+    fast = "fast"  # Least CPU, e.g. for streams, which are compressed chunk by chunk while they are sent
+    default = "default"
+    best = "best"  # Smallest output, worth it for large payloads served again from the compressed cache
+
+
+LEVELS: Dict[str, Dict[CompressionLevel, int]] = {
+    "zstd": {CompressionLevel.fast: 1, CompressionLevel.default: 3, CompressionLevel.best: 12},
+    "br": {CompressionLevel.fast: 1, CompressionLevel.default: 4, CompressionLevel.best: 9},
+    "gzip": {CompressionLevel.fast: 1, CompressionLevel.default: 6, CompressionLevel.best: 9},
+}
+
+
+def compression_level(level: CompressionLevel) -> Callable:
+    """
+    Sets the compression level of an end-point, apply it below the route decorator:
+
+        @router.get(...)
+        @compression_level(CompressionLevel.best)
+        async def get_all_cars(...): ...
+    """
+    def decorator(endpoint: Callable) -> Callable:
+        endpoint.compression_level = level
+        return endpoint
+    return decorator
+
+
+class StreamCompressor:
+    """
+    Compresses a body chunk by chunk, flushing after each chunk so the client can decode it as it arrives.
+    """
+
+    def __init__(self, encoding: str, level: int) -> None:
+        self.encoding = encoding
+        if encoding == "gzip":
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip header and trailer
+        elif encoding == "br":
+            self._compressor = brotli.Compressor(quality=level)
+        else:
+            self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, chunk: bytes) -> bytes:
+        if self.encoding == "gzip":
+            return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        if self.encoding == "br":
+            return self._compressor.process(chunk) + self._compressor.flush()
+        return self._compressor.compress(chunk) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def compress(body: bytes, encoding: str, level: int) -> bytes:
+    compressor = StreamCompressor(encoding, level)
+    return compressor.compress(body) + compressor.finish()
+
+
+def available_encodings() -> List[str]:
+    """Encodings this process can produce, in order of preference when the client accepts several equally."""
+    return [encoding for encoding, module in (("zstd", zstandard), ("br", brotli), ("gzip", zlib)) if module]
+
+
+def negotiate(accept_encoding: str, encodings: List[str]) -> Optional[str]:
+    """
+    Picks the encoding with the highest q-value in Accept-Encoding among `encodings`, the first of them on ties.
+    Returns None if the client accepts none of them.
+    """
+    weights = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip()] = weight
+    best, best_weight = None, 0.0
+    for encoding in encodings:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+class CompressedCache:
+    """
+    Compressed bodies by digest of the uncompressed body, encoding and level, at most `max_bytes` of them
+    (least recently used dropped first). Payloads served again, e.g. pages from the entity cache,
+    are then compressed once.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries: "OrderedDict[Tuple[bytes, str, int], bytes]" = OrderedDict()
+
+    @staticmethod
+    def key(body: bytes, encoding: str, level: int) -> Tuple[bytes, str, int]:
+        return hashlib.blake2b(body, digest_size=16).digest(), encoding, level
+
+    def get(self, key: Tuple[bytes, str, int]) -> Optional[bytes]:
+        compressed = self._entries.get(key)
+        if compressed is not None:
+            self._entries.move_to_end(key)
+        return compressed
+
+    def set(self, key: Tuple[bytes, str, int], compressed: bytes) -> None:
+        if len(compressed) > self.max_bytes or key in self._entries:
+            return
+        self._entries[key] = compressed
+        self.size += len(compressed)
+        while self.size > self.max_bytes:
+            _, dropped = self._entries.popitem(last=False)
+            self.size -= len(dropped)
+
+
+class CompressionMiddleware:
+    """
+    Compresses JSON and NDJSON responses with the best encoding the client accepts (zstd, br or gzip).
+
+    Bodies sent in one message are compressed only from `min_size` bytes (smaller ones gain nothing)
+    at the level of their route, and the compressed bytes are reused for identical bodies. Streamed bodies
+    are compressed chunk by chunk at the fast level. Compressed responses get the ETag of their encoding
+    (see encoded_etag in src/utils/etag.py), their bytes differ from those the ETag was computed for.
+    """
+
+    def __init__(
+            self,
+            app: ASGIApp,
+            min_size: int = COMPRESSION_MIN_SIZE,
+            cache_bytes: int = COMPRESSION_CACHE_BYTES
+    ) -> None:
+        self.app = app
+        self.min_size = min_size
+        self.encodings = available_encodings()
+        self.cache = CompressedCache(cache_bytes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""), self.encodings)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Message] = None
+        compressor: Optional[StreamCompressor] = None
+        passthrough = False
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start, compressor, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if (
+                        message["status"] < 200 or message["status"] in (204, 304)
+                        or "content-encoding" in headers
+                        or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+                ):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message  # Sent with the first body message, once the headers are known
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if compressor is None:  # First body message, the start message is still held back
+                headers = MutableHeaders(raw=start["headers"])
+                headers.add_vary_header("Accept-Encoding")
+                if not more_body:  # Whole body in one message
+                    if len(body) >= self.min_size:
+                        body = self._compress(body, encoding, self._level(scope))
+                        self._set_encoding_headers(headers, encoding)
+                        headers["content-length"] = str(len(body))
+                    await send(start)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                compressor = StreamCompressor(encoding, LEVELS[encoding][CompressionLevel.fast])
+                self._set_encoding_headers(headers, encoding)
+                del headers["content-length"]
+                await send(start)
+
+            chunk = compressor.compress(body)
+            if not more_body:
+                chunk += compressor.finish()
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+
+        await self.app(scope, receive, send_compressed)
+
+    @staticmethod
+    def _level(scope: Scope) -> CompressionLevel:
+        return getattr(scope.get("endpoint"), "compression_level", CompressionLevel.default)
+
+    @staticmethod
+    def _set_encoding_headers(headers: MutableHeaders, encoding: str) -> None:
+        headers["content-encoding"] = encoding
+        etag = headers.get("etag")
+        if etag is not None:
+            headers["etag"] = encoded_etag(etag, encoding)
+
+    def _compress(self, body: bytes, encoding: str, level: CompressionLevel) -> bytes:
+        numeric_level = LEVELS[encoding][level]
+        key = self.cache.key(body, encoding, numeric_level)
+        compressed = self.cache.get(key)
+        if compressed is None:
+            compressed = compress(body, encoding, numeric_level)
+            self.cache.set(key, compressed)
+        return compressed
@@ -0,0 +1,48 @@
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.utils.metrics import UNMATCHED_ROUTE, HttpMetrics, http_metrics
+
+
+class MetricsMiddleware:
+    """
+    Records the latency, status and body size of every request in HttpMetrics (src/utils/metrics.py),
+    labelled by the template of the route that served it (e.g. /cars/{car_id}), read from the scope
+    once routing is done. Added last, so sizes are those sent to the client, after compression.
+    """
+
+    def __init__(self, app: ASGIApp, metrics: HttpMetrics = http_metrics) -> None:
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500  # If the app fails before starting the response
+        size = 0
+
+        async def send_measured(message: Message) -> None:
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        self.metrics.in_flight += 1
+        try:
+            await self.app(scope, receive, send_measured)
+        finally:
+            self.metrics.in_flight -= 1
+            route = scope.get("route")  # Set by the router on the shared scope
+            self.metrics.observe(
+                route.path if route is not None else UNMATCHED_ROUTE,
+                scope["method"],
+                status,
+                time.perf_counter() - started,
+                size
+            )
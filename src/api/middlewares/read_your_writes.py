@@ -0,0 +1,51 @@
+import time
+from http.cookies import SimpleCookie
+
+from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.db import db
+from src.utils.config import READ_YOUR_WRITES_SECONDS
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")  # Requests with these methods don't write, so they can read from replicas
+PIN_COOKIE = "primary_pinned_until"  # Unix time until which the client's reads go to the primary
+
+
+def wrote_recently(request: Request) -> bool:
+    """
+    Checks whether the client wrote less than READ_YOUR_WRITES_SECONDS ago, so its reads must go to the primary
+    (replicas may not have replayed the write yet).
+    """
+    try:
+        pinned_until = float(request.cookies.get(PIN_COOKIE, 0))
+    except ValueError:  # Malformed cookie, treat it as absent
+        return False
+    return pinned_until > time.time()
+
+
+class ReadYourWritesMiddleware:
+    """
+    Sets the pin cookie on successful writes, so the client's follow-up reads see its own changes.
+    Does nothing if no read replicas are configured.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] in SAFE_METHODS or not db.replica_session_makers:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_pin(message: Message) -> None:
+            if message["type"] == "http.response.start" and message["status"] < 400:
+                cookie = SimpleCookie()
+                cookie[PIN_COOKIE] = str(time.time() + READ_YOUR_WRITES_SECONDS)
+                cookie[PIN_COOKIE]["max-age"] = READ_YOUR_WRITES_SECONDS
+                cookie[PIN_COOKIE]["path"] = "/"
+                cookie[PIN_COOKIE]["httponly"] = True
+                header = cookie.output(header="").strip().encode("latin-1")
+                message["headers"] = [*message.get("headers", []), (b"set-cookie", header)]
+            await send(message)
+
+        await self.app(scope, receive, send_with_pin)
@@ -32,8 +32,92 @@ add_car_responses = {
         }
     },
 }
+# post cars/bulk
+bulk_add_cars_responses = {
+    400: {
+        "description": "Payload is not valid",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "empty_payload": {
+                        "summary": "Empty payload",
+                        "value": {
+                            "detail": "Payload cannot be empty."
+                        }
+                    }
+                }
+            }
+        }
+    },
+    500: {
+        "description": "Internal server error",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "unexpected_error": {
+                        "summary": "Unexpected error",
+                        "value": {
+                            "detail": "An unexpected error occurred: <error details>"
+                        }
+                    }
+                }
+            }
+        }
+    },
+}
+# patch cars/bulk
+bulk_update_cars_responses = {
+    400: {
+        "description": "Payload is not valid",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "empty_payload": {
+                        "summary": "Empty payload",
+                        "value": {
+                            "detail": "Payload cannot be empty."
+                        }
+                    }
+                }
+            }
+        }
+    },
+    500: {
+        "description": "Internal server error",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "unexpected_error": {
+                        "summary": "Unexpected error",
+                        "value": {
+                            "detail": "An unexpected error occurred: <error details>"
+                        }
+                    }
+                }
+            }
+        }
+    },
+}
 # get cars/{car_id}
 get_car_by_id_responses = {
+    304: {
+        "description": "Not modified: the ETag sent as If-None-Match is current, the body is empty"
+    },
+    400: {
+        "description": "Unknown field requested",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "unknown_fields": {
+                        "summary": "Unknown fields",
+                        "value": {
+                            "detail": "Unknown fields: horsepower."
+                        }
+                    }
+                }
+            }
+        }
+    },
     404: {
         "description": "Car not found by ID",
         "content": {
@@ -67,6 +151,21 @@ get_car_by_id_responses = {
 }
 # get cars/vin/{vin_number}
 get_car_by_vin_responses = {
+    400: {
+        "description": "Unknown field requested",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "unknown_fields": {
+                        "summary": "Unknown fields",
+                        "value": {
+                            "detail": "Unknown fields: horsepower."
+                        }
+                    }
+                }
+            }
+        }
+    },
     404: {
         "description": "Car not found by VIN",
         "content": {
@@ -100,6 +199,35 @@ get_car_by_vin_responses = {
 }
 # get cars/engine/{engine_type}
 get_cars_by_engine_responses = {
+    200: {
+        "description": "One page of records, or all of them as NDJSON with `Accept: application/x-ndjson`",
+        "content": {
+            "application/x-ndjson": {
+                "example": '{"id":1,"brand":"Tesla","model":"Model S",...}\n{"id":2,"brand":"BMW","model":"X5",...}\n'
+            }
+        }
+    },
+    400: {
+        "description": "Invalid pagination cursor or unknown field",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "invalid_cursor": {
+                        "summary": "Invalid cursor",
+                        "value": {
+                            "detail": "Invalid cursor."
+                        }
+                    },
+                    "unknown_fields": {
+                        "summary": "Unknown fields",
+                        "value": {
+                            "detail": "Unknown fields: horsepower."
+                        }
+                    }
+                }
+            }
+        }
+    },
     500: {
         "description": "Internal server error",
         "content": {
@@ -118,6 +246,35 @@ get_cars_by_engine_responses = {
 }
 # get cars/transmission/{transmission_type}
 get_cars_by_transmission_responses = {
+    200: {
+        "description": "One page of records, or all of them as NDJSON with `Accept: application/x-ndjson`",
+        "content": {
+            "application/x-ndjson": {
+                "example": '{"id":1,"brand":"Tesla","model":"Model S",...}\n{"id":2,"brand":"BMW","model":"X5",...}\n'
+            }
+        }
+    },
+    400: {
+        "description": "Invalid pagination cursor or unknown field",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "invalid_cursor": {
+                        "summary": "Invalid cursor",
+                        "value": {
+                            "detail": "Invalid cursor."
+                        }
+                    },
+                    "unknown_fields": {
+                        "summary": "Unknown fields",
+                        "value": {
+                            "detail": "Unknown fields: horsepower."
+                        }
+                    }
+                }
+            }
+        }
+    },
     500: {
         "description": "Internal server error",
         "content": {
@@ -136,6 +293,119 @@ get_cars_by_transmission_responses = {
 }
 # get cars/
 get_all_cars_responses = {
+    200: {
+        "description": "One page of records, or all of them as NDJSON with `Accept: application/x-ndjson`",
+        "content": {
+            "application/x-ndjson": {
+                "example": '{"id":1,"brand":"Tesla","model":"Model S",...}\n{"id":2,"brand":"BMW","model":"X5",...}\n'
+            }
+        }
+    },
+    400: {
+        "description": "Invalid pagination cursor or unknown field",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "invalid_cursor": {
+                        "summary": "Invalid cursor",
+                        "value": {
+                            "detail": "Invalid cursor."
+                        }
+                    },
+                    "unknown_fields": {
+                        "summary": "Unknown fields",
+                        "value": {
+                            "detail": "Unknown fields: horsepower."
+                        }
+                    }
+                }
+            }
+        }
+    },
+    500: {
+        "description": "Internal server error",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "unexpected_error": {
+                        "summary": "Unexpected error",
+                        "value": {
+                            "detail": "An unexpected error occurred: <error details>"
+                        }
+                    }
+                }
+            }
+        }
+    }
+}
+# get cars/search
+search_cars_responses = {
+    400: {
+        "description": "Invalid pagination cursor, unknown field or inverted range",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "inverted_range": {
+                        "summary": "Range minimum is greater than its maximum",
+                        "value": {
+                            "detail": "price_min can't be greater than price_max."
+                        }
+                    },
+                    "invalid_cursor": {
+                        "summary": "Invalid cursor (for example, a cursor of a page sorted by another field)",
+                        "value": {
+                            "detail": "Invalid cursor."
+                        }
+                    },
+                    "unknown_fields": {
+                        "summary": "Unknown fields",
+                        "value": {
+                            "detail": "Unknown fields: horsepower."
+                        }
+                    }
+                }
+            }
+        }
+    },
+    500: {
+        "description": "Internal server error",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "unexpected_error": {
+                        "summary": "Unexpected error",
+                        "value": {
+                            "detail": "An unexpected error occurred: <error details>"
+                        }
+                    }
+                }
+            }
+        }
+    }
+}
+# get cars/search/text
+text_search_cars_responses = {
+    400: {
+        "description": "Query without words or unknown field",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "no_words": {
+                        "summary": "Query has no letters or digits",
+                        "value": {
+                            "detail": "Search query must contain letters or digits."
+                        }
+                    },
+                    "unknown_fields": {
+                        "summary": "Unknown fields",
+                        "value": {
+                            "detail": "Unknown fields: horsepower."
+                        }
+                    }
+                }
+            }
+        }
+    },
     500: {
         "description": "Internal server error",
         "content": {
@@ -184,6 +454,21 @@ update_car_responses = {
             }
         }
     },
+    412: {
+        "description": "Precondition failed: the car does not have the ETag sent as If-Match",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "changed": {
+                        "summary": "Car was changed",
+                        "value": {
+                            "detail": "Car with id: '1' was changed since it was read, or does not exist."
+                        }
+                    }
+                }
+            }
+        }
+    },
     500: {
         "description": "Internal server error",
         "content": {
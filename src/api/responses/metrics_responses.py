@@ -0,0 +1,16 @@
+# Responses for end-points in src/api/metrics.py
+# get metrics
+get_metrics_responses = {
+    200: {
+        "description": "Metrics in the Prometheus text format",
+        "content": {
+            "text/plain; version=0.0.4; charset=utf-8": {
+                "example": (
+                    "# HELP http_requests_total Requests served.\n"
+                    "# TYPE http_requests_total counter\n"
+                    'http_requests_total{route="/cars/{car_id}",method="GET",status="200"} 42\n'
+                )
+            }
+        }
+    }
+}
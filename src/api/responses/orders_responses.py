@@ -61,6 +61,24 @@ create_order_responses = {
 }
 # get orders/{order_id}
 get_order_by_id_responses = {
+    304: {
+        "description": "Not modified: the ETag sent as If-None-Match is current, the body is empty"
+    },
+    400: {
+        "description": "Unknown field requested",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "unknown_fields": {
+                        "summary": "Unknown fields",
+                        "value": {
+                            "detail": "Unknown fields: horsepower."
+                        }
+                    }
+                }
+            }
+        }
+    },
     404: {
         "description": "Order not found by ID",
         "content": {
@@ -94,6 +112,35 @@ get_order_by_id_responses = {
 }
 # get orders/status/{status}
 get_orders_by_status_responses = {
+    200: {
+        "description": "One page of records, or all of them as NDJSON with `Accept: application/x-ndjson`",
+        "content": {
+            "application/x-ndjson": {
+                "example": '{"id":1,"user_id":1,"car_id":1,"status":"pending",...}\n{"id":2,"user_id":1,"car_id":2,"status":"completed",...}\n'
+            }
+        }
+    },
+    400: {
+        "description": "Invalid pagination cursor or unknown field",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "invalid_cursor": {
+                        "summary": "Invalid cursor",
+                        "value": {
+                            "detail": "Invalid cursor."
+                        }
+                    },
+                    "unknown_fields": {
+                        "summary": "Unknown fields",
+                        "value": {
+                            "detail": "Unknown fields: horsepower."
+                        }
+                    }
+                }
+            }
+        }
+    },
     500: {
         "description": "Unexpected server error",
         "content": {
@@ -112,16 +159,36 @@ get_orders_by_status_responses = {
 }
 # get orders/customer_id/{customer_id}
 get_orders_by_customer_id_responses = {
+    200: {
+        "description": "One page of records, or all of them as NDJSON with `Accept: application/x-ndjson`",
+        "content": {
+            "application/x-ndjson": {
+                "example": '{"id":1,"user_id":1,"car_id":1,"status":"pending",...}\n{"id":2,"user_id":1,"car_id":2,"status":"completed",...}\n'
+            }
+        }
+    },
     400: {
-        "description": "User with the given ID is not a customer",
+        "description": "User with the given ID is not a customer, invalid pagination cursor or unknown field",
         "content": {
             "application/json": {
                 "examples": {
+                    "invalid_cursor": {
+                        "summary": "Invalid cursor",
+                        "value": {
+                            "detail": "Invalid cursor."
+                        }
+                    },
                     "wrong_role": {
                         "summary": "Invalid role",
                         "value": {
                             "detail": "The user with ID: '1' is a manager, not a customer."
                         }
+                    },
+                    "unknown_fields": {
+                        "summary": "Unknown fields",
+                        "value": {
+                            "detail": "Unknown fields: horsepower."
+                        }
                     }
                 }
             }
@@ -160,16 +227,36 @@ get_orders_by_customer_id_responses = {
 }
 # get orders/salesperson_id/{salesperson_id}
 get_orders_by_salesperson_id_responses = {
+    200: {
+        "description": "One page of records, or all of them as NDJSON with `Accept: application/x-ndjson`",
+        "content": {
+            "application/x-ndjson": {
+                "example": '{"id":1,"user_id":1,"car_id":1,"status":"pending",...}\n{"id":2,"user_id":1,"car_id":2,"status":"completed",...}\n'
+            }
+        }
+    },
     400: {
-        "description": "The user with the given ID is not a manager",
+        "description": "The user with the given ID is not a manager, invalid pagination cursor or unknown field",
         "content": {
             "application/json": {
                 "examples": {
+                    "invalid_cursor": {
+                        "summary": "Invalid cursor",
+                        "value": {
+                            "detail": "Invalid cursor."
+                        }
+                    },
                     "wrong_role": {
                         "summary": "Invalid role",
                         "value": {
                             "detail": "The user with ID: '2' is a customer, not a manager."
                         }
+                    },
+                    "unknown_fields": {
+                        "summary": "Unknown fields",
+                        "value": {
+                            "detail": "Unknown fields: horsepower."
+                        }
                     }
                 }
             }
@@ -208,6 +295,35 @@ get_orders_by_salesperson_id_responses = {
 }
 # get orders/car_id/{car_id}
 get_orders_by_car_id_responses = {
+    200: {
+        "description": "One page of records, or all of them as NDJSON with `Accept: application/x-ndjson`",
+        "content": {
+            "application/x-ndjson": {
+                "example": '{"id":1,"user_id":1,"car_id":1,"status":"pending",...}\n{"id":2,"user_id":1,"car_id":2,"status":"completed",...}\n'
+            }
+        }
+    },
+    400: {
+        "description": "Invalid pagination cursor or unknown field",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "invalid_cursor": {
+                        "summary": "Invalid cursor",
+                        "value": {
+                            "detail": "Invalid cursor."
+                        }
+                    },
+                    "unknown_fields": {
+                        "summary": "Unknown fields",
+                        "value": {
+                            "detail": "Unknown fields: horsepower."
+                        }
+                    }
+                }
+            }
+        }
+    },
     404: {
         "description": "Car not found by the given ID",
         "content": {
@@ -241,6 +357,35 @@ get_orders_by_car_id_responses = {
 }
 # get orders/
 get_all_orders_responses = {
+    200: {
+        "description": "One page of records, or all of them as NDJSON with `Accept: application/x-ndjson`",
+        "content": {
+            "application/x-ndjson": {
+                "example": '{"id":1,"user_id":1,"car_id":1,"status":"pending",...}\n{"id":2,"user_id":1,"car_id":2,"status":"completed",...}\n'
+            }
+        }
+    },
+    400: {
+        "description": "Invalid pagination cursor or unknown field",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "invalid_cursor": {
+                        "summary": "Invalid cursor",
+                        "value": {
+                            "detail": "Invalid cursor."
+                        }
+                    },
+                    "unknown_fields": {
+                        "summary": "Unknown fields",
+                        "value": {
+                            "detail": "Unknown fields: horsepower."
+                        }
+                    }
+                }
+            }
+        }
+    },
     500: {
         "description": "Unexpected server error",
         "content": {
@@ -257,6 +402,72 @@ get_all_orders_responses = {
         }
     }
 }
+# get orders/sales/leaderboard
+get_sales_leaderboard_responses = {
+    400: {
+        "description": "Invalid period",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "invalid_period": {
+                        "summary": "date_from is later than date_to",
+                        "value": {
+                            "detail": "date_from can't be later than date_to."
+                        }
+                    }
+                }
+            }
+        }
+    },
+    500: {
+        "description": "Internal server error",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "unexpected_error": {
+                        "summary": "Unexpected error",
+                        "value": {
+                            "detail": "An unexpected error occurred: <error details>"
+                        }
+                    }
+                }
+            }
+        }
+    }
+}
+# get orders/sales/salesperson_id/{salesperson_id}
+get_sales_by_salesperson_id_responses = {
+    400: {
+        "description": "Invalid period",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "invalid_period": {
+                        "summary": "date_from is later than date_to",
+                        "value": {
+                            "detail": "date_from can't be later than date_to."
+                        }
+                    }
+                }
+            }
+        }
+    },
+    500: {
+        "description": "Internal server error",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "unexpected_error": {
+                        "summary": "Unexpected error",
+                        "value": {
+                            "detail": "An unexpected error occurred: <error details>"
+                        }
+                    }
+                }
+            }
+        }
+    }
+}
 # get orders/patch/{order_id}
 update_order_responses = {
     400: {
@@ -313,6 +524,21 @@ update_order_responses = {
             }
         }
     },
+    412: {
+        "description": "Precondition failed: the order does not have the ETag sent as If-Match",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "changed": {
+                        "summary": "Order was changed",
+                        "value": {
+                            "detail": "Order with id: '1' was changed since it was read, or does not exist."
+                        }
+                    }
+                }
+            }
+        }
+    },
     500: {
         "description": "Unexpected server error",
         "content": {
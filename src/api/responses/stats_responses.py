@@ -0,0 +1,88 @@
+# Responses for end-points in src/api/stats.py
+# get stats/cars/counts
+get_car_counts_responses = {
+    500: {
+        "description": "Internal server error",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "unexpected_error": {
+                        "summary": "Unexpected error",
+                        "value": {
+                            "detail": "An unexpected error occurred: <error details>"
+                        }
+                    }
+                }
+            }
+        }
+    }
+}
+# get stats/cars/prices
+get_car_prices_responses = {
+    500: {
+        "description": "Internal server error",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "unexpected_error": {
+                        "summary": "Unexpected error",
+                        "value": {
+                            "detail": "An unexpected error occurred: <error details>"
+                        }
+                    }
+                }
+            }
+        }
+    }
+}
+# get stats/orders/monthly
+get_monthly_orders_responses = {
+    500: {
+        "description": "Internal server error",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "unexpected_error": {
+                        "summary": "Unexpected error",
+                        "value": {
+                            "detail": "An unexpected error occurred: <error details>"
+                        }
+                    }
+                }
+            }
+        }
+    }
+}
+# post stats/refresh
+refresh_stats_responses = {
+    409: {
+        "description": "Refresh is running already",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "refresh_running": {
+                        "summary": "Another refresh holds the lock",
+                        "value": {
+                            "detail": "Stats are being refreshed already, try again later."
+                        }
+                    }
+                }
+            }
+        }
+    },
+    500: {
+        "description": "Internal server error",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "unexpected_error": {
+                        "summary": "Unexpected error",
+                        "value": {
+                            "detail": "An unexpected error occurred: <error details>"
+                        }
+                    }
+                }
+            }
+        }
+    }
+}
@@ -33,8 +33,60 @@ create_user_responses = {
     },
 }
 
+# post users/bulk
+bulk_create_users_responses = {
+    400: {
+        "description": "Payload is not valid",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "empty_payload": {
+                        "summary": "Empty payload",
+                        "value": {
+                            "detail": "Payload cannot be empty."
+                        }
+                    }
+                }
+            }
+        }
+    },
+    500: {
+        "description": "Internal server error",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "unexpected_error": {
+                        "summary": "Unexpected error",
+                        "value": {
+                            "detail": "An unexpected error occurred: <error details>"
+                        }
+                    }
+                }
+            }
+        }
+    },
+}
+
 # get users/{user_id}
 get_user_by_id_responses = {
+    304: {
+        "description": "Not modified: the ETag sent as If-None-Match is current, the body is empty"
+    },
+    400: {
+        "description": "Unknown field requested",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "unknown_fields": {
+                        "summary": "Unknown fields",
+                        "value": {
+                            "detail": "Unknown fields: horsepower."
+                        }
+                    }
+                }
+            }
+        }
+    },
     404: {
         "description": "User not found",
         "content": {
@@ -69,6 +121,21 @@ get_user_by_id_responses = {
 
 # get users/email/{user_email}
 get_user_by_email_responses = {
+    400: {
+        "description": "Unknown field requested",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "unknown_fields": {
+                        "summary": "Unknown fields",
+                        "value": {
+                            "detail": "Unknown fields: horsepower."
+                        }
+                    }
+                }
+            }
+        }
+    },
     404: {
         "description": "User not found by email",
         "content": {
@@ -103,6 +170,35 @@ get_user_by_email_responses = {
 
 # get users/role/{role}
 get_users_by_role_responses = {
+    200: {
+        "description": "One page of records, or all of them as NDJSON with `Accept: application/x-ndjson`",
+        "content": {
+            "application/x-ndjson": {
+                "example": '{"id":1,"name":"John","surname":"Doe","email":"user@example.com",...}\n{"id":2,"name":"Jane","surname":"Doe","email":"jane@example.com",...}\n'
+            }
+        }
+    },
+    400: {
+        "description": "Invalid pagination cursor or unknown field",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "invalid_cursor": {
+                        "summary": "Invalid cursor",
+                        "value": {
+                            "detail": "Invalid cursor."
+                        }
+                    },
+                    "unknown_fields": {
+                        "summary": "Unknown fields",
+                        "value": {
+                            "detail": "Unknown fields: horsepower."
+                        }
+                    }
+                }
+            }
+        }
+    },
     500: {
         "description": "Internal server error",
         "content": {
@@ -122,6 +218,35 @@ get_users_by_role_responses = {
 
 # get users/
 get_all_users_responses = {
+    200: {
+        "description": "One page of records, or all of them as NDJSON with `Accept: application/x-ndjson`",
+        "content": {
+            "application/x-ndjson": {
+                "example": '{"id":1,"name":"John","surname":"Doe","email":"user@example.com",...}\n{"id":2,"name":"Jane","surname":"Doe","email":"jane@example.com",...}\n'
+            }
+        }
+    },
+    400: {
+        "description": "Invalid pagination cursor or unknown field",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "invalid_cursor": {
+                        "summary": "Invalid cursor",
+                        "value": {
+                            "detail": "Invalid cursor."
+                        }
+                    },
+                    "unknown_fields": {
+                        "summary": "Unknown fields",
+                        "value": {
+                            "detail": "Unknown fields: horsepower."
+                        }
+                    }
+                }
+            }
+        }
+    },
     500: {
         "description": "Internal server error",
         "content": {
@@ -186,6 +311,21 @@ update_user_responses = {
             }
         }
     },
+    412: {
+        "description": "Precondition failed: the user does not have the ETag sent as If-Match",
+        "content": {
+            "application/json": {
+                "examples": {
+                    "changed": {
+                        "summary": "User was changed",
+                        "value": {
+                            "detail": "User with id: '1' was changed since it was read, or does not exist."
+                        }
+                    }
+                }
+            }
+        }
+    },
     500: {
         "description": "Internal server error",
         "content": {
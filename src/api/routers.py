@@ -1,10 +1,14 @@
 from src.api.routes.users import router as users_router
 from src.api.routes.cars import router as cars_router
 from src.api.routes.orders import router as orders_router
+from src.api.routes.stats import router as stats_router
+from src.api.routes.metrics import router as metrics_router
 
 
 all_routers = [
     users_router,
     cars_router,
-    orders_router
+    orders_router,
+    stats_router,
+    metrics_router
 ]
\ No newline at end of file
@@ -1,27 +1,41 @@
-from typing import Annotated, List
+from typing import Annotated, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Body, Depends, Query, Response
 
-from src.api.dependencies import cars_service
+from src.api.dependencies import (
+    cars_service, page_params, car_fields, car_search_params, stream_requested, if_none_match, if_match
+)
+from src.api.middlewares.compression import CompressionLevel, compression_level
+from src.api.routing import ModelResponseRoute
 from src.services.cars import CarsService
 from src.api.responses.cars_responses import (
     add_car_responses,
+    bulk_add_cars_responses,
+    bulk_update_cars_responses,
     get_car_by_id_responses,
     get_car_by_vin_responses,
     get_cars_by_engine_responses,
     get_cars_by_transmission_responses,
     get_all_cars_responses,
+    search_cars_responses,
+    text_search_cars_responses,
     update_car_responses,
     delete_car_responses
 )
-from src.schemas.cars import CarCreateSchema, CarUpdateSchema, CarSchema
-from src.schemas.base_response import BaseResponse, BaseStatusMessageResponse
+from src.schemas.cars import (
+    CarCreateSchema, CarUpdateSchema, CarBulkUpdateSchema, CarSearchSchema, CarSchema, CarReadSchema
+)
+from src.schemas.base_response import BaseResponse, BaseStatusMessageResponse, BulkItemResult, PaginatedResponse
 from src.utils.enums import EngineType, TransmissionType
+from src.utils.bulk import BULK_MAX_ITEMS
+from src.utils.pagination import PageParams, DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
+from src.utils.etag import conditional_get, if_match_versions, set_etag
 from src.utils.exception_handler import validate_payload  # Validates input data in api layer for patch end-point
 
 router = APIRouter(
     prefix="/cars",
-    tags=["Cars"]
+    tags=["Cars"],
+    route_class=ModelResponseRoute  # Encodes returned envelopes without validating them again
 )
 
 
@@ -51,13 +65,97 @@ async def add_car(
     return await service.add(car)
 
 
+@router.post(
+    path="/bulk",
+    response_model=BaseResponse[List[BulkItemResult[CarSchema]]],
+    summary="Add many cars",
+    description=f"""
+    Create up to {BULK_MAX_ITEMS} cars in one request.
+    
+    - Cars are written in chunks, with one multi-row insert and one transaction per chunk.
+    - Every item gets its own result: created, or a conflict if its VIN number already exists.
+    - Returns 400 if the payload is empty.
+    """,
+    responses=bulk_add_cars_responses
+)
+async def add_cars_bulk(
+        cars: Annotated[List[CarCreateSchema], Body(max_length=BULK_MAX_ITEMS)],
+        service: Annotated[CarsService, Depends(cars_service)]
+):
+    """
+    Endpoint to create many cars at once.
+    """
+    validate_payload(cars)
+    return await service.add_many(cars)
+
+
+@router.get(
+    path="/search",
+    response_model=PaginatedResponse[List[CarReadSchema]],
+    summary="Search cars",
+    description="""
+    Search cars by any combination of filters, one page at a time.
+    
+    - Price, year and mileage take inclusive ranges (`price_min`, `price_max`, ...).
+    - Brand, model and color take lists: repeat the parameter to match any of the values (`brand=BMW&brand=Audi`).
+    - Engine and transmission take a single value.
+    - Sorted by `sort` (id, price, year, mileage or created_at) and then ID, `next_cursor` continues the same sort.
+    - The sort field is always returned, even if it is not in `fields`.
+    - Returns 400 if the cursor is invalid or a range minimum is greater than its maximum.
+    - Returns 500 if an unexpected error occurs.
+    """,
+    responses=search_cars_responses
+)
+@compression_level(CompressionLevel.best)
+async def search_cars(
+        search: Annotated[CarSearchSchema, Depends(car_search_params)],
+        page: Annotated[PageParams, Depends(page_params)],
+        fields: Annotated[Optional[Tuple[str, ...]], Depends(car_fields)],
+        service: Annotated[CarsService, Depends(cars_service)]
+):
+    """
+    Endpoint to search cars. Declared before /{car_id}, which would match "search" as a car ID.
+    """
+    return await service.search(search, page, fields)
+
+
+@router.get(
+    path="/search/text",
+    response_model=BaseResponse[List[CarReadSchema]],
+    summary="Search cars by text",
+    description="""
+    Find cars by free text, for example "bmw x5", matched against brand, model and color.
+    
+    - Every word must match the beginning of a word of the car, so partially typed words match too.
+    - Words with typos match too if the database has the pg_trgm extension.
+    - Returns up to `limit` cars, most relevant first.
+    - Returns 400 if the query has no letters or digits.
+    - Returns 500 if an unexpected error occurs.
+    """,
+    responses=text_search_cars_responses
+)
+async def text_search_cars(
+        q: Annotated[str, Query(min_length=1, max_length=100, description="Free text, e.g. \"bmw x5\".")],
+        fields: Annotated[Optional[Tuple[str, ...]], Depends(car_fields)],
+        service: Annotated[CarsService, Depends(cars_service)],
+        limit: Annotated[int, Query(ge=1, le=MAX_PAGE_LIMIT, description="Maximum number of cars.")]
+        = DEFAULT_PAGE_LIMIT
+):
+    """
+    Endpoint to search cars by text.
+    """
+    return await service.text_search(q, limit, fields)
+
+
 @router.get(
     path="/{car_id}",
-    response_model=BaseResponse[CarSchema],
+    response_model=BaseResponse[CarReadSchema],
     summary="Get car by ID",
     description="""
     Retrieve a single car by its unique ID.
     
+    - The full car is returned with an `ETag`, send it back as `If-None-Match`
+      to get an empty 304 while the car is unchanged.
     - Returns 404 if the car is not found.
     - Returns 500 if an unexpected error occurs.
     """,
@@ -65,18 +163,21 @@ async def add_car(
 )
 async def get_car_by_id(
         car_id: int,
+        fields: Annotated[Optional[Tuple[str, ...]], Depends(car_fields)],
+        etags: Annotated[Optional[str], Depends(if_none_match)],
+        response: Response,
         service: Annotated[CarsService, Depends(cars_service)]
 ):
     """
     Endpoint to get car details by car ID.
     """
     filter_by = {"id": car_id}
-    return await service.get_one_by_filter(**filter_by)
+    return conditional_get(await service.get_one_by_filter(fields=fields, **filter_by), response, etags, fields)
 
 
 @router.get(
     path="/vin/{vin_number}",
-    response_model=BaseResponse[CarSchema],
+    response_model=BaseResponse[CarReadSchema],
     summary="Get car by vin_number",
     description="""
     Retrieve a single car using the VIN number.
@@ -88,78 +189,121 @@ async def get_car_by_id(
 )
 async def get_car_by_vin(
         vin_number: str,
+        fields: Annotated[Optional[Tuple[str, ...]], Depends(car_fields)],
         service: Annotated[CarsService, Depends(cars_service)]
 ):
     """
     Endpoint to get car details by its VIN number.
     """
     filter_by = {"vin_number": vin_number}
-    return await service.get_one_by_filter(**filter_by)
+    return await service.get_one_by_filter(fields=fields, **filter_by)
 
 
 @router.get(
     path="/engine/{engine_type}",
-    response_model=BaseResponse[List[CarSchema]],
+    response_model=PaginatedResponse[List[CarReadSchema]],
     summary="Get cars by engine type",
     description="""
-    Retrieve multiple cars filtered by engine type.
+    Retrieve multiple cars filtered by engine type, one page at a time.
+    Send `Accept: application/x-ndjson` to stream all of them as NDJSON, one record per line, instead.
     
     Possible engine types might be: 'electric', 'gasoline', 'diesel'.
+    Pass `next_cursor` from the response as `cursor` to get the next page.
     """,
     responses=get_cars_by_engine_responses
 )
+@compression_level(CompressionLevel.best)
 async def get_cars_by_engine(
         engine_type: EngineType,
+        page: Annotated[PageParams, Depends(page_params)],
+        fields: Annotated[Optional[Tuple[str, ...]], Depends(car_fields)],
+        stream: Annotated[bool, Depends(stream_requested)],
         service: Annotated[CarsService, Depends(cars_service)]
 ):
     """
     Endpoint to get cars with a specific engine type.
     """
     filter_by = {"engine": engine_type}
-    return await service.get_many_by_filter(**filter_by)
+    return await service.get_many_by_filter(page, fields, stream=stream, **filter_by)
 
 
 @router.get(
     path="/transmission/{transmission_type}",
-    response_model=BaseResponse[List[CarSchema]],
+    response_model=PaginatedResponse[List[CarReadSchema]],
     summary="Get cars by transmission type",
     description="""
-    Retrieve multiple cars filtered by transmission type.
+    Retrieve multiple cars filtered by transmission type, one page at a time.
+    Send `Accept: application/x-ndjson` to stream all of them as NDJSON, one record per line, instead.
     
     Possible transmission types might be: 'automatic', 'manual'.
+    Pass `next_cursor` from the response as `cursor` to get the next page.
     """,
     responses=get_cars_by_transmission_responses
 )
+@compression_level(CompressionLevel.best)
 async def get_cars_by_transmission(
         transmission_type: TransmissionType,
+        page: Annotated[PageParams, Depends(page_params)],
+        fields: Annotated[Optional[Tuple[str, ...]], Depends(car_fields)],
+        stream: Annotated[bool, Depends(stream_requested)],
         service: Annotated[CarsService, Depends(cars_service)]
 ):
     """
     Endpoint to get cars by a specific transmission type.
     """
     filter_by = {"transmission": transmission_type}
-    return await service.get_many_by_filter(**filter_by)
+    return await service.get_many_by_filter(page, fields, stream=stream, **filter_by)
 
 
 @router.get(
     path="/",
-    response_model=BaseResponse[List[CarSchema]],
+    response_model=PaginatedResponse[List[CarReadSchema]],
     summary="Get all cars",
     description="""
-    Retrieve all cars in the system.
+    Retrieve all cars in the system, one page at a time.
+    Send `Accept: application/x-ndjson` to stream all of them as NDJSON, one record per line, instead.
     
-    - Returns a list of all car records.
+    - Returns a page of car records ordered by ID and `next_cursor` for the next page.
+    - Returns 400 if the cursor is invalid.
     - Returns 500 if an unexpected error occurs.
     """,
     responses=get_all_cars_responses
 )
+@compression_level(CompressionLevel.best)
 async def get_all_cars(
+        page: Annotated[PageParams, Depends(page_params)],
+        fields: Annotated[Optional[Tuple[str, ...]], Depends(car_fields)],
+        stream: Annotated[bool, Depends(stream_requested)],
+        service: Annotated[CarsService, Depends(cars_service)]
+):
+    """
+    Endpoint to fetch a page of all available cars.
+    """
+    return await service.get_all(page, fields, stream=stream)
+
+
+@router.patch(
+    path="/bulk",
+    response_model=BaseResponse[List[BulkItemResult[CarSchema]]],
+    summary="Update many cars",
+    description=f"""
+    Partially update up to {BULK_MAX_ITEMS} cars in one request, each item must contain the car's `id`.
+    
+    - Cars are written in chunks, with one batched update and one transaction per chunk.
+    - Every item gets its own result: updated, not found, conflicting VIN or empty payload.
+    - Returns 400 if the payload is empty.
+    """,
+    responses=bulk_update_cars_responses
+)
+async def update_cars_bulk(
+        cars: Annotated[List[CarBulkUpdateSchema], Body(max_length=BULK_MAX_ITEMS)],
         service: Annotated[CarsService, Depends(cars_service)]
 ):
     """
-    Endpoint to fetch a list of all available cars.
+    Endpoint to update many cars at once.
     """
-    return await service.get_all()
+    validate_payload(cars)
+    return await service.update_many(cars)
 
 
 @router.patch(
@@ -169,7 +313,9 @@ async def get_all_cars(
     description="""
     Update an existing car's details by its unique ID.
     
-    - Validates that the VIN (if changed) doesn't conflict.
+    - Validates that the VIN (if changed) doesn't conflict with another car.
+    - The car is updated in one statement, without reading it first.
+    - With `If-Match`, the car is updated only if it still has that ETag, otherwise returns 412.
     - Returns 404 if no car matches the provided ID.
     - Returns 500 if an unexpected error occurs.
     """,
@@ -178,13 +324,17 @@ async def get_all_cars(
 async def update_car_by_car_id(
         car_id: int,
         new_car: CarUpdateSchema,
+        etags: Annotated[Optional[str], Depends(if_match)],
+        response: Response,
         service: Annotated[CarsService, Depends(cars_service)]
 ):
     """
     Endpoint to update a car's information partially.
     """
     validate_payload(new_car)
-    return await service.update_by_id(car_id, new_car)
+    result = await service.update_by_id(car_id, new_car, if_match_versions(etags, car_id))
+    set_etag(response, result.data)
+    return result
 
 
 @router.delete(
@@ -0,0 +1,30 @@
+from fastapi import APIRouter, Response
+
+from src.api.responses.metrics_responses import get_metrics_responses
+from src.db.db import pool_metrics
+from src.utils.metrics import CONTENT_TYPE, http_metrics, metrics_files, render_metrics
+
+router = APIRouter(tags=["Metrics"])
+
+
+@router.get(
+    path="/metrics",
+    response_class=Response,
+    summary="Get metrics",
+    description="""
+    Metrics in the Prometheus text format, for scraping:
+    
+    - `http_requests_total`, `http_request_duration_seconds` and `http_response_size_bytes` per route template,
+      method and status, and `http_requests_in_flight`.
+    - `db_pool_*` per engine (primary and replicas), as in `/stats/pools`.
+    - With several worker processes, their metrics are merged: counters and histograms of all the workers
+      (including exited ones), gauges of running ones. Figures of the workers other than the one serving the request
+      are at most `METRICS_FLUSH_SECONDS` old.
+    """,
+    responses=get_metrics_responses
+)
+async def get_metrics():
+    """
+    Endpoint to retrieve the metrics of this process, or of every worker of the server.
+    """
+    return Response(content=render_metrics(http_metrics, pool_metrics, metrics_files), media_type=CONTENT_TYPE)
@@ -1,8 +1,11 @@
-from typing import Annotated, List
+from datetime import date
+from typing import Annotated, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, Response
 
-from src.api.dependencies import orders_service
+from src.api.dependencies import orders_service, page_params, order_fields, stream_requested, if_none_match, if_match
+from src.api.middlewares.compression import CompressionLevel, compression_level
+from src.api.routing import ModelResponseRoute
 from src.api.responses.orders_responses import (
     create_order_responses,
     get_order_by_id_responses,
@@ -11,18 +14,25 @@ from src.api.responses.orders_responses import (
     get_orders_by_salesperson_id_responses,
     get_orders_by_car_id_responses,
     get_all_orders_responses,
+    get_sales_leaderboard_responses,
+    get_sales_by_salesperson_id_responses,
     update_order_responses,
     delete_order_responses
 )
-from src.schemas.orders import OrderCreateSchema, OrderUpdateSchema, OrderSchema
-from src.schemas.base_response import BaseResponse, BaseStatusMessageResponse
+from src.schemas.orders import (
+    OrderCreateSchema, OrderUpdateSchema, OrderSchema, OrderReadSchema, DailySalesSchema, SalespersonSalesSchema
+)
+from src.schemas.base_response import BaseResponse, BaseStatusMessageResponse, PaginatedResponse
 from src.services.orders import OrdersService
 from src.utils.enums import OrderStatus
+from src.utils.pagination import PageParams, DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
+from src.utils.etag import conditional_get, if_match_versions, set_etag
 from src.utils.exception_handler import validate_payload  # Validates input data in api layer for patch end-point
 
 router = APIRouter(
     prefix="/orders",
-    tags=["Orders"]
+    tags=["Orders"],
+    route_class=ModelResponseRoute  # Encodes returned envelopes without validating them again
 )
 
 
@@ -53,52 +63,63 @@ async def create_order(
 
 @router.get(
     path="/{order_id}",
-    response_model=BaseResponse[OrderSchema],
+    response_model=BaseResponse[OrderReadSchema],
     summary="Get order by ID",
     description="""
     Retrieve a single order by its unique ID.
     
+    The full order is returned with an `ETag`, send it back as `If-None-Match`
+    to get an empty 304 while the order is unchanged.
     Returns 404 if the order does not exist.
     """,
     responses=get_order_by_id_responses
 )
 async def get_order_by_id(
         order_id: int,
+        fields: Annotated[Optional[Tuple[str, ...]], Depends(order_fields)],
+        etags: Annotated[Optional[str], Depends(if_none_match)],
+        response: Response,
         service: Annotated[OrdersService, Depends(orders_service)]
 ):
     """
     Endpoint to fetch an order by its ID.
     """
-    return await service.get_by_order_id(order_id)
+    return conditional_get(await service.get_by_order_id(order_id, fields), response, etags, fields)
 
 
 @router.get(
     path="/status/{status}",
-    response_model=BaseResponse[List[OrderSchema]],
+    response_model=PaginatedResponse[List[OrderReadSchema]],
     summary="Get orders by status",
     description="""
-    Fetch all orders that match the specified status.
+    Fetch all orders that match the specified status, one page at a time.
+    Send `Accept: application/x-ndjson` to stream all of them as NDJSON, one record per line, instead.
     
     Possible statuses: 'pending', 'completed' and 'canceled'.
     """,
     responses=get_orders_by_status_responses
 )
+@compression_level(CompressionLevel.best)
 async def get_orders_by_status(
         status: OrderStatus,
+        page: Annotated[PageParams, Depends(page_params)],
+        fields: Annotated[Optional[Tuple[str, ...]], Depends(order_fields)],
+        stream: Annotated[bool, Depends(stream_requested)],
         service: Annotated[OrdersService, Depends(orders_service)]
 ):
     """
     Endpoint to retrieve orders filtered by a specific status.
     """
-    return await service.get_by_status(status)
+    return await service.get_by_status(status, page, fields, stream=stream)
 
 
 @router.get(
     path="/customer_id/{customer_id}",
-    response_model=BaseResponse[List[OrderSchema]],
+    response_model=PaginatedResponse[List[OrderReadSchema]],
     summary="Get orders by customer's ID",
     description="""
-    Fetch all orders associated with a specific customer ID.
+    Fetch all orders associated with a specific customer ID, one page at a time.
+    Send `Accept: application/x-ndjson` to stream all of them as NDJSON, one record per line, instead.
     
     - Validates the user's role is 'customer'.
     - Returns 404 if the user does not exist, 400 if role mismatch.
@@ -107,20 +128,24 @@ async def get_orders_by_status(
 )
 async def get_orders_by_customer_id(
         customer_id: int,
+        page: Annotated[PageParams, Depends(page_params)],
+        fields: Annotated[Optional[Tuple[str, ...]], Depends(order_fields)],
+        stream: Annotated[bool, Depends(stream_requested)],
         service: Annotated[OrdersService, Depends(orders_service)]
 ):
     """
     Endpoint to retrieve orders belonging to a specific customer.
     """
-    return await service.get_by_customer_id(customer_id)
+    return await service.get_by_customer_id(customer_id, page, fields, stream=stream)
 
 
 @router.get(
     path="/salesperson_id/{salesperson_id}",
-    response_model=BaseResponse[List[OrderSchema]],
+    response_model=PaginatedResponse[List[OrderReadSchema]],
     summary="Get orders by salesperson's ID",
     description="""
-    Fetch all orders associated with a specific salesperson ID.
+    Fetch all orders associated with a specific salesperson ID, one page at a time.
+    Send `Accept: application/x-ndjson` to stream all of them as NDJSON, one record per line, instead.
     
     - Validates the user's role is 'manager'.
     - Returns 404 if the user does not exist, 400 if role mismatch.
@@ -129,20 +154,24 @@ async def get_orders_by_customer_id(
 )
 async def get_orders_by_salesperson_id(
         salesperson_id: int,
+        page: Annotated[PageParams, Depends(page_params)],
+        fields: Annotated[Optional[Tuple[str, ...]], Depends(order_fields)],
+        stream: Annotated[bool, Depends(stream_requested)],
         service: Annotated[OrdersService, Depends(orders_service)]
 ):
     """
     Endpoint to retrieve orders for a specific salesperson.
     """
-    return await service.get_by_salesperson_id(salesperson_id)
+    return await service.get_by_salesperson_id(salesperson_id, page, fields, stream=stream)
 
 
 @router.get(
     path="/car_id/{car_id}",
-    response_model=BaseResponse[List[OrderSchema]],
+    response_model=PaginatedResponse[List[OrderReadSchema]],
     summary="Get orders by car's ID",
     description="""
-    Fetch all orders tied to a particular car ID.
+    Fetch all orders tied to a particular car ID, one page at a time.
+    Send `Accept: application/x-ndjson` to stream all of them as NDJSON, one record per line, instead.
     
     Returns 404 if the car does not exist.
     """,
@@ -150,28 +179,93 @@ async def get_orders_by_salesperson_id(
 )
 async def get_orders_by_car_id(
         car_id: int,
+        page: Annotated[PageParams, Depends(page_params)],
+        fields: Annotated[Optional[Tuple[str, ...]], Depends(order_fields)],
+        stream: Annotated[bool, Depends(stream_requested)],
         service: Annotated[OrdersService, Depends(orders_service)]
 ):
     """
     Endpoint to retrieve orders referencing a specific car.
     """
-    return await service.get_by_car_id(car_id)
+    return await service.get_by_car_id(car_id, page, fields, stream=stream)
 
 
 @router.get(
     path="/",
-    response_model=BaseResponse[List[OrderSchema]],
+    response_model=PaginatedResponse[List[OrderReadSchema]],
     summary="Get all orders",
     description="""
-    Fetch all orders in the system.
+    Fetch all orders in the system, one page at a time.
+    Send `Accept: application/x-ndjson` to stream all of them as NDJSON, one record per line, instead.
     """,
     responses=get_all_orders_responses
 )
-async def get_all_orders(service: Annotated[OrdersService, Depends(orders_service)]):
+@compression_level(CompressionLevel.best)
+async def get_all_orders(
+        page: Annotated[PageParams, Depends(page_params)],
+        fields: Annotated[Optional[Tuple[str, ...]], Depends(order_fields)],
+        stream: Annotated[bool, Depends(stream_requested)],
+        service: Annotated[OrdersService, Depends(orders_service)]
+):
+    """
+    Endpoint to retrieve a page of existing orders.
+    """
+    return await service.get_all(page, fields, stream=stream)
+
+
+@router.get(
+    path="/sales/leaderboard",
+    response_model=BaseResponse[List[SalespersonSalesSchema]],
+    summary="Get sales leaderboard",
+    description="""
+    Salespeople with the highest revenue (sum of the prices of the ordered cars) in a period,
+    with their number of orders.
+    Read from per-day sales rollups, so it costs the same however many orders there are.
+    
+    - `date_from` and `date_to` are inclusive days of order creation, the period is unbounded without them.
+    - Pass `status` to count only orders with it, e.g. 'completed'.
+    - Returns 400 if `date_from` is later than `date_to`.
+    """,
+    responses=get_sales_leaderboard_responses
+)
+async def get_sales_leaderboard(
+        service: Annotated[OrdersService, Depends(orders_service)],
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        status: Optional[OrderStatus] = None,
+        limit: Annotated[int, Query(ge=1, le=MAX_PAGE_LIMIT, description="Maximum number of salespeople.")]
+        = DEFAULT_PAGE_LIMIT
+):
+    """
+    Endpoint to retrieve the sales leaderboard.
+    """
+    return await service.get_sales_leaderboard(limit, date_from, date_to, status)
+
+
+@router.get(
+    path="/sales/salesperson_id/{salesperson_id}",
+    response_model=BaseResponse[List[DailySalesSchema]],
+    summary="Get sales by salesperson's ID",
+    description="""
+    Number of orders and revenue of a salesperson per day and status in a period, from per-day sales rollups.
+    
+    - `date_from` and `date_to` are inclusive days of order creation, the period is unbounded without them.
+    - Pass `status` to get only orders with it.
+    - Returns 400 if `date_from` is later than `date_to`.
+    """,
+    responses=get_sales_by_salesperson_id_responses
+)
+async def get_sales_by_salesperson_id(
+        salesperson_id: int,
+        service: Annotated[OrdersService, Depends(orders_service)],
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None,
+        status: Optional[OrderStatus] = None
+):
     """
-    Endpoint to retrieve all existing orders.
+    Endpoint to retrieve daily sales of a salesperson.
     """
-    return await service.get_all()
+    return await service.get_sales_by_salesperson_id(salesperson_id, date_from, date_to, status)
 
 
 @router.patch(
@@ -183,19 +277,24 @@ async def get_all_orders(service: Annotated[OrdersService, Depends(orders_servic
     
     - Checks for updated user_id, salesperson_id, or car_id, and validates existence/roles.
     - Returns 404 if the order or related entities don't exist, or 400 if role mismatch and 400 if payload is empty.
+    - With `If-Match`, the order is updated only if it still has that ETag, otherwise returns 412.
     """,
     responses=update_order_responses
 )
 async def update_order_by_order_id(
         order_id: int,
         new_order: OrderUpdateSchema,
+        etags: Annotated[Optional[str], Depends(if_match)],
+        response: Response,
         service: Annotated[OrdersService, Depends(orders_service)]
 ):
     """
     Endpoint to partially update an order.
     """
     validate_payload(new_order) # If new_order schema is just {}, throws 400
-    return await service.update_by_id(order_id, new_order)
+    result = await service.update_by_id(order_id, new_order, if_match_versions(etags, order_id))
+    set_etag(response, result.data)
+    return result
 
 
 @router.delete(
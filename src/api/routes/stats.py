@@ -0,0 +1,153 @@
+from typing import Annotated, List, Optional
+
+from fastapi import APIRouter, Depends, Query
+
+from src.api.dependencies import stats_service
+from src.api.routing import ModelResponseRoute
+from src.services.stats import StatsService
+from src.api.responses.stats_responses import (
+    get_car_counts_responses,
+    get_car_prices_responses,
+    get_monthly_orders_responses,
+    refresh_stats_responses
+)
+from src.schemas.stats import CacheStatsSchema, CarCountSchema, CarPriceSchema, MonthlyOrdersSchema, PoolStatsSchema
+from src.schemas.base_response import BaseResponse, BaseStatusMessageResponse
+
+router = APIRouter(
+    prefix="/stats",
+    tags=["Stats"],
+    route_class=ModelResponseRoute  # Encodes returned envelopes without validating them again
+)
+
+
+@router.get(
+    path="/cars/counts",
+    response_model=BaseResponse[List[CarCountSchema]],
+    summary="Get car counts",
+    description="""
+    Number of cars per brand, engine and transmission.
+    
+    - Read from a materialized view, so it may lag behind the latest writes until the next refresh.
+    - Pass `brand` to get the counts of one brand only.
+    - Returns 500 if an unexpected error occurs.
+    """,
+    responses=get_car_counts_responses
+)
+async def get_car_counts(
+        service: Annotated[StatsService, Depends(stats_service)],
+        brand: Annotated[Optional[str], Query(max_length=255, description="Only cars of this brand.")] = None
+):
+    """
+    Endpoint to retrieve car counts.
+    """
+    return await service.get_car_counts(brand)
+
+
+@router.get(
+    path="/cars/prices",
+    response_model=BaseResponse[List[CarPriceSchema]],
+    summary="Get average car prices",
+    description="""
+    Average price (rounded to an integer) and number of cars per brand, model and year.
+    
+    - Read from a materialized view, so it may lag behind the latest writes until the next refresh.
+    - Pass `brand` to get the prices of one brand only.
+    - Returns 500 if an unexpected error occurs.
+    """,
+    responses=get_car_prices_responses
+)
+async def get_car_prices(
+        service: Annotated[StatsService, Depends(stats_service)],
+        brand: Annotated[Optional[str], Query(max_length=255, description="Only cars of this brand.")] = None
+):
+    """
+    Endpoint to retrieve average car prices.
+    """
+    return await service.get_car_prices(brand)
+
+
+@router.get(
+    path="/orders/monthly",
+    response_model=BaseResponse[List[MonthlyOrdersSchema]],
+    summary="Get monthly orders",
+    description="""
+    Number of orders per month of creation and status, `month` is the first day of the month.
+    
+    - Read from a materialized view, so it may lag behind the latest writes until the next refresh.
+    - Returns 500 if an unexpected error occurs.
+    """,
+    responses=get_monthly_orders_responses
+)
+async def get_monthly_orders(
+        service: Annotated[StatsService, Depends(stats_service)]
+):
+    """
+    Endpoint to retrieve monthly orders.
+    """
+    return await service.get_monthly_orders()
+
+
+@router.get(
+    path="/cache",
+    response_model=BaseResponse[CacheStatsSchema],
+    summary="Get entity cache stats",
+    description="""
+    Backend, hits and misses of the cache of users, cars and orders (records and pages of records).
+    
+    - Hits and misses are counted by each app process, so they are of the process that served the request.
+    - Evictions and size are reported by the 'memory' backend only, the 'redis' backend is shared by all processes.
+    - Waiting for a record that another request of the process is loading counts as a hit.
+    """
+)
+async def get_cache_stats(
+        service: Annotated[StatsService, Depends(stats_service)]
+):
+    """
+    Endpoint to retrieve entity cache stats.
+    """
+    return await service.get_cache_stats()
+
+
+@router.get(
+    path="/pools",
+    response_model=BaseResponse[List[PoolStatsSchema]],
+    summary="Get database pool stats",
+    description="""
+    Connections of the primary and replica connection pools: in use, idle and beyond `pool_size` now,
+    and the checkouts, new connections, timeouts and time spent waiting for a connection so far.
+    
+    - Each app process has its own pools, so they are of the process that served the request.
+    - A growing `wait_seconds_max` or any `timeouts` mean requests queue for connections: raise
+      DATABASE_POOL_SIZE / DATABASE_MAX_OVERFLOW, within the database's max_connections.
+    """
+)
+async def get_pool_stats(
+        service: Annotated[StatsService, Depends(stats_service)]
+):
+    """
+    Endpoint to retrieve database pool stats.
+    """
+    return await service.get_pool_stats()
+
+
+@router.post(
+    path="/refresh",
+    response_model=BaseStatusMessageResponse,
+    summary="Refresh stats",
+    description="""
+    Recompute all stats now instead of waiting for the scheduled refresh.
+    Reads of the stats are not blocked while they are recomputed.
+    
+    - Returns 409 if a refresh is running already.
+    - Returns 500 if an unexpected error occurs.
+    """,
+    responses=refresh_stats_responses
+)
+async def refresh_stats(
+        service: Annotated[StatsService, Depends(stats_service)]
+):
+    """
+    Endpoint to refresh stats.
+    """
+    return await service.refresh()
@@ -1,11 +1,14 @@
-from typing import Annotated, List
+from typing import Annotated, List, Optional, Tuple
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Body, Depends, Response
 from pydantic import EmailStr
 
-from src.api.dependencies import users_service
+from src.api.dependencies import users_service, page_params, user_fields, stream_requested, if_none_match, if_match
+from src.api.middlewares.compression import CompressionLevel, compression_level
+from src.api.routing import ModelResponseRoute
 from src.api.responses.users_responses import (
     create_user_responses,
+    bulk_create_users_responses,
     get_user_by_id_responses,
     get_user_by_email_responses,
     get_users_by_role_responses,
@@ -13,15 +16,19 @@ from src.api.responses.users_responses import (
     update_user_responses,
     delete_user_responses,
 )
-from src.schemas.users import UserCreateSchema, UserUpdateSchema, UserSchema
-from src.schemas.base_response import BaseResponse, BaseStatusMessageResponse
+from src.schemas.users import UserCreateSchema, UserUpdateSchema, UserSchema, UserReadSchema
+from src.schemas.base_response import BaseResponse, BaseStatusMessageResponse, BulkItemResult, PaginatedResponse
 from src.services.users import UsersService
 from src.utils.enums import Role
+from src.utils.bulk import BULK_MAX_ITEMS
+from src.utils.pagination import PageParams
+from src.utils.etag import conditional_get, if_match_versions, set_etag
 from src.utils.exception_handler import validate_payload  # Validates input data in api layer for patch end-point
 
 router = APIRouter(
     prefix="/users",
-    tags=["Users"]
+    tags=["Users"],
+    route_class=ModelResponseRoute  # Encodes returned envelopes without validating them again
 )
 
 
@@ -45,28 +52,54 @@ async def create_user(
     return await service.create(user)
 
 
+@router.post(
+    path="/bulk",
+    response_model=BaseResponse[List[BulkItemResult[UserSchema]]],
+    summary="Create many users",
+    description=f"""
+    Create up to {BULK_MAX_ITEMS} users in one request.
+
+    - Users are written in chunks, with one multi-row insert and one transaction per chunk.
+    - Every item gets its own result: created, or a conflict if its email already exists.
+    - Returns 400 if the payload is empty.
+    """,
+    responses=bulk_create_users_responses
+)
+async def create_users_bulk(
+        users: Annotated[List[UserCreateSchema], Body(max_length=BULK_MAX_ITEMS)],
+        service: Annotated[UsersService, Depends(users_service)]
+):
+    validate_payload(users)
+    return await service.create_many(users)
+
+
 @router.get(
     path="/{user_id}",
-    response_model=BaseResponse[UserSchema],
+    response_model=BaseResponse[UserReadSchema],
     summary="Get user by ID",
     description="""
     Retrieve detailed information about a specific user by their unique ID.
 
+    - The full user is returned with an `ETag`, send it back as `If-None-Match`
+      to get an empty 304 while the user is unchanged.
     - If no user is found with the given ID, a 404 Not Found status code will be returned.
     """,
     responses=get_user_by_id_responses
 )
 async def get_user_by_id(
         user_id: int,
+        fields: Annotated[Optional[Tuple[str, ...]], Depends(user_fields)],
+        etags: Annotated[Optional[str], Depends(if_none_match)],
+        response: Response,
         service: Annotated[UsersService, Depends(users_service)]
 ):
     filter_by = {"id": user_id}
-    return await service.get_one_by_filter(**filter_by)
+    return conditional_get(await service.get_one_by_filter(fields=fields, **filter_by), response, etags, fields)
 
 
 @router.get(
     path="/email/{user_email}",
-    response_model=BaseResponse[UserSchema],
+    response_model=BaseResponse[UserReadSchema],
     summary="Get user by email",
     description="""
     Retrieve a user by their email address.
@@ -78,48 +111,59 @@ async def get_user_by_id(
 )
 async def get_user_by_email(
         user_email: EmailStr,
+        fields: Annotated[Optional[Tuple[str, ...]], Depends(user_fields)],
         service: Annotated[UsersService, Depends(users_service)]
 ):
     filter_by = {"email": user_email}
-    return await service.get_one_by_filter(**filter_by)
+    return await service.get_one_by_filter(fields=fields, **filter_by)
 
 
 @router.get(
     path="/role/{role}",
-    response_model=BaseResponse[List[UserSchema]],
+    response_model=PaginatedResponse[List[UserReadSchema]],
     summary="Get users by role",
     description="""
-    Retrieve a list of users filtered by their role.
+    Retrieve a list of users filtered by their role, one page at a time.
+    Send `Accept: application/x-ndjson` to stream all of them as NDJSON, one record per line, instead.
 
-    - Returns users with the specified role.
+    - Returns users with the specified role and `next_cursor` for the next page.
     - If no users are found, an empty list will be returned with a 200 OK status code.
     """,
     responses=get_users_by_role_responses
 )
+@compression_level(CompressionLevel.best)
 async def get_users_by_role(
         role: Role,
+        page: Annotated[PageParams, Depends(page_params)],
+        fields: Annotated[Optional[Tuple[str, ...]], Depends(user_fields)],
+        stream: Annotated[bool, Depends(stream_requested)],
         service: Annotated[UsersService, Depends(users_service)]
 ):
     filter_by = {"role": role}
-    return await service.get_many_by_filter(**filter_by)
+    return await service.get_many_by_filter(page, fields, stream=stream, **filter_by)
 
 
 @router.get(
     path="/",
-    response_model=BaseResponse[List[UserSchema]],
+    response_model=PaginatedResponse[List[UserReadSchema]],
     summary="Get all users",
     description="""
-    Retrieve a complete list of all users in the system.
+    Retrieve a list of all users in the system, one page at a time.
+    Send `Accept: application/x-ndjson` to stream all of them as NDJSON, one record per line, instead.
 
-    - Returns all registered users.
+    - Returns a page of registered users ordered by ID and `next_cursor` for the next page.
     - If no users are found, an empty list will be returned with a 200 OK status code.
     """,
     responses=get_all_users_responses
 )
+@compression_level(CompressionLevel.best)
 async def get_all_users(
+        page: Annotated[PageParams, Depends(page_params)],
+        fields: Annotated[Optional[Tuple[str, ...]], Depends(user_fields)],
+        stream: Annotated[bool, Depends(stream_requested)],
         service: Annotated[UsersService, Depends(users_service)]
 ):
-    return await service.get_all()
+    return await service.get_all(page, fields, stream=stream)
 
 
 @router.patch(
@@ -129,9 +173,12 @@ async def get_all_users(
     description="""
     Update the details of a specific user by their unique ID.
 
-    - First, checks if a user with the given ID exists. If not, a 404 Not Found status code will be returned.
-    - If the email field is being updated, the system checks if another user already has the same email.
-      If a duplicate is found, a 409 Conflict status code will be returned.
+    - The user is updated in one statement, without reading it first.
+      If no user has the given ID, a 404 Not Found status code will be returned.
+    - If the email field is being updated and another user already has the same email,
+      a 409 Conflict status code will be returned.
+    - With `If-Match`, the user is updated only if they still have that ETag,
+      otherwise a 412 Precondition Failed status code will be returned.
     - You can update only the fields you need, leaving others unchanged.
     Users role may be: 'customer', 'manager', 'admin'
     """,
@@ -140,10 +187,14 @@ async def get_all_users(
 async def update_user_by_user_id(
         user_id: int,
         new_user: UserUpdateSchema,
+        etags: Annotated[Optional[str], Depends(if_match)],
+        response: Response,
         service: Annotated[UsersService, Depends(users_service)]
 ):
     validate_payload(new_user)
-    return await service.update_by_id(user_id, new_user)
+    result = await service.update_by_id(user_id, new_user, if_match_versions(etags, user_id))
+    set_etag(response, result.data)
+    return result
 
 
 @router.delete(
@@ -0,0 +1,71 @@
+import functools
+import inspect
+from typing import Any, Callable, Optional
+
+from fastapi import Response
+from fastapi.routing import APIRoute
+from pydantic import BaseModel
+
+JSON_MEDIA_TYPE = "application/json"
+SUB_RESPONSE_PARAM = "_model_route_response"  # Added to end-points that don't take the Response themselves
+
+
+def model_json_response(model: BaseModel, sub_response: Response, status_code: Optional[int]) -> Response:
+    """
+    Encodes a response model straight to JSON bytes with the compiled serializer of its class,
+    keeping the status code and headers set on the end-point's Response parameter (e.g. ETag).
+    """
+    response = Response(
+        content=model.__pydantic_serializer__.to_json(model),
+        status_code=sub_response.status_code or status_code or 200,
+        media_type=JSON_MEDIA_TYPE,
+    )
+    response.headers.raw.extend(sub_response.headers.raw)
+    return response
+
+
+class ModelResponseRoute(APIRoute):
+    """
+    Route that encodes the response models returned by its end-point (BaseResponse, PaginatedResponse, ...)
+    in one pass, instead of FastAPI dumping them to dicts, validating the dicts against `response_model`
+    and encoding them again. Services build their envelopes from validated input and typed rows,
+    so the output is trusted as is. `response_model` still documents the response in OpenAPI.
+
+    Anything else an end-point returns (a Response such as a stream or a 304, a dict) goes through FastAPI as usual.
+    """
+
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs: Any) -> None:
+        if inspect.iscoroutinefunction(endpoint):
+            endpoint = self._encode_models(endpoint, kwargs.get("status_code"))
+        super().__init__(path, endpoint, **kwargs)
+
+    @staticmethod
+    def _encode_models(endpoint: Callable[..., Any], status_code: Optional[int]) -> Callable[..., Any]:
+        """
+        Wraps the end-point, taking FastAPI's Response parameter (the end-point's own one if it has it)
+        to carry its headers over to the encoded response.
+        """
+        signature = inspect.signature(endpoint)
+        response_param = next(
+            (name for name, param in signature.parameters.items() if param.annotation is Response), None
+        )
+        if response_param is None:
+            parameters = [
+                *signature.parameters.values(),
+                inspect.Parameter(SUB_RESPONSE_PARAM, inspect.Parameter.KEYWORD_ONLY, annotation=Response),
+            ]
+            signature = signature.replace(parameters=parameters)
+
+        @functools.wraps(endpoint)
+        async def wrapper(**kwargs: Any) -> Any:
+            if response_param is None:
+                sub_response = kwargs.pop(SUB_RESPONSE_PARAM)
+            else:
+                sub_response = kwargs[response_param]
+            result = await endpoint(**kwargs)
+            if isinstance(result, BaseModel):
+                return model_json_response(result, sub_response, status_code)
+            return result
+
+        wrapper.__signature__ = signature  # Read by FastAPI to resolve the parameters, instead of the end-point's
+        return wrapper
@@ -0,0 +1,25 @@
+"""
+Rebuilds the sales_rollups table from orders.
+
+Rollups are maintained incrementally by every order write, with the price recorded on the order,
+so they only drift from the orders if either table was edited by hand. Run this to recompute them
+from the current orders, order writes wait until it is done.
+
+Run from the project root:
+    python -m src.commands.backfill_sales_rollups
+"""
+import asyncio
+
+from src.db.db import async_session_maker
+from src.repositories.sales_rollups import SalesRollupsRepository
+
+
+async def main() -> None:
+    async with async_session_maker() as session:
+        rollups = await SalesRollupsRepository(session).rebuild()
+        await session.commit()
+    print(f"Sales rollups rebuilt: {rollups} rows.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,4 +1,5 @@
-from src.models.models import Users, Cars, Orders
+from src.models.models import Users, Cars, Orders, SalesRollups, StatsRefreshes
+from src.models.views import VIEWS
 
 # This import is used for creating tables
 
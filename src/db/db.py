@@ -1,32 +1,85 @@
-from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase
-from src.utils.config import DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME
+from src.db.migrations import run_migrations
+from src.db.pool_metrics import MeteredPool, PoolMetrics
+from src.utils.config import (
+    DB_USER, DB_PASSWORD, DB_HOST, DB_PORT, DB_NAME, DB_REPLICA_URLS,
+    DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, DB_POOL_PRE_PING,
+    DB_STATEMENT_CACHE_SIZE, DB_PREPARED_STATEMENT_CACHE_SIZE
+)
+import asyncio
+import itertools
 import logging
 
 # Database configuration for connection
 DATABASE_URL = f"postgresql+asyncpg://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
 
+
+# Async engine with the pool settings from src/utils/config.py, metered by the pool's event hooks
+def create_engine(url: str) -> AsyncEngine:
+    return create_async_engine(
+        url,
+        poolclass=MeteredPool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+        connect_args={
+            "statement_cache_size": DB_STATEMENT_CACHE_SIZE,  # asyncpg's own cache
+            "prepared_statement_cache_size": DB_PREPARED_STATEMENT_CACHE_SIZE,  # SQLAlchemy's asyncpg adapter
+        },
+    )
+
+
 # Async engine for PostgreSQL
-engine = create_async_engine(DATABASE_URL)
+engine = create_engine(DATABASE_URL)
 
 # Async sessions
 async_session_maker = async_sessionmaker(engine, expire_on_commit=False)
 
+# Read replicas (optional), used in turn for read-only requests, see get_session in src/api/dependencies.py
+replica_engines = [create_engine(url) for url in DB_REPLICA_URLS]
+replica_session_makers = [async_sessionmaker(replica, expire_on_commit=False) for replica in replica_engines]
+_replica_turns = itertools.count()
+
+# Pool metrics of every engine, by name, reported by /stats/pools
+pool_metrics = {"primary": PoolMetrics.watch(engine)}
+pool_metrics.update({f"replica-{i}": PoolMetrics.watch(replica) for i, replica in enumerate(replica_engines)})
+
 
 # Base class for models in src/models/models.py
 class Base(DeclarativeBase):
     pass
 
 
-# Database initialization and table creating
+# Database initialization: applies pending schema migrations from src/db/migrations
 async def init_db():
-    async with engine.begin() as conn:
-        logging.info("Creating tables POSTGRESQL!")
-        await conn.run_sync(Base.metadata.create_all)
-    logging.info("Tables created!")
+    logging.info("Applying migrations POSTGRESQL!")
+    applied = await run_migrations(engine)
+    logging.info(f"Migrations applied: {applied or 'none, schema is up to date'}")
+
+
+# Applies pending migrations once before serving: in the gunicorn master before it forks the workers
+# (see gunicorn_conf.py), or before the development server starts. Closes its connections, no process inherits them
+def apply_migrations():
+    async def migrate():
+        try:
+            await init_db()
+        finally:
+            await engine.dispose()
+
+    asyncio.run(migrate())
 
 
 # Async sessions generator
 async def get_async_session():
     async with async_session_maker() as session:
         yield session
+
+
+# Round-robin choice of a replica session maker, None if no replicas are configured
+def next_replica_session_maker():
+    if not replica_session_makers:
+        return None
+    return replica_session_makers[next(_replica_turns) % len(replica_session_makers)]
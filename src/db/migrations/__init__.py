@@ -0,0 +1,5 @@
+from src.db.migrations.runner import run_migrations
+
+# Versioned schema migrations, applied at startup instead of Base.metadata.create_all.
+# Add a module to src/db/migrations/versions and to MIGRATIONS there for every schema change,
+# and declare the same change on the models in src/models/models.py (tests create tables from them).
@@ -0,0 +1,27 @@
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+SELECT_INDEX_VALID = text("SELECT indisvalid FROM pg_index WHERE indexrelid = to_regclass(:name)")
+
+
+async def create_index_concurrently(
+        conn: AsyncConnection,
+        name: str,
+        table: str,
+        columns: str,
+        method: str = "btree"
+) -> None:
+    """
+    Builds an index without locking writes to the table. Has to run outside a transaction,
+    see the TRANSACTIONAL flag of migrations.
+
+    A build that was interrupted (failed deploy, killed process) leaves an INVALID index behind,
+    which IF NOT EXISTS would keep, so it is dropped and built again.
+    """
+    result = await conn.execute(SELECT_INDEX_VALID, {"name": name})
+    if result.scalar_one_or_none() is False:
+        logging.warning(f"Rebuilding invalid index {name}")
+        await conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    await conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} USING {method} ({columns})"))
@@ -0,0 +1,75 @@
+import asyncio
+import logging
+from types import ModuleType
+from typing import List, Sequence
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+from src.db.migrations.versions import MIGRATIONS
+
+# Key of the session-level advisory lock, so app instances starting together don't migrate at the same time
+MIGRATIONS_LOCK_ID = 72_617_001
+# Seconds between attempts to take the lock. Waiting inside pg_advisory_lock would keep a snapshot open,
+# and CREATE INDEX CONCURRENTLY of the instance holding the lock waits for every older snapshot: a deadlock
+# the database can't detect, since the lock is released only once the index is built
+LOCK_POLL_SECONDS = 0.5
+
+CREATE_VERSIONS_TABLE = text("""
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        description VARCHAR(255) NOT NULL,
+        applied_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now() NOT NULL
+    )
+""")
+SELECT_VERSIONS = text("SELECT version FROM schema_migrations")
+INSERT_VERSION = text("INSERT INTO schema_migrations (version, description) VALUES (:version, :description)")
+
+
+async def _apply(engine: AsyncEngine, migration: ModuleType) -> None:
+    """
+    Applies one migration and records its version: in one transaction, or statement by statement
+    in autocommit mode if the migration is not TRANSACTIONAL (e.g. CREATE INDEX CONCURRENTLY).
+    """
+    params = {"version": migration.VERSION, "description": migration.DESCRIPTION}
+    if migration.TRANSACTIONAL:
+        async with engine.begin() as conn:
+            await migration.upgrade(conn)
+            await conn.execute(INSERT_VERSION, params)
+        return
+
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await migration.upgrade(conn)  # Statements must be idempotent: a failure leaves the version unrecorded
+        await conn.execute(INSERT_VERSION, params)
+
+
+async def _lock(conn: AsyncConnection) -> None:
+    """
+    Takes the migrations lock, polling for it between statements so no snapshot is held while waiting.
+    """
+    while not (await conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": MIGRATIONS_LOCK_ID})).scalar():
+        await asyncio.sleep(LOCK_POLL_SECONDS)
+
+
+async def run_migrations(engine: AsyncEngine, migrations: Sequence[ModuleType] = MIGRATIONS) -> List[int]:
+    """
+    Applies the migrations that are not recorded in schema_migrations yet, in version order,
+    and returns their versions.
+    """
+    applied_now = []
+    async with engine.connect() as lock_conn:
+        lock_conn = await lock_conn.execution_options(isolation_level="AUTOCOMMIT")
+        await _lock(lock_conn)
+        try:
+            await lock_conn.execute(CREATE_VERSIONS_TABLE)
+            applied = set((await lock_conn.execute(SELECT_VERSIONS)).scalars())
+            for migration in sorted(migrations, key=lambda module: module.VERSION):
+                if migration.VERSION in applied:
+                    continue
+                logging.info(f"Applying migration {migration.VERSION}: {migration.DESCRIPTION}")
+                await _apply(engine, migration)
+                applied_now.append(migration.VERSION)
+        finally:
+            await lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATIONS_LOCK_ID})
+    return applied_now
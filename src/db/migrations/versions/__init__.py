@@ -0,0 +1,24 @@
+from src.db.migrations.versions import (
+    v0001_initial_schema,
+    v0002_filter_indexes,
+    v0003_car_search_indexes,
+    v0004_car_text_search,
+    v0005_car_trigram_search,
+    v0006_stats_views,
+    v0007_sales_rollups,
+    v0008_stats_refreshes,
+    v0009_order_prices,
+)
+
+# Applied in VERSION order, see run_migrations in src/db/migrations/runner.py
+MIGRATIONS = [
+    v0001_initial_schema,
+    v0002_filter_indexes,
+    v0003_car_search_indexes,
+    v0004_car_text_search,
+    v0005_car_trigram_search,
+    v0006_stats_views,
+    v0007_sales_rollups,
+    v0008_stats_refreshes,
+    v0009_order_prices,
+]
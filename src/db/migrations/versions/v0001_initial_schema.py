@@ -0,0 +1,90 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+VERSION = 1
+DESCRIPTION = "Initial schema: users, cars and orders"
+TRANSACTIONAL = True
+
+# The schema that Base.metadata.create_all used to create at startup. Every statement is idempotent,
+# so databases created by create_all are adopted as they are.
+STATEMENTS = (
+    """
+    DO $$ BEGIN
+        CREATE TYPE role AS ENUM ('customer', 'manager', 'admin');
+    EXCEPTION WHEN duplicate_object THEN NULL;
+    END $$
+    """,
+    """
+    DO $$ BEGIN
+        CREATE TYPE enginetype AS ENUM ('gasoline', 'electric', 'diesel');
+    EXCEPTION WHEN duplicate_object THEN NULL;
+    END $$
+    """,
+    """
+    DO $$ BEGIN
+        CREATE TYPE transmissiontype AS ENUM ('manual', 'automatic');
+    EXCEPTION WHEN duplicate_object THEN NULL;
+    END $$
+    """,
+    """
+    DO $$ BEGIN
+        CREATE TYPE orderstatus AS ENUM ('pending', 'completed', 'canceled');
+    EXCEPTION WHEN duplicate_object THEN NULL;
+    END $$
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS cars (
+        id SERIAL NOT NULL,
+        brand VARCHAR(255) NOT NULL,
+        model VARCHAR(255) NOT NULL,
+        price INTEGER NOT NULL,
+        year INTEGER NOT NULL,
+        color VARCHAR(50) NOT NULL,
+        mileage INTEGER NOT NULL,
+        transmission transmissiontype NOT NULL,
+        engine enginetype NOT NULL,
+        vin_number VARCHAR(17) NOT NULL,
+        created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now() NOT NULL,
+        updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now() NOT NULL,
+        PRIMARY KEY (id),
+        UNIQUE (vin_number)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_cars_id ON cars (id)",
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id SERIAL NOT NULL,
+        name VARCHAR(255) NOT NULL,
+        surname VARCHAR(255) NOT NULL,
+        email VARCHAR(255) NOT NULL,
+        role role NOT NULL,
+        created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now() NOT NULL,
+        updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now() NOT NULL,
+        PRIMARY KEY (id),
+        UNIQUE (email)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_users_id ON users (id)",
+    """
+    CREATE TABLE IF NOT EXISTS orders (
+        id SERIAL NOT NULL,
+        created_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now() NOT NULL,
+        updated_at TIMESTAMP WITHOUT TIME ZONE DEFAULT now() NOT NULL,
+        status orderstatus DEFAULT 'pending' NOT NULL,
+        comments VARCHAR(255) NOT NULL,
+        user_id INTEGER NOT NULL,
+        car_id INTEGER NOT NULL,
+        salesperson_id INTEGER NOT NULL,
+        PRIMARY KEY (id),
+        FOREIGN KEY (user_id) REFERENCES users (id),
+        FOREIGN KEY (car_id) REFERENCES cars (id),
+        FOREIGN KEY (salesperson_id) REFERENCES users (id)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_orders_id ON orders (id)",
+)
+
+
+async def upgrade(conn: AsyncConnection) -> None:
+    for statement in STATEMENTS:
+        await conn.execute(text(statement))
@@ -0,0 +1,27 @@
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.db.migrations.operations import create_index_concurrently
+
+VERSION = 2
+DESCRIPTION = "Indexes for the columns that list end-points filter by"
+TRANSACTIONAL = False  # CREATE INDEX CONCURRENTLY can't run in a transaction
+
+# (name, table, columns). Lists filter by one column and page by id (WHERE col = $1 AND id > $2 ORDER BY id LIMIT n),
+# so every index is (col, id): one range scan per page, no sort. The orders ones also back the foreign keys,
+# so deleting a user or a car no longer scans orders.
+# No partial indexes: filter values are bound parameters, and a partial index predicate can't be proven
+# for the generic plans of prepared statements, so the planner would stop using them after a few executions.
+INDEXES = (
+    ("ix_orders_user_id_id", "orders", "user_id, id"),
+    ("ix_orders_car_id_id", "orders", "car_id, id"),
+    ("ix_orders_salesperson_id_id", "orders", "salesperson_id, id"),
+    ("ix_orders_status_id", "orders", "status, id"),
+    ("ix_cars_engine_id", "cars", "engine, id"),
+    ("ix_cars_transmission_id", "cars", "transmission, id"),
+    ("ix_users_role_id", "users", "role, id"),
+)
+
+
+async def upgrade(conn: AsyncConnection) -> None:
+    for name, table, columns in INDEXES:
+        await create_index_concurrently(conn, name, table, columns)
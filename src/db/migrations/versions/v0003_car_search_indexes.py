@@ -0,0 +1,23 @@
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.db.migrations.operations import create_index_concurrently
+
+VERSION = 3
+DESCRIPTION = "Indexes for car search: sort fields and brand/model lists"
+TRANSACTIONAL = False  # CREATE INDEX CONCURRENTLY can't run in a transaction
+
+# (name, table, columns). Search pages are ORDER BY <sort>, id LIMIT n with WHERE (<sort>, id) > cursor,
+# so every sort field gets a (sort, id) index: a range filter on the same field uses it too, other filters are
+# checked on the rows it returns. brand/model lists are the most selective filters, so they get their own index.
+INDEXES = (
+    ("ix_cars_price_id", "cars", "price, id"),
+    ("ix_cars_year_id", "cars", "year, id"),
+    ("ix_cars_mileage_id", "cars", "mileage, id"),
+    ("ix_cars_created_at_id", "cars", "created_at, id"),
+    ("ix_cars_brand_model", "cars", "brand, model"),
+)
+
+
+async def upgrade(conn: AsyncConnection) -> None:
+    for name, table, columns in INDEXES:
+        await create_index_concurrently(conn, name, table, columns)
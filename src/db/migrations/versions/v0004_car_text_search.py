@@ -0,0 +1,20 @@
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.db.migrations.operations import create_index_concurrently
+
+VERSION = 4
+DESCRIPTION = "Full-text index for car text search"
+TRANSACTIONAL = False  # CREATE INDEX CONCURRENTLY can't run in a transaction
+
+
+async def upgrade(conn: AsyncConnection) -> None:
+    # An expression index instead of a stored tsvector column: adding a generated column rewrites
+    # the whole table under an exclusive lock, an index is built concurrently.
+    # Same expression as CAR_SEARCH_DOCUMENT in src/models/models.py (frozen here, as every migration)
+    await create_index_concurrently(
+        conn,
+        "ix_cars_search_document",
+        "cars",
+        "to_tsvector('simple', brand || ' ' || model || ' ' || color)",
+        method="gin"
+    )
@@ -0,0 +1,26 @@
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from src.db.migrations.operations import create_index_concurrently
+
+VERSION = 5
+DESCRIPTION = "Trigram index for typo-tolerant car text search (if pg_trgm is available)"
+TRANSACTIONAL = False  # CREATE INDEX CONCURRENTLY can't run in a transaction
+
+# Not declared on the models: tables created from the models must work without the extension
+INDEX_NAME = "ix_cars_search_trgm"
+
+
+async def upgrade(conn: AsyncConnection) -> None:
+    result = await conn.execute(text("SELECT EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm')"))
+    if not result.scalar_one():
+        logging.warning("pg_trgm is not available, car text search will not tolerate typos")
+        return
+
+    await conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    # Same expression as CAR_SEARCH_TEXT in src/models/models.py
+    await create_index_concurrently(
+        conn, INDEX_NAME, "cars", "(brand || ' ' || model || ' ' || color) gin_trgm_ops", method="gin"
+    )
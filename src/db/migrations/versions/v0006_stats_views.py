@@ -0,0 +1,33 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+VERSION = 6
+DESCRIPTION = "Materialized views of car and order aggregates for /stats end-points"
+TRANSACTIONAL = True
+
+# Frozen copy of VIEWS in src/models/views.py as of this version. The views are filled once here,
+# then refreshed concurrently (see src/utils/stats_refresher.py), which requires the unique indexes.
+STATEMENTS = (
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS car_counts_mv AS
+    SELECT brand, engine, transmission, count(*) AS cars FROM cars GROUP BY brand, engine, transmission
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_car_counts_mv ON car_counts_mv (brand, engine, transmission)",
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS car_prices_mv AS
+    SELECT brand, model, year, round(avg(price))::integer AS average_price, count(*) AS cars
+    FROM cars GROUP BY brand, model, year
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_car_prices_mv ON car_prices_mv (brand, model, year)",
+    """
+    CREATE MATERIALIZED VIEW IF NOT EXISTS monthly_orders_mv AS
+    SELECT date_trunc('month', created_at)::date AS month, status, count(*) AS orders
+    FROM orders GROUP BY 1, 2
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS ux_monthly_orders_mv ON monthly_orders_mv (month, status)",
+)
+
+
+async def upgrade(conn: AsyncConnection) -> None:
+    for statement in STATEMENTS:
+        await conn.execute(text(statement))
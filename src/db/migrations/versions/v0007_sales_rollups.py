@@ -0,0 +1,36 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+VERSION = 7
+DESCRIPTION = "Sales rollups per salesperson, day and status, backfilled from orders"
+TRANSACTIONAL = True
+
+# The backfill runs in the same transaction as the table, after LOCK TABLE orders: order writes of running
+# app instances wait for it, so none of them is missing from the rollups. ON CONFLICT DO NOTHING keeps rollups
+# of a table created by create_all, they are maintained already.
+STATEMENTS = (
+    """
+    CREATE TABLE IF NOT EXISTS sales_rollups (
+        salesperson_id INTEGER NOT NULL,
+        day DATE NOT NULL,
+        status orderstatus NOT NULL,
+        orders INTEGER NOT NULL,
+        revenue BIGINT NOT NULL,
+        PRIMARY KEY (salesperson_id, day, status)
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_sales_rollups_day ON sales_rollups (day)",
+    "LOCK TABLE orders IN SHARE MODE",
+    """
+    INSERT INTO sales_rollups (salesperson_id, day, status, orders, revenue)
+    SELECT orders.salesperson_id, CAST(orders.created_at AS DATE), orders.status, count(*), sum(cars.price)
+    FROM orders JOIN cars ON cars.id = orders.car_id
+    GROUP BY 1, 2, 3
+    ON CONFLICT DO NOTHING
+    """,
+)
+
+
+async def upgrade(conn: AsyncConnection) -> None:
+    for statement in STATEMENTS:
+        await conn.execute(text(statement))
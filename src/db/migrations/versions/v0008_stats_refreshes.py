@@ -0,0 +1,23 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+VERSION = 8
+DESCRIPTION = "Last refresh of the stats views, shared by all app instances"
+TRANSACTIONAL = True
+
+# Empty until the first refresh, which is then due for every instance
+STATEMENTS = (
+    """
+    CREATE TABLE IF NOT EXISTS stats_refreshes (
+        id INTEGER NOT NULL,
+        refreshed_at TIMESTAMP WITHOUT TIME ZONE NOT NULL,
+        writes_at_refresh BIGINT NOT NULL,
+        PRIMARY KEY (id)
+    )
+    """,
+)
+
+
+async def upgrade(conn: AsyncConnection) -> None:
+    for statement in STATEMENTS:
+        await conn.execute(text(statement))
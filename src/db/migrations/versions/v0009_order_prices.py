@@ -0,0 +1,27 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+VERSION = 9
+DESCRIPTION = "Price each order counts for in the sales rollups, rollups rebuilt from it"
+TRANSACTIONAL = True
+
+# Existing orders get the current price of their car, the rollups are rebuilt from those prices so that
+# later order writes subtract exactly what was added. ALTER TABLE locks orders until the end of the transaction,
+# order writes of running app instances wait for it.
+STATEMENTS = (
+    "ALTER TABLE orders ADD COLUMN IF NOT EXISTS price INTEGER",
+    "UPDATE orders SET price = cars.price FROM cars WHERE cars.id = orders.car_id AND orders.price IS NULL",
+    "ALTER TABLE orders ALTER COLUMN price SET NOT NULL",
+    "DELETE FROM sales_rollups",
+    """
+    INSERT INTO sales_rollups (salesperson_id, day, status, orders, revenue)
+    SELECT salesperson_id, CAST(created_at AS DATE), status, count(*), sum(price)
+    FROM orders
+    GROUP BY 1, 2, 3
+    """,
+)
+
+
+async def upgrade(conn: AsyncConnection) -> None:
+    for statement in STATEMENTS:
+        await conn.execute(text(statement))
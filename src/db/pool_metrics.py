@@ -0,0 +1,94 @@
+import time
+from typing import Any, Dict, Optional
+
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry
+
+WAIT_KEY = "checkout_wait_seconds"  # Set on a connection record by MeteredPool, read by the checkout hook
+
+
+class MeteredPool(AsyncAdaptedQueuePool):
+    """
+    Queue pool that times each checkout: waiting for a free connection, or opening a new one in the overflow.
+    The wait is handed to the checkout hook of PoolMetrics on the record's info, timeouts are counted directly.
+    """
+
+    metrics: Optional["PoolMetrics"] = None  # Set by PoolMetrics.watch
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        started = time.perf_counter()
+        try:
+            record = super()._do_get()
+        except exc.TimeoutError:
+            if self.metrics is not None:
+                self.metrics.timeouts += 1
+            raise
+        record.info[WAIT_KEY] = time.perf_counter() - started
+        return record
+
+    def recreate(self) -> "MeteredPool":
+        pool = super().recreate()  # On engine.dispose(), the event hooks are carried over by SQLAlchemy
+        pool.metrics = self.metrics
+        return pool
+
+
+class PoolMetrics:
+    """
+    Counters of an engine's connection pool, kept up to date by the pool's event hooks
+    (checkout, checkin, connect, invalidate), next to the pool's own gauges (checked out, overflow, idle).
+    Each app process has its own pools, so the figures are of one process.
+    """
+
+    def __init__(self, engine: AsyncEngine) -> None:
+        self.engine = engine
+        self.checkouts = 0
+        self.connects = 0  # New database connections, at most pool_size + max_overflow at a time
+        self.invalidations = 0  # Connections dropped as broken, e.g. by the pre-ping
+        self.timeouts = 0  # Checkouts that gave up after DB_POOL_TIMEOUT seconds
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.checked_out_peak = 0
+
+    @classmethod
+    def watch(cls, engine: AsyncEngine) -> "PoolMetrics":
+        """
+        Attaches the event hooks to the engine's pool, which must be a MeteredPool (see create_engine in db.py).
+        """
+        metrics = cls(engine)
+        pool = engine.sync_engine.pool
+        pool.metrics = metrics
+        event.listen(pool, "checkout", metrics._on_checkout)
+        event.listen(pool, "connect", metrics._on_connect)
+        event.listen(pool, "invalidate", metrics._on_invalidate)
+        return metrics
+
+    def _on_checkout(self, dbapi_connection: Any, record: ConnectionPoolEntry, proxy: Any) -> None:
+        self.checkouts += 1
+        wait = record.info.pop(WAIT_KEY, 0.0)
+        self.wait_seconds_total += wait
+        self.wait_seconds_max = max(self.wait_seconds_max, wait)
+        self.checked_out_peak = max(self.checked_out_peak, self.engine.sync_engine.pool.checkedout())
+
+    def _on_connect(self, dbapi_connection: Any, record: ConnectionPoolEntry) -> None:
+        self.connects += 1
+
+    def _on_invalidate(self, dbapi_connection: Any, record: ConnectionPoolEntry, exception: Any) -> None:
+        self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        pool = self.engine.sync_engine.pool
+        return {
+            "pool_size": pool.size(),
+            "max_overflow": pool._max_overflow,
+            "checked_out": pool.checkedout(),
+            "checked_out_peak": self.checked_out_peak,
+            "overflow": max(pool.overflow(), 0),  # Negative while the pool has not opened pool_size connections yet
+            "idle": pool.checkedin(),
+            "checkouts": self.checkouts,
+            "connects": self.connects,
+            "invalidations": self.invalidations,
+            "timeouts": self.timeouts,
+            "wait_seconds_total": self.wait_seconds_total,
+            "wait_seconds_max": self.wait_seconds_max,
+        }
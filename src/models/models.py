@@ -1,6 +1,6 @@
-from datetime import datetime
+from datetime import date, datetime
 
-from sqlalchemy import Integer, String, ForeignKey, DateTime, Enum as SAEnum
+from sqlalchemy import BigInteger, Date, Integer, String, ForeignKey, DateTime, Index, text, Enum as SAEnum
 from sqlalchemy.orm import relationship, Mapped, mapped_column
 from sqlalchemy.sql import func
 
@@ -10,10 +10,23 @@ from src.schemas.users import UserSchema
 from src.schemas.cars import CarSchema
 from src.schemas.orders import OrderSchema
 
+# Text of a car matched by text search and its full-text document ('simple' config: brands and models are names,
+# not words to stem). Indexes and queries share them as literal SQL, so the planner sees the same expression
+# and uses the indexes, see src/db/migrations/versions/v0004_car_text_search.py
+CAR_SEARCH_TEXT = "brand || ' ' || model || ' ' || color"
+CAR_SEARCH_DOCUMENT = f"to_tsvector('simple', {CAR_SEARCH_TEXT})"
+
 
 # Models
 class Orders(Base):
     __tablename__ = "orders"
+    # Filtered columns are indexed with id for keyset pages, created by src/db/migrations/versions/v0002_filter_indexes.py
+    __table_args__ = (
+        Index("ix_orders_user_id_id", "user_id", "id"),
+        Index("ix_orders_car_id_id", "car_id", "id"),
+        Index("ix_orders_salesperson_id_id", "salesperson_id", "id"),
+        Index("ix_orders_status_id", "status", "id"),
+    )
 
     # Primary Key
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
@@ -25,6 +38,9 @@ class Orders(Base):
     status: Mapped[OrderStatus] = mapped_column(SAEnum(OrderStatus), nullable=False,
                                                 server_default=OrderStatus.pending.value)
     comments: Mapped[str] = mapped_column(String(255), nullable=False)
+    # Price of the car when it was set on the order: the revenue the order counts for in sales_rollups,
+    # so later changes of the car's price don't change rollups. Not part of OrderSchema
+    price: Mapped[int] = mapped_column(Integer, nullable=False)
 
     # Foreign Keys
     user_id: Mapped[int] = mapped_column(Integer, ForeignKey("users.id"), nullable=False)
@@ -54,6 +70,9 @@ class Orders(Base):
 
 class Users(Base):
     __tablename__ = "users"
+    __table_args__ = (
+        Index("ix_users_role_id", "role", "id"),
+    )
 
     # Primary Key
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
@@ -91,6 +110,18 @@ class Users(Base):
 
 class Cars(Base):
     __tablename__ = "cars"
+    __table_args__ = (
+        Index("ix_cars_engine_id", "engine", "id"),
+        Index("ix_cars_transmission_id", "transmission", "id"),
+        # Car search, see src/db/migrations/versions/v0003_car_search_indexes.py
+        Index("ix_cars_price_id", "price", "id"),
+        Index("ix_cars_year_id", "year", "id"),
+        Index("ix_cars_mileage_id", "mileage", "id"),
+        Index("ix_cars_created_at_id", "created_at", "id"),
+        Index("ix_cars_brand_model", "brand", "model"),
+        # Text search, the optional trigram index is created by migrations only (it needs the pg_trgm extension)
+        Index("ix_cars_search_document", text(CAR_SEARCH_DOCUMENT), postgresql_using="gin"),
+    )
 
     # Primary Key
     id: Mapped[int] = mapped_column(Integer, primary_key=True, index=True)
@@ -130,3 +161,37 @@ class Cars(Base):
             created_at=self.created_at,
             updated_at=self.updated_at
         )
+
+
+class SalesRollups(Base):
+    """
+    Orders and revenue (sum of car prices) per salesperson, day of creation and status.
+    Kept up to date by OrdersService in the transaction of every order write, rebuilt from orders
+    by src/commands/backfill_sales_rollups.py. Rows whose orders went back to 0 are kept.
+    """
+    __tablename__ = "sales_rollups"
+    # Leaderboards read one period of days for all salespeople, see src/db/migrations/versions/v0007_sales_rollups.py
+    __table_args__ = (
+        Index("ix_sales_rollups_day", "day"),
+    )
+
+    # Primary Key
+    salesperson_id: Mapped[int] = mapped_column(Integer, primary_key=True)  # No foreign key, users can be deleted
+    day: Mapped[date] = mapped_column(Date, primary_key=True)
+    status: Mapped[OrderStatus] = mapped_column(SAEnum(OrderStatus), primary_key=True)
+
+    # Totals
+    orders: Mapped[int] = mapped_column(Integer, nullable=False)
+    revenue: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+
+class StatsRefreshes(Base):
+    """
+    Last refresh of the /stats materialized views: one row (id 1) shared by all app instances and workers,
+    so they refresh the views once between them, see src/utils/stats_refresher.py.
+    """
+    __tablename__ = "stats_refreshes"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    refreshed_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    writes_at_refresh: Mapped[int] = mapped_column(BigInteger, nullable=False)  # write_count of StatsRepository
@@ -0,0 +1,59 @@
+from sqlalchemy import DDL, Date, Integer, String, column, event, table, Enum as SAEnum
+
+from src.db.db import Base
+from src.utils.enums import EngineType, OrderStatus, TransmissionType
+
+# Materialized views of the aggregates served by /stats end-points, refreshed by src/utils/stats_refresher.py.
+# Each one has a unique index over its group columns, REFRESH MATERIALIZED VIEW CONCURRENTLY requires it.
+# (name, query, unique index columns), the same as created by migration v0006
+VIEWS = (
+    (
+        "car_counts_mv",
+        "SELECT brand, engine, transmission, count(*) AS cars FROM cars GROUP BY brand, engine, transmission",
+        "brand, engine, transmission",
+    ),
+    (
+        "car_prices_mv",
+        "SELECT brand, model, year, round(avg(price))::integer AS average_price, count(*) AS cars "
+        "FROM cars GROUP BY brand, model, year",
+        "brand, model, year",
+    ),
+    (
+        "monthly_orders_mv",
+        "SELECT date_trunc('month', created_at)::date AS month, status, count(*) AS orders "
+        "FROM orders GROUP BY 1, 2",
+        "month, status",
+    ),
+)
+
+# Lightweight tables (not in Base.metadata, so create_all doesn't create them) to select from the views
+car_counts_view = table(
+    "car_counts_mv",
+    column("brand", String),
+    column("engine", SAEnum(EngineType)),
+    column("transmission", SAEnum(TransmissionType)),
+    column("cars", Integer),
+)
+car_prices_view = table(
+    "car_prices_mv",
+    column("brand", String),
+    column("model", String),
+    column("year", Integer),
+    column("average_price", Integer),
+    column("cars", Integer),
+)
+monthly_orders_view = table(
+    "monthly_orders_mv",
+    column("month", Date),
+    column("status", SAEnum(OrderStatus)),
+    column("orders", Integer),
+)
+
+# Base.metadata.create_all and drop_all (used by tests) create the views after the tables and drop them before,
+# the views depend on the tables
+for name, query, unique_columns in VIEWS:
+    event.listen(Base.metadata, "after_create", DDL(f"CREATE MATERIALIZED VIEW IF NOT EXISTS {name} AS {query}"))
+    event.listen(Base.metadata, "after_create", DDL(
+        f"CREATE UNIQUE INDEX IF NOT EXISTS ux_{name} ON {name} ({unique_columns})"
+    ))
+    event.listen(Base.metadata, "before_drop", DDL(f"DROP MATERIALIZED VIEW IF EXISTS {name}"))
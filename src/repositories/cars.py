@@ -1,6 +1,126 @@
+import re
+from typing import Any, List, Optional, Sequence, Tuple
+
+from sqlalchemy import ColumnElement, Integer, String, bindparam, func, literal_column, or_, text
+
+from src.utils.pagination import CountMode
 from src.utils.repository import SQLAlchemyRepository
-from src.models.models import Cars
+from src.models.models import Cars, CAR_SEARCH_DOCUMENT, CAR_SEARCH_TEXT
+from src.schemas.cars import CarSchema, CarPartialSchema
 
 
 class CarsRepository(SQLAlchemyRepository):
     model = Cars
+    schema = CarSchema
+    partial_schema = CarPartialSchema
+    cached = True  # Read by id or VIN number on every car page and order lookup
+    _in_filters = ("brand", "model", "color")  # See CarSearchSchema, `<column>_min`/`<column>_max` are ranges
+    _trigram_index_exists = None  # Checked on first text search, see _trigram_enabled
+
+    def _search_conditions(self, filter_keys: Tuple[str, ...]) -> List[ColumnElement]:
+        """
+        Conditions of car search for the given keys of CarSearchSchema, values are bound by _read_params.
+        """
+        columns = self.model.__table__.c
+        conditions = []
+        for key in filter_keys:
+            value = bindparam(f"filter_{key}", expanding=key in self._in_filters)
+            if key.endswith("_min"):
+                conditions.append(columns[key.removesuffix("_min")] >= value)
+            elif key.endswith("_max"):
+                conditions.append(columns[key.removesuffix("_max")] <= value)
+            elif key in self._in_filters:  # Expanding IN, so lists of any length share one statement
+                conditions.append(columns[key].in_(value))
+            else:
+                conditions.append(columns[key] == value)
+        return conditions
+
+    async def search(
+            self,
+            filters: dict,
+            limit: Optional[int] = None,
+            cursor: Optional[Tuple[Any, int]] = None,
+            order_by: str = "id",
+            fields: Optional[Sequence[str]] = None
+    ):
+        """
+        Fetches one keyset page of cars matching all `filters`, ordered by (order_by, id), in one statement:
+        WHERE <ranges> AND <IN lists> AND <equalities> AND (order_by, id) > <cursor> ORDER BY order_by, id LIMIT n
+        """
+        filter_keys = tuple(sorted(filters))
+        fields = self._normalize_fields(fields)
+        limited, after_cursor = limit is not None, cursor is not None
+        key = ("search", filter_keys, fields, order_by, limited, after_cursor)
+        statement = self._statements.get(key)
+        if statement is None:
+            statement = self._select(fields).where(*self._search_conditions(filter_keys))
+            statement = self._apply_keyset(statement, order_by, limited, after_cursor)
+            self._statements[key] = statement
+
+        result = await self.session.execute(statement, self._read_params(filters, limit, cursor, order_by))
+        return self._to_read_models(result.all(), fields)
+
+    async def count_search(self, mode: CountMode, filters: dict) -> int:
+        """
+        Counts cars matching all `filters` of search, exactly or by the planner's estimate.
+        """
+        filter_keys = tuple(sorted(filters))
+        return await self._count(
+            mode, ("count_search", filter_keys), lambda: self._search_conditions(filter_keys), self._read_params(filters)
+        )
+
+    async def _trigram_enabled(self) -> bool:
+        """
+        Checks (once per process) if migrations created the trigram index, which needs the pg_trgm extension.
+        """
+        if CarsRepository._trigram_index_exists is None:
+            result = await self.session.execute(
+                text("SELECT EXISTS (SELECT 1 FROM pg_indexes WHERE indexname = 'ix_cars_search_trgm')")
+            )
+            CarsRepository._trigram_index_exists = result.scalar_one()
+        return CarsRepository._trigram_index_exists
+
+    @staticmethod
+    def to_tsquery_terms(query: str) -> str:
+        """
+        Turns free text like "bmw x5" into the tsquery 'bmw:* & x5:*': every word must match, as a prefix,
+        so results show up while the user is still typing. Returns an empty string if there are no words.
+        """
+        return " & ".join(f"{word}:*" for word in re.findall(r"\w+", query.lower()))
+
+    async def text_search(self, query: str, limit: int, fields: Optional[Sequence[str]] = None):
+        """
+        Fetches the cars whose brand, model and color match the words of `query`, most relevant first,
+        in one statement on the GIN indexes over CAR_SEARCH_DOCUMENT (and CAR_SEARCH_TEXT with pg_trgm):
+
+        WHERE document @@ to_tsquery('bmw:* & x5:*') [OR 'bmw x5' <% text]
+        ORDER BY greatest(ts_rank(document, tsquery) [, word_similarity('bmw x5', text)]) DESC, id LIMIT n
+
+        The trigram part matches words with typos ("bwm x5"), ranked by their similarity.
+        """
+        fields = self._normalize_fields(fields)
+        trigram = await self._trigram_enabled()
+        key = ("text_search", fields, trigram)
+        statement = self._statements.get(key)
+        if statement is None:
+            document, search_text = literal_column(CAR_SEARCH_DOCUMENT), literal_column(CAR_SEARCH_TEXT)
+            tsquery = func.to_tsquery(literal_column("'simple'"), bindparam("tsquery", type_=String))
+            condition = document.op("@@")(tsquery)
+            rank = func.ts_rank(document, tsquery)
+            if trigram:
+                words = bindparam("query", type_=String)
+                condition = or_(condition, words.op("<%")(search_text))
+                rank = func.greatest(rank, func.word_similarity(words, search_text))
+            statement = (
+                self._select(fields)
+                .where(condition)
+                .order_by(rank.desc(), self.model.id)
+                .limit(bindparam("limit", type_=Integer))
+            )
+            self._statements[key] = statement
+
+        params = {"tsquery": self.to_tsquery_terms(query), "limit": limit}
+        if trigram:
+            params["query"] = query
+        result = await self.session.execute(statement, params)
+        return self._to_read_models(result.all(), fields)
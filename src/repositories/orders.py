@@ -1,6 +1,175 @@
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+
+from sqlalchemy import ColumnElement, Row, Select, delete, exists, insert, literal, select, true, update
+
+from src.utils.enums import Role
 from src.utils.repository import SQLAlchemyRepository
-from src.models.models import Orders
+from src.models.models import Cars, Orders, Users
+from src.schemas.orders import OrderSchema, OrderPartialSchema, OrderWriteResult
 
 
 class OrdersRepository(SQLAlchemyRepository):
     model = Orders
+    schema = OrderSchema
+    partial_schema = OrderPartialSchema
+    cached = True  # Read by id on every order page, listed by customer, salesperson and status
+    _check_names = ("order_exists", "customer_role", "salesperson_role", "car_exists")  # See OrderWriteResult
+    _previous_names = ("salesperson_id", "status", "price")  # Returned as previous_<name> by edit_checked
+
+    @staticmethod
+    def _related_checks(data: dict) -> List[ColumnElement]:
+        """
+        Builds the lookups of the customer, salesperson and car referenced in `data`
+        (only of those present), labeled as the fields of OrderWriteResult.
+        """
+        users, cars = Users.__table__, Cars.__table__
+        checks = []
+        if data.get("user_id") is not None:
+            checks.append(select(users.c.role).where(users.c.id == data["user_id"]).scalar_subquery()
+                          .label("customer_role"))
+        if data.get("salesperson_id") is not None:
+            checks.append(select(users.c.role).where(users.c.id == data["salesperson_id"]).scalar_subquery()
+                          .label("salesperson_role"))
+        if data.get("car_id") is not None:
+            checks.append(exists().where(cars.c.id == data["car_id"]).label("car_exists"))
+        return checks
+
+    @staticmethod
+    def _passing_conditions(checks_cte) -> List[ColumnElement]:
+        """
+        Conditions on the checks CTE that allow the write: related rows exist and have the right roles.
+        """
+        conditions = []
+        if "customer_role" in checks_cte.c:
+            conditions.append(checks_cte.c.customer_role == Role.customer)
+        if "salesperson_role" in checks_cte.c:
+            conditions.append(checks_cte.c.salesperson_role == Role.manager)
+        if "car_exists" in checks_cte.c:
+            conditions.append(checks_cte.c.car_exists)
+        return conditions
+
+    @staticmethod
+    def _car_price(car_id: int) -> ColumnElement:
+        """
+        The car's current price, recorded on the order the car is set on (see Orders.price).
+        """
+        cars = Cars.__table__
+        return select(cars.c.price).where(cars.c.id == car_id).scalar_subquery()
+
+    def _report(self, checks_cte, written_cte) -> Select:
+        """
+        Selects the checks and the written order (NULLs if nothing was written) as one row.
+        """
+        return select(checks_cte, written_cte).select_from(checks_cte.outerjoin(written_cte, true()))
+
+    def _to_write_result(self, row: Row) -> OrderWriteResult:
+        mapping = row._mapping
+        order = None
+        if mapping["id"] is not None:  # The order was written
+            order = self.schema.model_construct(**{field: mapping[field] for field in self.schema.model_fields})
+        checks = {key: mapping[key] for key in (*self._check_names, "price") if key in mapping}
+        previous = {
+            f"previous_{name}": mapping[f"previous_{name}"]
+            for name in self._previous_names if f"previous_{name}" in mapping
+        }
+        return OrderWriteResult(order=order, **checks, **previous)
+
+    def _returning_columns(self, price: bool = False) -> Tuple[ColumnElement, ...]:
+        columns = self.model.__table__.c
+        return (*(columns[field] for field in self.schema.model_fields), *((columns.price,) if price else ()))
+
+    async def create_checked(self, data: dict) -> OrderWriteResult:
+        """
+        Inserts the order only if its customer and salesperson exist with the 'customer' and 'manager' roles
+        and its car exists, in one statement:
+
+        WITH checks AS (SELECT <customer role>, <salesperson role>, <car exists>),
+             inserted AS (INSERT INTO orders ... SELECT <values> FROM checks WHERE <checks pass> RETURNING ...)
+        SELECT * FROM checks LEFT JOIN inserted ON true
+        """
+        table = self.model.__table__
+        checks_cte = select(*self._related_checks(data)).cte("checks")
+        values = (
+            select(
+                *(literal(value, type_=table.c[key].type).label(key) for key, value in data.items()),
+                self._car_price(data["car_id"]).label("price")
+            )
+            .select_from(checks_cte)
+            .where(*self._passing_conditions(checks_cte))
+        )
+        inserted_cte = (
+            insert(table)
+            .from_select([*data, "price"], values)
+            .returning(*self._returning_columns(price=True))
+            .cte("inserted")
+        )
+        result = await self.session.execute(self._report(checks_cte, inserted_cte))
+        write_result = self._to_write_result(result.one())
+        if write_result.order is not None:  # Failed checks write nothing, reads keep using the cache
+            self._written()
+        return write_result
+
+    async def edit_checked(
+            self,
+            id: int,
+            data: dict,
+            versions: Optional[Sequence[datetime]] = None
+    ) -> OrderWriteResult:
+        """
+        Updates the order only if it exists and the customer, salesperson and car being set pass the same
+        checks as in create_checked, in one statement (UPDATE ... WHERE EXISTS <checks pass> instead of INSERT ... SELECT).
+        If `versions` are passed, the order's updated_at must be one of them too (see edit_one).
+        The values the order had before the update are returned too, as previous_<name> in OrderWriteResult.
+        Setting another car records that car's price on the order.
+        """
+        # Same rule as in edit_one: None values are skipped, because all attributes in db are not nullable
+        filtered_data = {key: value for key, value in data.items() if value is not None}
+        values = dict(filtered_data)
+        if "car_id" in filtered_data:
+            values["price"] = self._car_price(filtered_data["car_id"])
+
+        table = self.model.__table__
+        order_exists = exists().where(table.c.id == id).label("order_exists")
+        checks_cte = select(order_exists, *self._related_checks(filtered_data)).cte("checks")
+        conditions = self._passing_conditions(checks_cte)
+        # UPDATE ... FROM (SELECT ... FOR UPDATE) previous: the lock is taken before the row is updated, so previous
+        # holds the latest committed values even if a concurrent update was waited for (RETURNING sees only new ones)
+        previous_orders = table.alias("previous_orders")
+        previous = (
+            select(previous_orders.c.id, *(previous_orders.c[name] for name in self._previous_names))
+            .where(previous_orders.c.id == id)
+            .with_for_update()
+            .subquery("previous")
+        )
+        statement = (
+            update(table)
+            .where(table.c.id == id, table.c.id == previous.c.id)
+            .values(**values)
+            .returning(
+                *self._returning_columns(price=True),
+                *(previous.c[name].label(f"previous_{name}") for name in self._previous_names)
+            )
+        )
+        if versions is not None:
+            statement = statement.where(table.c.updated_at.in_(versions))
+        if conditions:  # EXISTS instead of UPDATE ... FROM checks, which SQLAlchemy flags as a cartesian product
+            statement = statement.where(exists(select(1).select_from(checks_cte).where(*conditions)))
+        updated_cte = statement.cte("updated")
+        result = await self.session.execute(self._report(checks_cte, updated_cte))
+        write_result = self._to_write_result(result.one())
+        if write_result.order is not None:  # Failed checks write nothing, reads keep using the cache
+            self._written()
+        return write_result
+
+    async def delete_returning(self, id: int) -> Optional[OrderWriteResult]:
+        """
+        Deletes the order by ID and returns it as it was, with its price, or returns None if no order has this ID.
+        """
+        statement = delete(self.model).where(self.model.id == id).returning(*self._returning_columns(price=True))
+        result = await self.session.execute(statement)
+        row = result.one_or_none()
+        if row is None:
+            return None
+        self._written()
+        return self._to_write_result(row)
@@ -0,0 +1,159 @@
+from datetime import date
+from typing import List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import BigInteger, ColumnElement, Date, Integer, cast, delete, func, insert, select, text, union_all, Enum as SAEnum
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.models import Orders, SalesRollups
+from src.schemas.orders import DailySalesSchema, SalespersonSalesSchema
+from src.utils.enums import OrderStatus
+
+# Blocks order writes (they take ROW EXCLUSIVE) but not reads until the transaction ends
+LOCK_ORDERS = text("LOCK TABLE orders IN SHARE MODE")
+
+
+class RollupChange(NamedTuple):
+    """
+    One order entering (delta 1) or leaving (delta -1) the rollup of its salesperson, day and status.
+    """
+    salesperson_id: int
+    day: date
+    status: OrderStatus
+    price: int  # Revenue changes by the price the order counts for (Orders.price), not the car's current one
+    delta: int
+
+
+class SalesRollupsRepository:
+    """
+    Maintains and reads the sales_rollups table (see SalesRollups in src/models/models.py). Like other
+    repositories it only executes statements, the unit of work commits them with the order writes.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def apply(self, changes: Sequence[RollupChange]) -> None:
+        """
+        Adds the changes to their rollups in one statement, creating missing rollups:
+
+        INSERT INTO sales_rollups
+        SELECT <key>, sum(delta), sum(delta * price) FROM (<changes>) GROUP BY <key>
+        ON CONFLICT (<key>) DO UPDATE SET orders = orders + excluded.orders, revenue = revenue + excluded.revenue
+
+        Changes are grouped by rollup first, one INSERT ... ON CONFLICT can't update the same row twice.
+        """
+        table = SalesRollups.__table__
+        # Casts, the types of parameters in a UNION can't be inferred from the columns they are inserted into
+        changes_subquery = union_all(*(
+            select(
+                cast(change.salesperson_id, Integer).label("salesperson_id"),
+                cast(change.day, Date).label("day"),
+                cast(change.status, SAEnum(OrderStatus)).label("status"),
+                cast(change.price, Integer).label("price"),
+                cast(change.delta, Integer).label("delta"),
+            )
+            for change in changes
+        )).subquery("changes")
+        key = (changes_subquery.c.salesperson_id, changes_subquery.c.day, changes_subquery.c.status)
+        totals = (
+            select(
+                *key,
+                func.sum(changes_subquery.c.delta),
+                func.sum(changes_subquery.c.delta * changes_subquery.c.price),
+            )
+            .group_by(*key)
+        )
+        statement = pg_insert(table).from_select(["salesperson_id", "day", "status", "orders", "revenue"], totals)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c.salesperson_id, table.c.day, table.c.status],
+            set_={
+                "orders": table.c.orders + statement.excluded.orders,
+                "revenue": table.c.revenue + statement.excluded.revenue,
+            }
+        )
+        await self.session.execute(statement)
+
+    async def leaderboard(
+            self,
+            limit: int,
+            date_from: Optional[date] = None,
+            date_to: Optional[date] = None,
+            status: Optional[OrderStatus] = None
+    ) -> List[SalespersonSalesSchema]:
+        """
+        Returns the `limit` salespeople with the highest revenue in the period (days inclusive),
+        counting orders of `status` only if it is passed.
+        """
+        table = SalesRollups.__table__
+        revenue = cast(func.sum(table.c.revenue), BigInteger)  # sum() of BIGINT is NUMERIC
+        statement = (
+            select(
+                table.c.salesperson_id,
+                func.sum(table.c.orders).label("orders"),
+                revenue.label("revenue"),
+            )
+            .where(*self._period_conditions(date_from, date_to, status))
+            .group_by(table.c.salesperson_id)
+            .having(func.sum(table.c.orders) > 0)
+            .order_by(revenue.desc(), table.c.salesperson_id)
+            .limit(limit)
+        )
+        result = await self.session.execute(statement)
+        return [SalespersonSalesSchema.model_construct(**row) for row in result.mappings()]
+
+    async def daily_sales(
+            self,
+            salesperson_id: int,
+            date_from: Optional[date] = None,
+            date_to: Optional[date] = None,
+            status: Optional[OrderStatus] = None
+    ) -> List[DailySalesSchema]:
+        """
+        Returns the orders and revenue of the salesperson per day and status in the period (days inclusive).
+        """
+        table = SalesRollups.__table__
+        statement = (
+            select(table.c.day, table.c.status, table.c.orders, table.c.revenue)
+            .where(
+                table.c.salesperson_id == salesperson_id,
+                table.c.orders > 0,
+                *self._period_conditions(date_from, date_to, status)
+            )
+            .order_by(table.c.day, table.c.status)
+        )
+        result = await self.session.execute(statement)
+        return [DailySalesSchema.model_construct(**row) for row in result.mappings()]
+
+    async def rebuild(self) -> int:
+        """
+        Recomputes all rollups from orders and returns their number. Order writes wait until the transaction ends,
+        so none of them is lost between the recomputation and the incremental updates.
+        """
+        table, orders = SalesRollups.__table__, Orders.__table__
+        await self.session.execute(LOCK_ORDERS)
+        await self.session.execute(delete(table))
+        day = cast(orders.c.created_at, Date)
+        totals = (
+            select(orders.c.salesperson_id, day, orders.c.status, func.count(), func.sum(orders.c.price))
+            .group_by(orders.c.salesperson_id, day, orders.c.status)
+        )
+        statement = insert(table).from_select(["salesperson_id", "day", "status", "orders", "revenue"], totals)
+        result = await self.session.execute(statement)
+        return result.rowcount
+
+    @staticmethod
+    def _period_conditions(
+            date_from: Optional[date],
+            date_to: Optional[date],
+            status: Optional[OrderStatus]
+    ) -> List[ColumnElement]:
+        table = SalesRollups.__table__
+        conditions = []
+        if date_from is not None:
+            conditions.append(table.c.day >= date_from)
+        if date_to is not None:
+            conditions.append(table.c.day <= date_to)
+        if status is not None:
+            conditions.append(table.c.status == status)
+        return conditions
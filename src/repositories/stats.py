@@ -0,0 +1,93 @@
+from typing import List, Optional, Tuple
+
+from sqlalchemy import func, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.models.views import VIEWS, car_counts_view, car_prices_view, monthly_orders_view
+from src.schemas.stats import CarCountSchema, CarPriceSchema, MonthlyOrdersSchema
+
+# Key of the transaction-level advisory lock, so only one app instance refreshes the views at a time
+REFRESH_LOCK_ID = 72_617_002
+
+# Rows inserted, updated and deleted in the tables the views aggregate, since the statistics were reset
+WRITE_COUNT_STATEMENT = text("""
+    SELECT coalesce(sum(n_tup_ins + n_tup_upd + n_tup_del), 0)
+    FROM pg_stat_user_tables
+    WHERE relname IN ('cars', 'orders')
+""")
+
+# Seconds since the last refresh by any app instance (on the database clock) and the write count then
+LAST_REFRESH_STATEMENT = text("""
+    SELECT extract(epoch FROM CAST(clock_timestamp() AS TIMESTAMP) - refreshed_at), writes_at_refresh
+    FROM stats_refreshes
+    WHERE id = 1
+""")
+RECORD_REFRESH_STATEMENT = text("""
+    INSERT INTO stats_refreshes (id, refreshed_at, writes_at_refresh)
+    VALUES (1, CAST(clock_timestamp() AS TIMESTAMP), :writes)
+    ON CONFLICT (id) DO UPDATE SET refreshed_at = excluded.refreshed_at, writes_at_refresh = excluded.writes_at_refresh
+""")
+
+
+class StatsRepository:
+    """
+    Reads the aggregates of cars and orders from their materialized views (see src/models/views.py),
+    so every read is a scan of a few pre-computed rows instead of the tables, and refreshes the views.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def car_counts(self, brand: Optional[str] = None) -> List[CarCountSchema]:
+        view = car_counts_view.c
+        statement = select(car_counts_view).order_by(view.brand, view.engine, view.transmission)
+        if brand is not None:
+            statement = statement.where(view.brand == brand)
+        result = await self.session.execute(statement)
+        return [CarCountSchema.model_construct(**row) for row in result.mappings()]
+
+    async def car_prices(self, brand: Optional[str] = None) -> List[CarPriceSchema]:
+        view = car_prices_view.c
+        statement = select(car_prices_view).order_by(view.brand, view.model, view.year)
+        if brand is not None:
+            statement = statement.where(view.brand == brand)
+        result = await self.session.execute(statement)
+        return [CarPriceSchema.model_construct(**row) for row in result.mappings()]
+
+    async def monthly_orders(self) -> List[MonthlyOrdersSchema]:
+        view = monthly_orders_view.c
+        result = await self.session.execute(select(monthly_orders_view).order_by(view.month, view.status))
+        return [MonthlyOrdersSchema.model_construct(**row) for row in result.mappings()]
+
+    async def write_count(self) -> int:
+        """
+        Returns the number of rows written to cars and orders as counted by PostgreSQL statistics,
+        the difference between two calls is the write volume in between.
+        """
+        return await self.session.scalar(WRITE_COUNT_STATEMENT)
+
+    async def try_lock_refresh(self) -> bool:
+        """
+        Takes the refresh lock until the end of the transaction, returns False if another session holds it.
+        """
+        return await self.session.scalar(select(func.pg_try_advisory_xact_lock(REFRESH_LOCK_ID)))
+
+    async def last_refresh(self) -> Tuple[Optional[float], int]:
+        """
+        Returns the seconds since the views were last refreshed by any app instance (None if never)
+        and the write count at that refresh.
+        """
+        row = (await self.session.execute(LAST_REFRESH_STATEMENT)).first()
+        if row is None:
+            return None, 0
+        return float(row[0]), row[1]
+
+    async def refresh(self) -> None:
+        """
+        Recomputes every view concurrently: reads of the views are not blocked while it runs.
+        Records the refresh for every app instance, with the write count from before it.
+        """
+        writes = await self.write_count()
+        for name, _, _ in VIEWS:
+            await self.session.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {name}"))
+        await self.session.execute(RECORD_REFRESH_STATEMENT, {"writes": writes})
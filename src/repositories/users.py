@@ -1,6 +1,10 @@
 from src.utils.repository import SQLAlchemyRepository
 from src.models.models import Users
+from src.schemas.users import UserSchema, UserPartialSchema
 
 
 class UsersRepository(SQLAlchemyRepository):
     model = Users
+    schema = UserSchema
+    partial_schema = UserPartialSchema
+    cached = True  # Read by id or email on every user page and order lookup
@@ -1,5 +1,5 @@
 from typing import Optional, Generic, TypeVar
-from pydantic import BaseModel
+from pydantic import BaseModel, model_serializer
 
 T = TypeVar("T")  # Represents the type of data in the response
 
@@ -10,6 +10,29 @@ class BaseResponse(BaseModel, Generic[T]):
     data: Optional[T]  # Can be None
 
 
+class PaginatedResponse(BaseResponse[T], Generic[T]):
+    next_cursor: Optional[str] = None  # Pass it as `cursor` to get the next page, None on the last page
+    total: Optional[int] = None  # Number of matching records (exact or estimated), None unless `count` is passed
+
+
+class BulkItemResult(BaseModel, Generic[T]):
+    index: int  # Position of the item in the request payload
+    status: str
+    message: str
+    data: Optional[T] = None  # None if the item was not written
+
+
+class PartialSchema(BaseModel):
+    """
+    Base for schemas returned with sparse fieldsets (`fields=` query parameter):
+    only the fields that were set are serialized, instead of every field with None.
+    """
+
+    @model_serializer(mode="wrap")
+    def _serialize_set_fields(self, handler):
+        return {key: value for key, value in handler(self).items() if key in self.model_fields_set}
+
+
 class BaseStatusMessageResponse(BaseModel):
     status: str
     message: str
@@ -1,8 +1,10 @@
 from datetime import datetime
-from typing import Optional
+from typing import List, Optional, Union
 from pydantic import BaseModel
 
-from src.utils.enums import TransmissionType, EngineType
+from src.schemas.base_response import PartialSchema
+
+from src.utils.enums import TransmissionType, EngineType, CarSortField
 
 
 # Input schemas
@@ -30,6 +32,29 @@ class CarUpdateSchema(BaseModel):
     vin_number: Optional[str] = None
 
 
+class CarBulkUpdateSchema(CarUpdateSchema):
+    id: int
+
+
+class CarSearchSchema(BaseModel):
+    """
+    Filters and sort of car search, see car_search_params in src/api/dependencies.py.
+    Every filter is optional, the given ones are combined with AND. Ranges are inclusive, list filters match any of the values.
+    """
+    price_min: Optional[int] = None
+    price_max: Optional[int] = None
+    year_min: Optional[int] = None
+    year_max: Optional[int] = None
+    mileage_min: Optional[int] = None
+    mileage_max: Optional[int] = None
+    brand: Optional[List[str]] = None
+    model: Optional[List[str]] = None
+    color: Optional[List[str]] = None
+    engine: Optional[EngineType] = None
+    transmission: Optional[TransmissionType] = None
+    sort: CarSortField = CarSortField.id
+
+
 class CarSchema(BaseModel):
     id: int
     brand: str
@@ -44,3 +69,21 @@ class CarSchema(BaseModel):
     created_at: datetime
     updated_at: Optional[datetime] = None
 
+
+class CarPartialSchema(PartialSchema):
+    id: Optional[int] = None
+    brand: Optional[str] = None
+    model: Optional[str] = None
+    price: Optional[int] = None
+    year: Optional[int] = None
+    color: Optional[str] = None
+    mileage: Optional[int] = None
+    transmission: Optional[TransmissionType] = None
+    engine: Optional[EngineType] = None
+    vin_number: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+# Returned by read end-points: the full car, or only the fields requested with `fields=`
+CarReadSchema = Union[CarSchema, CarPartialSchema]
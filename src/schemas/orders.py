@@ -1,8 +1,10 @@
-from datetime import datetime
-from typing import Optional
+from datetime import date, datetime
+from typing import Optional, Union
 from pydantic import BaseModel
 
-from src.utils.enums import OrderStatus
+from src.schemas.base_response import PartialSchema
+
+from src.utils.enums import OrderStatus, Role
 
 
 class OrderCreateSchema(BaseModel):
@@ -30,3 +32,48 @@ class OrderSchema(BaseModel):
     comments: str
     created_at: datetime
     updated_at: Optional[datetime] = None
+
+
+class OrderPartialSchema(PartialSchema):
+    id: Optional[int] = None
+    user_id: Optional[int] = None
+    car_id: Optional[int] = None
+    salesperson_id: Optional[int] = None
+    status: Optional[OrderStatus] = None
+    comments: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+class OrderWriteResult(BaseModel):
+    """
+    Outcome of a checked order write (see OrdersRepository.create_checked): the written order,
+    or None with the checks that explain why. Checks that were not needed keep their passing defaults.
+    """
+    order: Optional[OrderSchema]
+    order_exists: bool = True  # False if the order to update does not exist
+    customer_role: Optional[Role] = Role.customer  # None if the customer does not exist
+    salesperson_role: Optional[Role] = Role.manager  # None if the salesperson does not exist
+    car_exists: bool = True
+    price: Optional[int] = None  # Revenue the written order counts for in sales_rollups, see Orders.price
+    # Values before a checked update that changed the order, None otherwise (see OrdersRepository.edit_checked)
+    previous_salesperson_id: Optional[int] = None
+    previous_status: Optional[OrderStatus] = None
+    previous_price: Optional[int] = None
+
+
+# Returned by read end-points: the full order, or only the fields requested with `fields=`
+OrderReadSchema = Union[OrderSchema, OrderPartialSchema]
+
+
+class SalespersonSalesSchema(BaseModel):
+    salesperson_id: int
+    orders: int
+    revenue: int  # Sum of the prices of the ordered cars
+
+
+class DailySalesSchema(BaseModel):
+    day: date
+    status: OrderStatus
+    orders: int
+    revenue: int  # Sum of the prices of the ordered cars
@@ -0,0 +1,54 @@
+from datetime import date
+from typing import Optional
+
+from pydantic import BaseModel
+
+from src.utils.enums import EngineType, OrderStatus, TransmissionType
+
+
+class CarCountSchema(BaseModel):
+    brand: str
+    engine: EngineType
+    transmission: TransmissionType
+    cars: int
+
+
+class CarPriceSchema(BaseModel):
+    brand: str
+    model: str
+    year: int
+    average_price: int
+    cars: int
+
+
+class MonthlyOrdersSchema(BaseModel):
+    month: date  # First day of the month
+    status: OrderStatus
+    orders: int
+
+
+class CacheStatsSchema(BaseModel):
+    backend: str  # 'memory' or 'redis', see CACHE_BACKEND
+    hits: int
+    misses: int
+    ttl_seconds: float
+    # Reported by the memory backend only
+    evictions: Optional[int] = None  # Least recently used entries dropped to stay within max_size
+    size: Optional[int] = None
+    max_size: Optional[int] = None
+
+
+class PoolStatsSchema(BaseModel):
+    engine: str  # 'primary', or 'replica-<n>' in the order of DATABASE_REPLICA_URLS
+    pool_size: int
+    max_overflow: int
+    checked_out: int  # Connections in use now
+    checked_out_peak: int
+    overflow: int  # Connections open now beyond pool_size
+    idle: int
+    checkouts: int
+    connects: int
+    invalidations: int
+    timeouts: int
+    wait_seconds_total: float  # Spent waiting for a connection (or opening one) over all checkouts
+    wait_seconds_max: float
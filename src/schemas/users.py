@@ -1,6 +1,8 @@
 from datetime import datetime
-from typing import Optional
+from typing import Optional, Union
 from pydantic import BaseModel, EmailStr
+
+from src.schemas.base_response import PartialSchema
 from src.utils.enums import Role
 
 
@@ -29,3 +31,15 @@ class UserSchema(BaseModel):
     updated_at: Optional[datetime] = None
 
 
+class UserPartialSchema(PartialSchema):
+    id: Optional[int] = None
+    name: Optional[str] = None
+    surname: Optional[str] = None
+    email: Optional[EmailStr] = None
+    role: Optional[Role] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+
+# Returned by read end-points: the full user, or only the fields requested with `fields=`
+UserReadSchema = Union[UserSchema, UserPartialSchema]
@@ -1,11 +1,20 @@
-from typing import Any, Dict, List, Optional
+import re
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Union
 
-from sqlalchemy.exc import NoResultFound
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 
-from src.schemas.base_response import BaseResponse, BaseStatusMessageResponse
-from src.schemas.cars import CarCreateSchema, CarUpdateSchema, CarSchema
-from src.utils.exception_handler import handle_exception, handle_exception_default_500
+from src.schemas.base_response import BaseResponse, BaseStatusMessageResponse, BulkItemResult, PaginatedResponse
+from src.schemas.cars import (
+    CarCreateSchema, CarUpdateSchema, CarBulkUpdateSchema, CarSearchSchema, CarSchema, CarReadSchema
+)
+from src.utils.bulk import bulk_response, chunked
+from src.utils.exception_handler import handle_exception, handle_exception_default_500, is_unique_violation
+from src.utils.pagination import PageParams, paginate
 from src.utils.repository import AbstractRepository
+from src.utils.streaming import ndjson_response
+from src.utils.unit_of_work import AbstractUnitOfWork
 
 
 class CarsService:
@@ -17,56 +26,95 @@ class CarsService:
     between the repository layer and the application layer.
     """
 
-    def __init__(self, cars_repo: AbstractRepository) -> None:
+    def __init__(self, cars_repo: AbstractRepository, uow: AbstractUnitOfWork) -> None:
         """
-        Initialize the CarsService with a car repository.
+        Initialize the CarsService with a car repository and the unit of work that commits its writes.
         """
         self.cars_repo = cars_repo
-
-    async def _check_car_existence(self, **filter_by) -> Optional[CarSchema]:
-        """
-        Helper method to check if a car exists based on the provided filter criteria.
-        """
-        try:
-            existing_car = await self.cars_repo.get_one(**filter_by)
-            return existing_car
-        except Exception as e:  # If error while checking for user existence throw HTTPException
-            handle_exception_default_500(e)
+        self.uow = uow
 
     async def add(self, car: CarCreateSchema) -> BaseResponse[CarSchema]:
         """
         Create a new car in the system.
 
-        1. Checks if a car with the given VIN number already exists.
-        2. If it doesn't exist, creates a new car record in the repository.
+        The car is inserted unless a car with the given VIN number already exists,
+        in one statement (INSERT ... ON CONFLICT DO NOTHING), so concurrent creates can't race.
         """
-        existing_car = await self._check_car_existence(vin_number=car.vin_number)
+        try:
+            cars_dict = car.model_dump()
+            created_car = await self.cars_repo.create_one_or_none(cars_dict, conflict_field="vin_number")
+            if created_car:
+                await self.uow.commit()
+        except Exception as e:
+            handle_exception_default_500(e)
 
-        if existing_car:
+        if not created_car:  # Nothing was inserted, the VIN number is taken
             handle_exception(
                 status_code=409,
                 custom_message=f"Car with vin_number: '{car.vin_number}' already exists.",
             )
 
+        return BaseResponse[CarSchema](
+            status="success",
+            message="Car created.",
+            data=created_car
+        )
+
+    async def add_many(self, cars: List[CarCreateSchema]) -> BaseResponse[List[BulkItemResult[CarSchema]]]:
+        """
+        Create many cars at once, with one multi-row INSERT and one commit per chunk of cars.
+
+        Cars whose VIN number already exists (in the database or earlier in the payload)
+        are reported as conflicts, the other cars are created.
+        """
+        results = []
         try:
-            cars_dict = car.model_dump()
-            created_car = await self.cars_repo.create_one(cars_dict)
-            return BaseResponse[CarSchema](
-                status="success",
-                message="Car created.",
-                data=created_car
-            )
+            for chunk in chunked(cars):
+                vin_numbers = [car.vin_number for _, car in chunk]
+                taken_vin_numbers = {
+                    existing_car.vin_number for existing_car in await self.cars_repo.get_many_in("vin_number", vin_numbers)
+                }
+
+                cars_to_create = []
+                for index, car in chunk:
+                    if car.vin_number in taken_vin_numbers:
+                        results.append(BulkItemResult[CarSchema](
+                            index=index,
+                            status="error",
+                            message=f"Car with vin_number: '{car.vin_number}' already exists."
+                        ))
+                        continue
+                    taken_vin_numbers.add(car.vin_number)  # Duplicates later in the payload are conflicts too
+                    cars_to_create.append((index, car))
+
+                if not cars_to_create:
+                    continue
+                created_cars = await self.cars_repo.create_many([car.model_dump() for _, car in cars_to_create])
+                await self.uow.commit()
+                for (index, _), created_car in zip(cars_to_create, created_cars):
+                    results.append(BulkItemResult[CarSchema](
+                        index=index,
+                        status="success",
+                        message="Car created.",
+                        data=created_car
+                    ))
         except Exception as e:
             handle_exception_default_500(e)
 
-    async def get_one_by_filter(self, **filter_by) -> BaseResponse[CarSchema]:
+        return bulk_response(results, CarSchema, entity_name="cars", action="created")
+
+    async def get_one_by_filter(
+            self,
+            fields: Optional[Sequence[str]] = None,
+            **filter_by
+    ) -> BaseResponse[CarReadSchema]:
         """
-        Retrieve a single car based on provided filter criteria.
+        Retrieve a single car (or only its requested fields) based on provided filter criteria.
         """
         try:
-            car = await self.cars_repo.get_one(**filter_by)
+            car = await self.cars_repo.get_one(fields=fields, **filter_by)
             if car:
-                return BaseResponse[CarSchema](
+                return BaseResponse[CarReadSchema](
                     status="success",
                     message="Car found.",
                     data=car
@@ -77,95 +125,284 @@ class CarsService:
 
         handle_exception(status_code=404, custom_message="Car not found.")
 
-    async def get_many_by_filter(self, **filter_by: Dict[str, Any]) -> BaseResponse[List[CarSchema]]:
+    async def get_many_by_filter(
+            self,
+            page: PageParams,
+            fields: Optional[Sequence[str]] = None,
+            stream: bool = False,
+            **filter_by: Dict[str, Any]
+    ) -> Union[PaginatedResponse[List[CarReadSchema]], StreamingResponse]:
         """
-        Retrieve multiple cars based on provided filter criteria.
+        Retrieve one page of cars (or only their requested fields) based on provided filter criteria,
+        or all of them as an NDJSON stream if `stream` is set.
         """
+        if stream:  # Reading starts after the cursor, `page.limit` does not apply
+            return ndjson_response(self.cars_repo.stream_many(cursor=page.cursor, fields=fields, **filter_by))
+
         try:
-            cars_by_criteria = await self.cars_repo.get_many(**filter_by)
+            cars_by_criteria = await self.cars_repo.get_many(
+                limit=page.limit + 1,
+                cursor=page.cursor,
+                fields=fields,
+                **filter_by
+            )
+            cars_by_criteria, next_cursor = paginate(cars_by_criteria, page)
+            total = await self.cars_repo.count(page.count, **filter_by) if page.count else None
             if cars_by_criteria:
-                return BaseResponse[List[CarSchema]](
+                return PaginatedResponse[List[CarReadSchema]](
                     status="success",
                     message=f"Cars found.",
-                    data=cars_by_criteria
+                    data=cars_by_criteria,
+                    next_cursor=next_cursor,
+                    total=total
                 )
-            return BaseResponse[List[CarSchema]](
+            return PaginatedResponse[List[CarReadSchema]](
                 status="error",
                 message=f"No cars found.",
-                data=cars_by_criteria
+                data=cars_by_criteria,
+                total=total
             )
         except Exception as e:
             # Catch unexpected error
             handle_exception_default_500(e)
 
-    async def get_all(self) -> BaseResponse[List[CarSchema]]:
+    async def get_all(
+            self,
+            page: PageParams,
+            fields: Optional[Sequence[str]] = None,
+            stream: bool = False
+    ) -> Union[PaginatedResponse[List[CarReadSchema]], StreamingResponse]:
         """
-        Retrieve all cars in the system.
+        Retrieve one page of all cars (or only their requested fields) in the system,
+        or all of them as an NDJSON stream if `stream` is set.
         """
+        if stream:  # Reading starts after the cursor, `page.limit` does not apply
+            return ndjson_response(self.cars_repo.stream_many(cursor=page.cursor, fields=fields))
+
         try:
-            all_cars = await self.cars_repo.get_all()
+            all_cars = await self.cars_repo.get_all(limit=page.limit + 1, cursor=page.cursor, fields=fields)
+            all_cars, next_cursor = paginate(all_cars, page)
+            total = await self.cars_repo.count(page.count) if page.count else None
             if all_cars:
-                return BaseResponse[List[CarSchema]](
+                return PaginatedResponse[List[CarReadSchema]](
                     status="success",
                     message=f"All cars found.",
-                    data=all_cars
+                    data=all_cars,
+                    next_cursor=next_cursor,
+                    total=total
                 )
-            return BaseResponse[List[CarSchema]](  # If there are no cars, return empty all_cars
+            return PaginatedResponse[List[CarReadSchema]](  # If there are no cars, return empty all_cars
                 status="error",
                 message=f"No cars found.",
-                data=all_cars
+                data=all_cars,
+                total=total
+            )
+        except Exception as e:
+            # Catch unexpected error
+            handle_exception_default_500(e)
+
+    async def search(
+            self,
+            search: CarSearchSchema,
+            page: PageParams,
+            fields: Optional[Sequence[str]] = None
+    ) -> PaginatedResponse[List[CarReadSchema]]:
+        """
+        Retrieve one page of cars (or only their requested fields) matching all the given filters,
+        sorted by the requested field.
+        """
+        order_by = search.sort.value
+        filters = search.model_dump(exclude={"sort"}, exclude_none=True)
+        if fields is not None and order_by not in fields:  # Cursors are built from the sort field
+            fields = (*fields, order_by)
+
+        try:
+            found_cars = await self.cars_repo.search(
+                filters,
+                limit=page.limit + 1,
+                cursor=page.cursor,
+                order_by=order_by,
+                fields=fields
+            )
+            found_cars, next_cursor = paginate(found_cars, page, order_by)
+            total = await self.cars_repo.count_search(page.count, filters) if page.count else None
+        except ValueError:  # Cursor of a page sorted by another field
+            handle_exception(status_code=400, custom_message="Invalid cursor.")
+        except Exception as e:
+            # Catch unexpected error
+            handle_exception_default_500(e)
+
+        if found_cars:
+            return PaginatedResponse[List[CarReadSchema]](
+                status="success",
+                message="Cars found.",
+                data=found_cars,
+                next_cursor=next_cursor,
+                total=total
             )
+        return PaginatedResponse[List[CarReadSchema]](
+            status="error",
+            message="No cars found.",
+            data=found_cars,
+            total=total
+        )
+
+    async def text_search(
+            self,
+            query: str,
+            limit: int,
+            fields: Optional[Sequence[str]] = None
+    ) -> BaseResponse[List[CarReadSchema]]:
+        """
+        Retrieve up to `limit` cars (or only their requested fields) whose brand, model and color
+        match the words of the query, most relevant first.
+        """
+        if not re.search(r"\w", query):  # Nothing to match, e.g. only punctuation
+            handle_exception(status_code=400, custom_message="Search query must contain letters or digits.")
+
+        try:
+            found_cars = await self.cars_repo.text_search(query, limit, fields)
         except Exception as e:
             # Catch unexpected error
             handle_exception_default_500(e)
 
-    async def update_by_id(self, car_id: int, car: CarUpdateSchema) -> BaseResponse[CarSchema]:
+        if found_cars:
+            return BaseResponse[List[CarReadSchema]](
+                status="success",
+                message="Cars found.",
+                data=found_cars
+            )
+        return BaseResponse[List[CarReadSchema]](
+            status="error",
+            message="No cars found.",
+            data=found_cars
+        )
+
+    async def update_by_id(
+            self,
+            car_id: int,
+            car: CarUpdateSchema,
+            versions: Optional[List[datetime]] = None
+    ) -> BaseResponse[CarSchema]:
         """
-        Update an existing car's details by its ID.
+        Update an existing car's details by its ID, only if its updated_at is one of `versions` if they are passed
+        (If-Match, see src/utils/etag.py).
+
+        The car is not read first: the UPDATE itself reports a missing car (or a version mismatch),
+        and the unique constraint on vin_number reports a VIN number taken by another car.
         """
-        existing_car_by_id = await self._check_car_existence(id=car_id)
+        try:
+            cars_dict = car.model_dump()
+            updated_car = await self.cars_repo.edit_one(car_id, cars_dict, versions)
+            if updated_car:
+                await self.uow.commit()
+        except IntegrityError as e:
+            await self.uow.rollback()
+            if not is_unique_violation(e):
+                handle_exception_default_500(e)
+            handle_exception(
+                status_code=409,
+                custom_message=f"Car with vin_number: '{car.vin_number}' already exists.",
+            )
+        except Exception as e:
+            handle_exception_default_500(e)
 
-        if not existing_car_by_id:
+        if not updated_car and versions is not None:
+            handle_exception(
+                status_code=412,
+                custom_message=f"Car with id: '{car_id}' was changed since it was read, or does not exist.",
+            )
+        if not updated_car:
             handle_exception(
                 status_code=404,
                 custom_message=f"Car with id: '{car_id}' does not exist.",
             )
 
-        if car.vin_number:
-            existing_car_by_vin = await self._check_car_existence(vin_number=car.vin_number)
+        return BaseResponse[CarSchema](
+            status="success",
+            message="Car updated.",
+            data=updated_car
+        )
 
-            if existing_car_by_vin:  # If car with this new vin_number exists throw HTTPException
-                handle_exception(
-                    status_code=409,
-                    custom_message=f"Car with vin_number: '{car.vin_number}' already exists.",
-                )
+    async def update_many(self, cars: List[CarBulkUpdateSchema]) -> BaseResponse[List[BulkItemResult[CarSchema]]]:
+        """
+        Update many cars at once by their IDs, with one batched UPDATE and one commit per chunk of cars.
 
+        Items with nothing to update, with a VIN number taken by another car
+        or with a non-existent ID are reported as errors, the other cars are updated.
+        """
+        results = []
         try:
-            cars_dict = car.model_dump()
-            updated_car = await self.cars_repo.edit_one(car_id, cars_dict)
-            return BaseResponse[CarSchema](
-                status="success",
-                message="Car updated.",
-                data=updated_car
-            )
+            for chunk in chunked(cars):
+                new_vin_numbers = [car.vin_number for _, car in chunk if car.vin_number]
+                vin_owners = {}  # VIN number -> ID of the car that has (or will have) it
+                if new_vin_numbers:
+                    vin_owners = {
+                        existing_car.vin_number: existing_car.id
+                        for existing_car in await self.cars_repo.get_many_in("vin_number", new_vin_numbers)
+                    }
+
+                cars_to_update = []
+                for index, car in chunk:
+                    if not car.model_dump(exclude={"id"}, exclude_none=True):
+                        results.append(BulkItemResult[CarSchema](
+                            index=index,
+                            status="error",
+                            message="Payload cannot be empty."
+                        ))
+                        continue
+                    if car.vin_number and vin_owners.get(car.vin_number, car.id) != car.id:
+                        results.append(BulkItemResult[CarSchema](
+                            index=index,
+                            status="error",
+                            message=f"Car with vin_number: '{car.vin_number}' already exists."
+                        ))
+                        continue
+                    if car.vin_number:
+                        vin_owners[car.vin_number] = car.id
+                    cars_to_update.append((index, car))
 
+                if not cars_to_update:
+                    continue
+                updated_cars = await self.cars_repo.edit_many([car.model_dump() for _, car in cars_to_update])
+                await self.uow.commit()
+                for (index, car), updated_car in zip(cars_to_update, updated_cars):
+                    if updated_car is not None:
+                        results.append(BulkItemResult[CarSchema](
+                            index=index,
+                            status="success",
+                            message="Car updated.",
+                            data=updated_car
+                        ))
+                    else:
+                        results.append(BulkItemResult[CarSchema](
+                            index=index,
+                            status="error",
+                            message=f"Car with id: '{car.id}' does not exist."
+                        ))
         except Exception as e:
             handle_exception_default_500(e)
 
+        return bulk_response(results, CarSchema, entity_name="cars", action="updated")
+
     async def delete_by_id(self, car_id: int) -> BaseStatusMessageResponse:
         """
         Delete a car by its ID.
         """
         try:
-            await self.cars_repo.delete_one(car_id)
-            return BaseStatusMessageResponse(
-                status="success",
-                message=f"Car with id {car_id} deleted."
-            )
-        except NoResultFound:  # Catches if there is no car with this id
+            deleted_id = await self.cars_repo.delete_one(car_id)
+            if deleted_id is not None:
+                await self.uow.commit()
+        except Exception as e:
+            handle_exception_default_500(e)
+
+        if deleted_id is None:  # There is no car with this id
             handle_exception(
                 status_code=404,
                 custom_message=f"No car with id: '{car_id}' found."
             )
-        except Exception as e:
-            handle_exception_default_500(e)
+
+        return BaseStatusMessageResponse(
+            status="success",
+            message=f"Car with id {car_id} deleted."
+        )
@@ -1,12 +1,20 @@
-from typing import Any, Dict, List
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
 
-from sqlalchemy.exc import NoResultFound
+from fastapi.responses import StreamingResponse
 
-from src.schemas.base_response import BaseResponse, BaseStatusMessageResponse
-from src.schemas.orders import OrderCreateSchema, OrderSchema, OrderUpdateSchema
+from src.schemas.base_response import BaseResponse, BaseStatusMessageResponse, PaginatedResponse
+from src.repositories.sales_rollups import RollupChange, SalesRollupsRepository
+from src.schemas.orders import (
+    OrderCreateSchema, OrderSchema, OrderUpdateSchema, OrderReadSchema, OrderWriteResult,
+    DailySalesSchema, SalespersonSalesSchema
+)
 from src.utils.exception_handler import handle_exception, handle_exception_default_500
+from src.utils.pagination import PageParams, paginate
 from src.utils.repository import AbstractRepository
-from src.utils.enums import OrderStatus
+from src.utils.streaming import ndjson_response
+from src.utils.unit_of_work import AbstractUnitOfWork
+from src.utils.enums import OrderStatus, Role
 
 
 class OrdersService:
@@ -22,92 +30,112 @@ class OrdersService:
             self,
             orders_repo: AbstractRepository,
             users_repo: AbstractRepository,
-            cars_repo: AbstractRepository
+            cars_repo: AbstractRepository,
+            sales_repo: SalesRollupsRepository,
+            uow: AbstractUnitOfWork
     ) -> None:
         """
-        Initialize the OrdersService with repositories for orders, users, and cars.
+        Initialize the OrdersService with repositories for orders, users, cars and sales rollups,
+        and the unit of work that commits their writes.
         """
         self.orders_repo = orders_repo
         self.users_repo = users_repo
         self.cars_repo = cars_repo
+        self.sales_repo = sales_repo
+        self.uow = uow
 
-    async def create(self, order: OrderCreateSchema) -> BaseResponse[OrderSchema]:
+    @staticmethod
+    def _rollup_change(result: OrderWriteResult, delta: int) -> RollupChange:
         """
-        Create a new order after validating associated entities.
-
-        This method:
-        1. Verifies that the customer, salesperson, and car exist.
-        2. Checks roles for customer ('customer') and salesperson ('manager').
-        3. Creates the order if all validations pass.
+        Builds the change of the sales rollup of a created (delta 1) or deleted (delta -1) order,
+        by the price the order counts for.
         """
-        try:
-            # Validate the existence of related entities
-            existing_customer = await self.users_repo.get_one(id=order.user_id)
-            existing_salesperson = await self.users_repo.get_one(id=order.salesperson_id)
-            existing_car = await self.cars_repo.get_one(id=order.car_id)
-        except Exception as e:
-            handle_exception(
-                status_code=500,
-                custom_message=f"An unexpected error occurred while finding customer, salesperson and car by their id."
-            )
+        order = result.order
+        return RollupChange(order.salesperson_id, order.created_at.date(), order.status, result.price, delta)
+
+    @staticmethod
+    def _check_period(date_from: Optional[date], date_to: Optional[date]) -> None:
+        if date_from is not None and date_to is not None and date_from > date_to:
+            handle_exception(status_code=400, custom_message="date_from can't be later than date_to.")
 
-        # All the necessary checks to create an order:
+    @staticmethod
+    def _raise_failed_check(result: OrderWriteResult, order: Union[OrderCreateSchema, OrderUpdateSchema]) -> None:
+        """
+        Raises the HTTPException of the first failed check of a checked order write, in the order:
+        customer exists, customer's role, salesperson exists, salesperson's role, car exists.
+        """
         # 1. Check: does the customer exist?
-        if not existing_customer:
-            return handle_exception(
+        if result.customer_role is None:
+            handle_exception(
                 status_code=404,
                 custom_message=f"Customer with ID: '{order.user_id}' was not found."
             )
 
         # 2. Check: is the customer's role set to 'customer'?
-        if existing_customer.role.value != "customer":
-            return handle_exception(
+        if result.customer_role != Role.customer:
+            handle_exception(
                 status_code=400,
-                custom_message=f"The user with ID: '{order.user_id}' is a {existing_customer.role.value}, not a customer."
+                custom_message=f"The user with ID: '{order.user_id}' is a {result.customer_role.value}, not a customer."
             )
 
         # 3. Check: does the salesperson exist?
-        if not existing_salesperson:
-            return handle_exception(
+        if result.salesperson_role is None:
+            handle_exception(
                 status_code=404,
                 custom_message=f"Salesperson with ID: '{order.salesperson_id}' was not found."
             )
 
         # 4. Check: is the salesperson's role set to 'manager'?
-        if existing_salesperson.role.value != "manager":
-            return handle_exception(
+        if result.salesperson_role != Role.manager:
+            handle_exception(
                 status_code=400,
-                custom_message=f"The user with ID: '{order.salesperson_id}' is a {existing_salesperson.role.value},"
+                custom_message=f"The user with ID: '{order.salesperson_id}' is a {result.salesperson_role.value},"
                                f" not a manager."
             )
 
         # 5. Check: does the car exist?
-        if not existing_car:
-            return handle_exception(
+        if not result.car_exists:
+            handle_exception(
                 status_code=404,
                 custom_message=f"Car with ID: '{order.car_id}' was not found."
             )
 
-        # Create the order if validations pass
+    async def create(self, order: OrderCreateSchema) -> BaseResponse[OrderSchema]:
+        """
+        Create a new order after validating associated entities.
+
+        The customer, salesperson and car are checked (existence, 'customer' and 'manager' roles)
+        in the same statement that inserts the order, so creating an order is one round-trip
+        (plus one for its sales rollup). If a check fails, nothing is inserted and the failed check is reported.
+        """
         try:
             orders_dict = order.model_dump()
-            created_order = await self.orders_repo.create_one(orders_dict)
-            return BaseResponse[OrderSchema](
-                status="success",
-                message="Order created.",
-                data=created_order
-            )
+            result = await self.orders_repo.create_checked(orders_dict)
+            if result.order:
+                await self.sales_repo.apply([self._rollup_change(result, 1)])
+                await self.uow.commit()
         except Exception as e:
             handle_exception_default_500(e)
 
-    async def get_by_order_id(self, order_id: int) -> BaseResponse[OrderSchema]:
+        self._raise_failed_check(result, order)
+        return BaseResponse[OrderSchema](
+            status="success",
+            message="Order created.",
+            data=result.order
+        )
+
+    async def get_by_order_id(
+            self,
+            order_id: int,
+            fields: Optional[Sequence[str]] = None
+    ) -> BaseResponse[OrderReadSchema]:
         """
-        Retrieve a single order by its ID.
+        Retrieve a single order (or only its requested fields) by its ID.
         """
         try:
-            order = await self.orders_repo.get_one(id=order_id)
+            order = await self.orders_repo.get_one(fields=fields, id=order_id)
             if order:  # If order exists
-                return BaseResponse[OrderSchema](
+                return BaseResponse[OrderReadSchema](
                     status="success",
                     message="Order found.",
                     data=order
@@ -119,35 +147,78 @@ class OrdersService:
         handle_exception(status_code=404, custom_message="Order not found.")
 
     # Helper method for other get_orders functions
-    async def _get_many_by_filter(self, **filter_by: Dict[str, Any]) -> [List[OrderSchema]]:
+    async def _get_many_by_filter(
+            self,
+            page: PageParams,
+            fields: Optional[Sequence[str]] = None,
+            **filter_by: Dict[str, Any]
+    ) -> Tuple[List[OrderReadSchema], Optional[str], Optional[int]]:
         """
-        Retrieve all orders by specified criteria.
+        Retrieve one page of orders (or only their requested fields) by specified criteria,
+        the cursor of the next page and the total if `page.count` is set.
         """
         try:
-            orders_by_criteria = await self.orders_repo.get_many(**filter_by)
-            return orders_by_criteria
+            orders_by_criteria = await self.orders_repo.get_many(
+                limit=page.limit + 1,
+                cursor=page.cursor,
+                fields=fields,
+                **filter_by
+            )
+            orders_by_criteria, next_cursor = paginate(orders_by_criteria, page)
+            total = await self.orders_repo.count(page.count, **filter_by) if page.count else None
+            return orders_by_criteria, next_cursor, total
         except Exception as e:
             handle_exception_default_500(e)
 
-    async def get_by_status(self, status: OrderStatus) -> BaseResponse[List[OrderSchema]]:
+    # Helper method for the streaming variants of get_orders functions
+    def _stream_many_by_filter(
+            self,
+            page: PageParams,
+            fields: Optional[Sequence[str]] = None,
+            **filter_by: Dict[str, Any]
+    ) -> StreamingResponse:
+        """
+        Stream all orders (or only their requested fields) by specified criteria as NDJSON,
+        starting after the cursor, `page.limit` does not apply.
+        """
+        return ndjson_response(self.orders_repo.stream_many(cursor=page.cursor, fields=fields, **filter_by))
+
+    async def get_by_status(
+            self,
+            status: OrderStatus,
+            page: PageParams,
+            fields: Optional[Sequence[str]] = None,
+            stream: bool = False
+    ) -> Union[PaginatedResponse[List[OrderReadSchema]], StreamingResponse]:
         """
         Retrieve order by its status.
         """
         filter_by = {"status": status}
-        orders_by_status = await self._get_many_by_filter(**filter_by)
+        if stream:
+            return self._stream_many_by_filter(page, fields, **filter_by)
+        orders_by_status, next_cursor, total = await self._get_many_by_filter(page, fields, **filter_by)
         if orders_by_status:  # If orders_by_status is not empty
-            return BaseResponse[List[OrderSchema]](
+            return PaginatedResponse[List[OrderReadSchema]](
                 status="success",
                 message=f"Orders with status: '{status.value}' found.",
-                data=orders_by_status
+                data=orders_by_status,
+                next_cursor=next_cursor,
+                total=total
             )
-        return BaseResponse[List[OrderSchema]](  # If orders_by_status is empty
+        return PaginatedResponse[List[OrderReadSchema]](  # If orders_by_status is empty
             status="error",
             message=f"No orders with status: '{status.value}' found.",
-            data=orders_by_status
+            data=orders_by_status,
+            total=total
         )
 
-    async def get_by_customer_id(self, customer_id: int) -> BaseResponse[List[OrderSchema]]:
+    async def get_by_customer_id(
+            self,
+            customer_id: int,
+            page: PageParams,
+            fields: Optional[Sequence[str]] = None,
+            stream: bool = False
+    ) -> Union[PaginatedResponse[List[OrderReadSchema]], StreamingResponse]:
         """
         Retrieve order by customer ID.
         """
@@ -171,23 +242,34 @@ class OrdersService:
 
         # Logic for retrieving orders_by_customer_id:
         filter_by = {"user_id": customer_id}
+        if stream:
+            return self._stream_many_by_filter(page, fields, **filter_by)
         try:
-            orders_by_customer_id = await self._get_many_by_filter(**filter_by)
+            orders_by_customer_id, next_cursor, total = await self._get_many_by_filter(page, fields, **filter_by)
             if orders_by_customer_id:  # If there are orders by this customer_id
-                return BaseResponse[List[OrderSchema]](
+                return PaginatedResponse[List[OrderReadSchema]](
                     status="success",
                     message=f"Orders for customer with ID: '{customer_id}' found.",
-                    data=orders_by_customer_id
+                    data=orders_by_customer_id,
+                    next_cursor=next_cursor,
+                    total=total
                 )
-            return BaseResponse[List[OrderSchema]](
+            return PaginatedResponse[List[OrderReadSchema]](
                 status="error",
                 message=f"No orders for customer with ID: '{customer_id}' found.",
-                data=orders_by_customer_id
+                data=orders_by_customer_id,
+                total=total
             )
         except Exception as e:
             handle_exception_default_500(e)
 
-    async def get_by_salesperson_id(self, salesperson_id: int) -> BaseResponse[List[OrderSchema]]:
+    async def get_by_salesperson_id(
+            self,
+            salesperson_id: int,
+            page: PageParams,
+            fields: Optional[Sequence[str]] = None,
+            stream: bool = False
+    ) -> Union[PaginatedResponse[List[OrderReadSchema]], StreamingResponse]:
         """
         Retrieve order by salesperson ID.
         """
@@ -210,23 +292,34 @@ class OrdersService:
 
         # Logic for retrieving orders_by_salesperson_id:
         filter_by = {"salesperson_id": salesperson_id}
+        if stream:
+            return self._stream_many_by_filter(page, fields, **filter_by)
         try:
-            orders_by_salesperson_id = await self._get_many_by_filter(**filter_by)
+            orders_by_salesperson_id, next_cursor, total = await self._get_many_by_filter(page, fields, **filter_by)
             if orders_by_salesperson_id:
-                return BaseResponse[List[OrderSchema]](
+                return PaginatedResponse[List[OrderReadSchema]](
                     status="success",
                     message=f"Orders for salesperson with ID: '{salesperson_id}' found.",
-                    data=orders_by_salesperson_id
+                    data=orders_by_salesperson_id,
+                    next_cursor=next_cursor,
+                    total=total
                 )
-            return BaseResponse[List[OrderSchema]](
+            return PaginatedResponse[List[OrderReadSchema]](
                 status="error",
                 message=f"No orders for salesperson with ID: '{salesperson_id}' found.",
-                data=orders_by_salesperson_id
+                data=orders_by_salesperson_id,
+                total=total
             )
         except Exception as e:
             handle_exception_default_500(e)
 
-    async def get_by_car_id(self, car_id: int) -> BaseResponse[List[OrderSchema]]:
+    async def get_by_car_id(
+            self,
+            car_id: int,
+            page: PageParams,
+            fields: Optional[Sequence[str]] = None,
+            stream: bool = False
+    ) -> Union[PaginatedResponse[List[OrderReadSchema]], StreamingResponse]:
         """
         Retrieve order by car ID.
         """
@@ -244,123 +337,191 @@ class OrdersService:
 
         # Logic for retrieving orders_by_car_id:
         filter_by = {"car_id": car_id}
-        orders_by_car_id = await self._get_many_by_filter(**filter_by)
+        if stream:
+            return self._stream_many_by_filter(page, fields, **filter_by)
+        orders_by_car_id, next_cursor, total = await self._get_many_by_filter(page, fields, **filter_by)
         if orders_by_car_id:
-            return BaseResponse[List[OrderSchema]](
+            return PaginatedResponse[List[OrderReadSchema]](
                 status="success",
                 message=f"Orders for car with ID: '{car_id}' found.",
-                data=orders_by_car_id
+                data=orders_by_car_id,
+                next_cursor=next_cursor,
+                total=total
             )
-        return BaseResponse[List[OrderSchema]](
+        return PaginatedResponse[List[OrderReadSchema]](
             status="error",
-            message=f"No orders for car with ID: '{car_id}' found."
+            message=f"No orders for car with ID: '{car_id}' found.",
+            data=orders_by_car_id,
+            total=total
         )
 
-    async def get_all(self) -> BaseResponse[List[OrderSchema]]:
+    async def get_all(
+            self,
+            page: PageParams,
+            fields: Optional[Sequence[str]] = None,
+            stream: bool = False
+    ) -> Union[PaginatedResponse[List[OrderReadSchema]], StreamingResponse]:
         """
-        Retrieve all orders in the system.
+        Retrieve one page of all orders (or only their requested fields) in the system,
+        or all of them as an NDJSON stream if `stream` is set.
         """
+        if stream:
+            return self._stream_many_by_filter(page, fields)
+
         try:
-            all_orders = await self.orders_repo.get_all()
+            all_orders = await self.orders_repo.get_all(limit=page.limit + 1, cursor=page.cursor, fields=fields)
+            all_orders, next_cursor = paginate(all_orders, page)
+            total = await self.orders_repo.count(page.count) if page.count else None
             if all_orders:
-                return BaseResponse[List[OrderSchema]](
+                return PaginatedResponse[List[OrderReadSchema]](
                     status="success",
                     message=f"All orders found.",
-                    data=all_orders
+                    data=all_orders,
+                    next_cursor=next_cursor,
+                    total=total
                 )
-            return BaseResponse[List[OrderSchema]](
+            return PaginatedResponse[List[OrderReadSchema]](
                 status="error",
                 message=f"No orders found.",
-                data=all_orders
+                data=all_orders,
+                total=total
             )
         except Exception as e:
             handle_exception_default_500(e)
 
-    async def update_by_id(self, order_id: int, order: OrderUpdateSchema) -> BaseResponse[OrderSchema]:
+    async def update_by_id(
+            self,
+            order_id: int,
+            order: OrderUpdateSchema,
+            versions: Optional[List[datetime]] = None
+    ) -> BaseResponse[OrderSchema]:
         """
-        Update an order by its ID.
+        Update an order by its ID, only if its updated_at is one of `versions` if they are passed
+        (If-Match, see src/utils/etag.py).
+
+        The order and the customer, salesperson and car being set (only those) are checked
+        in the same statement that updates the order, so updating an order is one round-trip
+        (two if its sales rollup changes).
         """
         try:
-            existing_order_by_id = await self.orders_repo.get_one(id=order_id)
+            update_data = order.model_dump(exclude_unset=True)
+            result = await self.orders_repo.edit_checked(order_id, update_data, versions)
+            if result.order:
+                # The order moves to another rollup if its salesperson, status or price (set with the car) changed
+                previous = RollupChange(
+                    result.previous_salesperson_id,
+                    result.order.created_at.date(),
+                    result.previous_status,
+                    result.previous_price,
+                    -1
+                )
+                current = self._rollup_change(result, 1)
+                if previous[:4] != current[:4]:
+                    await self.sales_repo.apply([previous, current])
+                await self.uow.commit()
         except Exception as e:
             handle_exception_default_500(e)
 
-        if not existing_order_by_id:
+        if not result.order_exists:
+            handle_exception(
+                status_code=404,
+                custom_message=f"Order with id: '{order_id}' does not exist.",
+            )
+        self._raise_failed_check(result, order)
+        # Every check passed: the version did not match, or the order was deleted while the update waited for it
+        if not result.order and versions is not None:
+            handle_exception(
+                status_code=412,
+                custom_message=f"Order with id: '{order_id}' was changed since it was read, or does not exist.",
+            )
+        if not result.order:
             handle_exception(
                 status_code=404,
                 custom_message=f"Order with id: '{order_id}' does not exist.",
             )
 
-        # Check the existence of related entities (customer, salesman and car) only if necessary
-        if order.user_id is not None:
-            try:
-                customer = await self.users_repo.get_one(id=order.user_id)
-            except Exception as e:
-                handle_exception_default_500(e)
-            if not customer:
-                handle_exception(
-                    status_code=404,
-                    custom_message=f"Customer with ID: '{order.user_id}' was not found."
-                )
-            if customer.role.value != "customer":
-                handle_exception(
-                    status_code=400,
-                    custom_message=f"The user with ID: '{order.user_id}' is a {customer.role.value}, not a customer."
-                )
-
-        if order.salesperson_id is not None:
-            try:
-                salesperson = await self.users_repo.get_one(id=order.salesperson_id)
-            except Exception as e:
-                handle_exception_default_500(e)
-            if not salesperson:
-                handle_exception(
-                    status_code=404,
-                    custom_message=f"Salesperson with ID: '{order.salesperson_id}' was not found."
-                )
-            if salesperson.role.value != "manager":
-                handle_exception(
-                    status_code=400,
-                    custom_message=f"The user with ID: '{order.salesperson_id}' is a {salesperson.role.value}, not a manager."
-                )
-
-        if order.car_id is not None:
-            try:
-                car = await self.cars_repo.get_one(id=order.car_id)
-            except Exception as e:
-                handle_exception_default_500(e)
-            if not car:
-                handle_exception(
-                    status_code=404,
-                    custom_message=f"Car with ID: '{order.car_id}' was not found."
-                )
+        return BaseResponse[OrderSchema](
+            status="success",
+            message=f"Order with id: '{order_id}' successfully updated.",
+            data=result.order
+        )
 
-        # Then update order after all checks
+    async def delete_by_id(self, order_id: int) -> BaseStatusMessageResponse:
+        """
+        Delete an order by its ID, and remove it from its sales rollup.
+        """
         try:
-            update_data = order.model_dump(exclude_unset=True)
-            updated_order = await self.orders_repo.edit_one(order_id, update_data)
-            return BaseResponse[OrderSchema](
-                status="success",
-                message=f"Order with id: '{order_id}' successfully updated.",
-                data=updated_order
-            )
+            deleted_order = await self.orders_repo.delete_returning(order_id)
+            if deleted_order is not None:
+                await self.sales_repo.apply([self._rollup_change(deleted_order, -1)])
+                await self.uow.commit()
         except Exception as e:
             handle_exception_default_500(e)
 
-    async def delete_by_id(self, order_id: int) -> BaseStatusMessageResponse:
+        if deleted_order is None:  # There is no order with provided id
+            handle_exception(
+                status_code=404,
+                custom_message=f"No order with id: '{order_id} found."
+            )
+
+        return BaseStatusMessageResponse(
+            status="success",
+            message=f"Order with id {order_id} deleted."
+        )
+
+    async def get_sales_leaderboard(
+            self,
+            limit: int,
+            date_from: Optional[date] = None,
+            date_to: Optional[date] = None,
+            status: Optional[OrderStatus] = None
+    ) -> BaseResponse[List[SalespersonSalesSchema]]:
         """
-        Delete an order by its ID.
+        Retrieve the salespeople with the highest revenue in the period, from the sales rollups:
+        the cost depends on the number of days and salespeople, not on the number of orders.
         """
+        self._check_period(date_from, date_to)
         try:
-            await self.orders_repo.delete_one(order_id)
-            return BaseStatusMessageResponse(
+            leaderboard = await self.sales_repo.leaderboard(limit, date_from, date_to, status)
+        except Exception as e:
+            handle_exception_default_500(e)
+
+        if leaderboard:
+            return BaseResponse[List[SalespersonSalesSchema]](
                 status="success",
-                message=f"Order with id {order_id} deleted."
-            )
-        except NoResultFound:  # Catches if there is no order with provided id
-            handle_exception(
-                status_code=404,
-                custom_message=f"No order with id: '{order_id} found."
+                message="Sales leaderboard found.",
+                data=leaderboard
             )
+        return BaseResponse[List[SalespersonSalesSchema]](
+            status="error",
+            message="No sales found.",
+            data=leaderboard
+        )
+
+    async def get_sales_by_salesperson_id(
+            self,
+            salesperson_id: int,
+            date_from: Optional[date] = None,
+            date_to: Optional[date] = None,
+            status: Optional[OrderStatus] = None
+    ) -> BaseResponse[List[DailySalesSchema]]:
+        """
+        Retrieve the orders and revenue of a salesperson per day and status in the period, from the sales rollups.
+        """
+        self._check_period(date_from, date_to)
+        try:
+            daily_sales = await self.sales_repo.daily_sales(salesperson_id, date_from, date_to, status)
         except Exception as e:
             handle_exception_default_500(e)
+
+        if daily_sales:
+            return BaseResponse[List[DailySalesSchema]](
+                status="success",
+                message=f"Sales for salesperson with ID: '{salesperson_id}' found.",
+                data=daily_sales
+            )
+        return BaseResponse[List[DailySalesSchema]](
+            status="error",
+            message=f"No sales for salesperson with ID: '{salesperson_id}' found.",
+            data=daily_sales
+        )
@@ -0,0 +1,142 @@
+from typing import Dict, List, Optional
+
+from src.db.pool_metrics import PoolMetrics
+from src.repositories.stats import StatsRepository
+from src.schemas.base_response import BaseResponse, BaseStatusMessageResponse
+from src.schemas.stats import (
+    CacheStatsSchema, CarCountSchema, CarPriceSchema, MonthlyOrdersSchema, PoolStatsSchema
+)
+from src.utils.cache import EntityCache
+from src.utils.exception_handler import handle_exception, handle_exception_default_500
+from src.utils.unit_of_work import AbstractUnitOfWork
+
+
+class StatsService:
+    """
+    Service layer for the aggregates of cars and orders.
+
+    The aggregates are read from materialized views, so they lag behind the tables until the next refresh
+    (see src/utils/stats_refresher.py, or refresh them at once with `refresh`).
+    """
+
+    def __init__(
+            self,
+            stats_repo: StatsRepository,
+            uow: AbstractUnitOfWork,
+            cache: EntityCache,
+            pools: Dict[str, PoolMetrics]
+    ) -> None:
+        """
+        Initialize the StatsService with a stats repository, the unit of work that commits its refreshes,
+        and the entity cache and connection pools whose counters it reports.
+        """
+        self.stats_repo = stats_repo
+        self.uow = uow
+        self.cache = cache
+        self.pools = pools
+
+    async def get_car_counts(self, brand: Optional[str] = None) -> BaseResponse[List[CarCountSchema]]:
+        """
+        Retrieve the number of cars per brand, engine and transmission, optionally of one brand only.
+        """
+        try:
+            car_counts = await self.stats_repo.car_counts(brand)
+        except Exception as e:
+            handle_exception_default_500(e)
+
+        if car_counts:
+            return BaseResponse[List[CarCountSchema]](
+                status="success",
+                message="Car counts found.",
+                data=car_counts
+            )
+        return BaseResponse[List[CarCountSchema]](  # The tables are empty, or the views were not refreshed yet
+            status="error",
+            message="No car counts found.",
+            data=car_counts
+        )
+
+    async def get_car_prices(self, brand: Optional[str] = None) -> BaseResponse[List[CarPriceSchema]]:
+        """
+        Retrieve the average price of cars per brand, model and year, optionally of one brand only.
+        """
+        try:
+            car_prices = await self.stats_repo.car_prices(brand)
+        except Exception as e:
+            handle_exception_default_500(e)
+
+        if car_prices:
+            return BaseResponse[List[CarPriceSchema]](
+                status="success",
+                message="Car prices found.",
+                data=car_prices
+            )
+        return BaseResponse[List[CarPriceSchema]](  # The tables are empty, or the views were not refreshed yet
+            status="error",
+            message="No car prices found.",
+            data=car_prices
+        )
+
+    async def get_monthly_orders(self) -> BaseResponse[List[MonthlyOrdersSchema]]:
+        """
+        Retrieve the number of orders per month of creation and status.
+        """
+        try:
+            monthly_orders = await self.stats_repo.monthly_orders()
+        except Exception as e:
+            handle_exception_default_500(e)
+
+        if monthly_orders:
+            return BaseResponse[List[MonthlyOrdersSchema]](
+                status="success",
+                message="Monthly orders found.",
+                data=monthly_orders
+            )
+        return BaseResponse[List[MonthlyOrdersSchema]](  # The tables are empty, or the views were not refreshed yet
+            status="error",
+            message="No monthly orders found.",
+            data=monthly_orders
+        )
+
+    async def get_cache_stats(self) -> BaseResponse[CacheStatsSchema]:
+        """
+        Retrieve the counters of the entity cache of this process (each app process counts its own).
+        """
+        return BaseResponse[CacheStatsSchema](
+            status="success",
+            message="Cache stats found.",
+            data=CacheStatsSchema(**self.cache.stats())
+        )
+
+    async def get_pool_stats(self) -> BaseResponse[List[PoolStatsSchema]]:
+        """
+        Retrieve the gauges and counters of the database connection pools of this process.
+        """
+        return BaseResponse[List[PoolStatsSchema]](
+            status="success",
+            message="Pool stats found.",
+            data=[PoolStatsSchema(engine=name, **metrics.stats()) for name, metrics in self.pools.items()]
+        )
+
+    async def refresh(self) -> BaseStatusMessageResponse:
+        """
+        Refresh all aggregates now, unless another refresh is running.
+        """
+        try:
+            locked = await self.stats_repo.try_lock_refresh()
+            if locked:
+                await self.stats_repo.refresh()
+                await self.uow.commit()
+        except Exception as e:
+            handle_exception_default_500(e)
+
+        if not locked:
+            handle_exception(
+                status_code=409,
+                custom_message="Stats are being refreshed already, try again later."
+            )
+
+        return BaseStatusMessageResponse(
+            status="success",
+            message="Stats refreshed."
+        )
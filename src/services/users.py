@@ -1,11 +1,17 @@
-from typing import Any, Dict, List, Optional
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Union
 
-from sqlalchemy.exc import NoResultFound
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 
-from src.schemas.base_response import BaseResponse, BaseStatusMessageResponse
-from src.schemas.users import UserCreateSchema, UserSchema, UserUpdateSchema
-from src.utils.exception_handler import handle_exception, handle_exception_default_500
+from src.schemas.base_response import BaseResponse, BaseStatusMessageResponse, BulkItemResult, PaginatedResponse
+from src.schemas.users import UserCreateSchema, UserSchema, UserUpdateSchema, UserReadSchema
+from src.utils.bulk import bulk_response, chunked
+from src.utils.exception_handler import handle_exception, handle_exception_default_500, is_unique_violation
+from src.utils.pagination import PageParams, paginate
 from src.utils.repository import AbstractRepository
+from src.utils.streaming import ndjson_response
+from src.utils.unit_of_work import AbstractUnitOfWork
 
 
 # TODO: Simplify by reducing nesting (Try/excepts) in future?
@@ -18,57 +24,94 @@ class UsersService:
     between the repository layer and the application layer.
     """
 
-    def __init__(self, users_repo: AbstractRepository) -> None:
+    def __init__(self, users_repo: AbstractRepository, uow: AbstractUnitOfWork) -> None:
         """
-        Initialize the UsersService with a user repository.
+        Initialize the UsersService with a user repository and the unit of work that commits its writes.
         """
         self.users_repo = users_repo
+        self.uow = uow
 
-    # helper method for create and update funcs
-    async def _check_user_existence(self, **filter_by) -> Optional[UserSchema]:
+    # helper method for update func
+    async def create(self, user: UserCreateSchema) -> BaseResponse[UserSchema]:
         """
-        Helper method to check if a user exists based on the provided filter criteria.
+        Create a new user if the email is unique.
+
+        The uniqueness check and the insert are one statement (INSERT ... ON CONFLICT DO NOTHING),
+        so concurrent creates with the same email can't race.
         """
         try:
-            existing_user = await self.users_repo.get_one(**filter_by)
-            return existing_user
-        except Exception as e:  # If error while checking for user existence throw HTTPException
+            users_dict = user.model_dump()
+            created_user = await self.users_repo.create_one_or_none(users_dict, conflict_field="email")
+            if created_user:
+                await self.uow.commit()
+        except Exception as e:
             handle_exception_default_500(e)
 
-    async def create(self, user: UserCreateSchema) -> BaseResponse[UserSchema]:
-        """
-        Create a new user after verifying that the email is unique.
-        """
-        # Check if user exists by unique email
-        existing_user = await self._check_user_existence(email=user.email)
-
-        if existing_user:  # If user exists raise error
+        if not created_user:  # If user with this email already exists raise error
             handle_exception(
                 status_code=409,
                 custom_message=f"User with email: '{user.email}' already exists.",
             )
 
-        # Creating user if not exists
+        return BaseResponse[UserSchema](
+            status="success",
+            message="User created.",
+            data=created_user
+        )
+
+    async def create_many(self, users: List[UserCreateSchema]) -> BaseResponse[List[BulkItemResult[UserSchema]]]:
+        """
+        Create many users at once, with one multi-row INSERT and one commit per chunk of users.
+
+        Users whose email already exists (in the database or earlier in the payload)
+        are reported as conflicts, the other users are created.
+        """
+        results = []
         try:
-            users_dict = user.model_dump()
-            created_user = await self.users_repo.create_one(users_dict)
-            return BaseResponse[UserSchema](
-                status="success",
-                message="User created.",
-                data=created_user
-            )
+            for chunk in chunked(users):
+                emails = [user.email for _, user in chunk]
+                taken_emails = {existing_user.email for existing_user in await self.users_repo.get_many_in("email", emails)}
+
+                users_to_create = []
+                for index, user in chunk:
+                    if user.email in taken_emails:
+                        results.append(BulkItemResult[UserSchema](
+                            index=index,
+                            status="error",
+                            message=f"User with email: '{user.email}' already exists."
+                        ))
+                        continue
+                    taken_emails.add(user.email)  # Duplicates later in the payload are conflicts too
+                    users_to_create.append((index, user))
 
+                if not users_to_create:
+                    continue
+                created_users = await self.users_repo.create_many([user.model_dump() for _, user in users_to_create])
+                await self.uow.commit()
+                for (index, _), created_user in zip(users_to_create, created_users):
+                    results.append(BulkItemResult[UserSchema](
+                        index=index,
+                        status="success",
+                        message="User created.",
+                        data=created_user
+                    ))
         except Exception as e:
             handle_exception_default_500(e)
 
-    async def get_one_by_filter(self, **filter_by: Dict[str, Any]) -> BaseResponse[UserSchema]:
+        return bulk_response(results, UserSchema, entity_name="users", action="created")
+
+    async def get_one_by_filter(
+            self,
+            fields: Optional[Sequence[str]] = None,
+            **filter_by: Dict[str, Any]
+    ) -> BaseResponse[UserReadSchema]:
         """
-        Retrieve a single user based on the given filter criteria.
+        Retrieve a single user (or only their requested fields) based on the given filter criteria.
         """
         try:
-            user = await self.users_repo.get_one(**filter_by)
+            user = await self.users_repo.get_one(fields=fields, **filter_by)
             if user:  # Is not None
-                return BaseResponse[UserSchema](
+                return BaseResponse[UserReadSchema](
                     status="success",
                     message="User found.",
                     data=user
@@ -80,101 +123,149 @@ class UsersService:
         # If user not found
         handle_exception(status_code=404, custom_message="User not found.")
 
-    async def get_many_by_filter(self, **filter_by: Dict[str, Any]) -> BaseResponse[List[UserSchema]]:
+    async def get_many_by_filter(
+            self,
+            page: PageParams,
+            fields: Optional[Sequence[str]] = None,
+            stream: bool = False,
+            **filter_by: Dict[str, Any]
+    ) -> Union[PaginatedResponse[List[UserReadSchema]], StreamingResponse]:
         """
-        Retrieve all users by specified criteria.
+        Retrieve one page of users (or only their requested fields) by specified criteria,
+        or all of them as an NDJSON stream if `stream` is set.
         """
+        if stream:  # Reading starts after the cursor, `page.limit` does not apply
+            return ndjson_response(self.users_repo.stream_many(cursor=page.cursor, fields=fields, **filter_by))
+
         try:
-            users_by_criteria = await self.users_repo.get_many(**filter_by)
+            users_by_criteria = await self.users_repo.get_many(
+                limit=page.limit + 1,
+                cursor=page.cursor,
+                fields=fields,
+                **filter_by
+            )
+            users_by_criteria, next_cursor = paginate(users_by_criteria, page)
+            total = await self.users_repo.count(page.count, **filter_by) if page.count else None
             if users_by_criteria:
-                return BaseResponse[List[UserSchema]](
+                return PaginatedResponse[List[UserReadSchema]](
                     status="success",
                     message=f"Users found.",
-                    data=users_by_criteria
+                    data=users_by_criteria,
+                    next_cursor=next_cursor,
+                    total=total
                 )
-            return BaseResponse[List[UserSchema]](
+            return PaginatedResponse[List[UserReadSchema]](
                 # If there are no users by this criteria in db, returns empty users_by_role
                 status="error",
                 message=f"No users found.",
-                data=users_by_criteria
+                data=users_by_criteria,
+                total=total
             )
         except Exception as e:
             # Catch unexpected error
             handle_exception_default_500(e)
 
-    async def get_all(self) -> BaseResponse[List[UserSchema]]:
+    async def get_all(
+            self,
+            page: PageParams,
+            fields: Optional[Sequence[str]] = None,
+            stream: bool = False
+    ) -> Union[PaginatedResponse[List[UserReadSchema]], StreamingResponse]:
         """
-        Retrieve all users in the system.
+        Retrieve one page of all users (or only their requested fields) in the system,
+        or all of them as an NDJSON stream if `stream` is set.
         """
+        if stream:  # Reading starts after the cursor, `page.limit` does not apply
+            return ndjson_response(self.users_repo.stream_many(cursor=page.cursor, fields=fields))
+
         try:
-            all_users = await self.users_repo.get_all()
+            all_users = await self.users_repo.get_all(limit=page.limit + 1, cursor=page.cursor, fields=fields)
+            all_users, next_cursor = paginate(all_users, page)
+            total = await self.users_repo.count(page.count) if page.count else None
             if all_users:  # If there are users return them
-                return BaseResponse[List[UserSchema]](
+                return PaginatedResponse[List[UserReadSchema]](
                     status="success",
                     message=f"All users found.",
-                    data=all_users
+                    data=all_users,
+                    next_cursor=next_cursor,
+                    total=total
                 )
 
-            return BaseResponse[List[UserSchema]](  # If there are no users return empty all_users
+            return PaginatedResponse[List[UserReadSchema]](  # If there are no users return empty all_users
                 status="error",
                 message=f"No users found.",
-                data=all_users
+                data=all_users,
+                total=total
             )
 
         except Exception as e:
             # Catch unexpected error
             handle_exception_default_500(e)
 
-    async def update_by_id(self, user_id: int, user: UserUpdateSchema) -> BaseResponse[UserSchema]:
+    async def update_by_id(
+            self,
+            user_id: int,
+            user: UserUpdateSchema,
+            versions: Optional[List[datetime]] = None
+    ) -> BaseResponse[UserSchema]:
         """
-        Update the details of a user by their ID, ensuring email uniqueness if updated.
+        Update the details of a user by their ID, ensuring email uniqueness if updated,
+        only if their updated_at is one of `versions` if they are passed (If-Match, see src/utils/etag.py).
+
+        The user is not read first: the UPDATE itself reports a missing user (or a version mismatch),
+        and the unique constraint on email reports an email taken by another user.
         """
-        # Check if user with this id exists
-        existing_user_by_id = await self._check_user_existence(id=user_id)
+        try:
+            users_dict = user.model_dump()
+            updated_user = await self.users_repo.edit_one(user_id, users_dict, versions)
+            if updated_user:
+                await self.uow.commit()
+        except IntegrityError as e:
+            await self.uow.rollback()
+            if not is_unique_violation(e):
+                handle_exception_default_500(e)
+            handle_exception(
+                status_code=409,
+                custom_message=f"User with email: '{user.email}' already exists.",
+            )
+        except Exception as e:
+            handle_exception_default_500(e)
 
-        if not existing_user_by_id:  # If user does not exist raise error
+        if not updated_user and versions is not None:
+            handle_exception(
+                status_code=412,
+                custom_message=f"User with id: '{user_id}' was changed since it was read, or does not exist.",
+            )
+        if not updated_user:  # If user does not exist raise error
             handle_exception(
                 status_code=404,
                 custom_message=f"User with id: '{user_id}' does not exist.",
             )
 
-        # Check if email is not unique and already contains in database
-        if user.email:  # if user.email is not NONE
-            existing_user_by_email = await self._check_user_existence(email=user.email)
-
-            if existing_user_by_email:  # If user with this new email already exists throw HTTPException
-                handle_exception(
-                    status_code=409,
-                    custom_message=f"User with email: '{user.email}' already exists.",
-                )
-
-        # If user exists update him
-        try:
-            users_dict = user.model_dump()
-            updated_user = await self.users_repo.edit_one(user_id, users_dict)
-            return BaseResponse[UserSchema](
-                status="success",
-                message="User updated.",
-                data=updated_user
-            )
-
-        except Exception as e:
-            handle_exception_default_500(e)
+        return BaseResponse[UserSchema](
+            status="success",
+            message="User updated.",
+            data=updated_user
+        )
 
     async def delete_by_id(self, user_id: int) -> BaseStatusMessageResponse:
         """
         Delete a user by their ID.
         """
         try:
-            await self.users_repo.delete_one(user_id)
-            return BaseStatusMessageResponse(
-                status="success",
-                message=f"User with id {user_id} deleted."
-            )
-        except NoResultFound:  # Catches if there is no user with this id
+            deleted_id = await self.users_repo.delete_one(user_id)
+            if deleted_id is not None:
+                await self.uow.commit()
+        except Exception as e:
+            handle_exception_default_500(e)
+
+        if deleted_id is None:  # There is no user with this id
             handle_exception(
                 status_code=404,
                 custom_message=f"No user with id: '{user_id}' found."
             )
-        except Exception as e:
-            handle_exception_default_500(e)
+
+        return BaseStatusMessageResponse(
+            status="success",
+            message=f"User with id {user_id} deleted."
+        )
@@ -0,0 +1,36 @@
+from typing import List, Sequence, Tuple, Type, TypeVar
+
+from src.schemas.base_response import BaseResponse, BulkItemResult
+
+T = TypeVar("T")
+
+BULK_MAX_ITEMS = 5000  # Maximum number of items accepted by one bulk request
+BULK_CHUNK_SIZE = 500  # Items written per transaction (one multi-row statement and one commit per chunk)
+
+
+def chunked(items: Sequence[T], size: int = BULK_CHUNK_SIZE) -> List[List[Tuple[int, T]]]:
+    """
+    Splits items into chunks of (index, item) pairs, where index is the position of the item in the payload.
+    """
+    indexed_items = list(enumerate(items))
+    return [indexed_items[start:start + size] for start in range(0, len(indexed_items), size)]
+
+
+def bulk_response(
+        results: List[BulkItemResult],
+        schema: Type[T],
+        entity_name: str,
+        action: str
+) -> BaseResponse[List[BulkItemResult[T]]]:
+    """
+    Builds the response for a bulk end-point from per-item results, ordered as in the payload.
+
+    For example: entity_name='cars', action='created' -> "2 of 3 cars created."
+    """
+    results = sorted(results, key=lambda result: result.index)
+    succeeded = sum(1 for result in results if result.status == "success")
+    return BaseResponse[List[BulkItemResult[schema]]](
+        status="success" if succeeded == len(results) else "error",
+        message=f"{succeeded} of {len(results)} {entity_name} {action}.",
+        data=results
+    )
@@ -0,0 +1,173 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Iterable, Optional, Tuple
+
+from pydantic import TypeAdapter
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.utils.cache_backends import CacheBackend, CacheBackendError, MemoryBackend, NullBackend, RedisBackend
+from src.utils.config import CACHE_BACKEND, CACHE_MAX_ENTRIES, CACHE_REDIS_URL, CACHE_TTL_SECONDS
+
+# Key of session.info holding the namespaces written in the current transaction, see mark_written
+WRITTEN_KEY = "entity_cache_written"
+# Keys of session.info set by get_session (src/api/dependencies.py), see mark_replica and mark_pinned
+REPLICA_KEY = "entity_cache_replica"
+PINNED_KEY = "entity_cache_pinned"
+
+
+class EntityCache:
+    """
+    Cache of read models and pages of read models (see SQLAlchemyRepository.cached), stored by a backend
+    (src/utils/cache_backends.py) as JSON bytes, under namespaces invalidated when their table is written.
+
+    Concurrent misses of one key in this process load it once: the first caller runs the query, the others
+    wait for its result (single flight), so an expired popular record doesn't send a burst of identical queries.
+    A load is stored as of the namespace version read with the miss, so a load that raced with a write
+    is never served, whichever process invalidated it (see CacheBackend).
+    Missing records (None) are not cached. If the backend fails, values are loaded from the database.
+    """
+
+    def __init__(self, backend: CacheBackend, ttl_seconds: int = CACHE_TTL_SECONDS) -> None:
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self._loading: Dict[Tuple[str, str], Tuple[asyncio.Future, int]] = {}  # Loads in flight and their version
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "ttl_seconds": self.ttl_seconds,
+            **self.backend.stats(),
+        }
+
+    def reset_stats(self) -> None:
+        self.hits = self.misses = 0
+
+    async def get_or_load(
+            self,
+            namespace: str,
+            key: str,
+            adapter: TypeAdapter,
+            loader: Callable[[], Awaitable[Any]],
+            store: bool = True
+    ) -> Any:
+        """
+        Returns the cached value of the key, or loads it with `loader` and caches it if it is not None.
+        `adapter` converts the value to and from JSON bytes, sparse fieldsets keep only their fields.
+        With `store` False, a loaded value is only returned (or a load in flight awaited), not cached.
+        """
+        try:
+            cached, version = await self.backend.get(namespace, key)
+        except CacheBackendError as error:
+            logging.warning(f"Cache read failed: {error}")
+            return await loader()
+        if cached is not None:
+            self.hits += 1
+            return adapter.validate_json(cached)
+
+        loading, loading_version = self._loading.get((namespace, key), (None, None))
+        if loading is not None and loading_version == version:  # Another request of this process is loading it
+            self.hits += 1
+            try:
+                return await asyncio.shield(loading)
+            except Exception:
+                return await loader()  # The load failed, its error is reported to the request that ran it
+
+        self.misses += 1
+        if not store or loading is not None:  # Or a load as of an older version is in flight, it keeps the slot
+            return await loader()
+        future = asyncio.get_running_loop().create_future()
+        self._loading[(namespace, key)] = (future, version)
+        try:
+            value = await loader()
+        except BaseException as error:
+            del self._loading[(namespace, key)]
+            future.set_exception(error if isinstance(error, Exception) else RuntimeError("Cache load was cancelled."))
+            future.exception()  # Retrieved, there may be no waiters
+            raise
+
+        del self._loading[(namespace, key)]
+        future.set_result(value)
+        if value is not None:
+            try:
+                data = adapter.dump_json(value, exclude_unset=True)
+                await self.backend.set(namespace, key, data, self.ttl_seconds, version)
+            except CacheBackendError as error:
+                logging.warning(f"Cache write failed: {error}")
+        return value
+
+    async def invalidate(self, namespaces: Iterable[str]) -> None:
+        """
+        Bumps the version of the namespaces: their keys, and values loaded as of the previous version, are not served.
+        """
+        namespaces = sorted(namespaces)
+        try:
+            await self.backend.invalidate(namespaces)
+        except CacheBackendError as error:
+            # Other processes keep serving the old values until they expire
+            logging.error(f"Cache invalidation of {namespaces} failed: {error}")
+
+
+def create_backend() -> CacheBackend:
+    """
+    Builds the backend chosen by CACHE_BACKEND: 'memory' (one cache per process), 'redis' (shared)
+    or 'none' (no caching).
+    """
+    if CACHE_BACKEND == "redis":
+        return RedisBackend(CACHE_REDIS_URL)
+    if CACHE_BACKEND == "memory":
+        return MemoryBackend(CACHE_MAX_ENTRIES)
+    if CACHE_BACKEND == "none":
+        return NullBackend()
+    raise ValueError(f"Unknown CACHE_BACKEND: {CACHE_BACKEND!r}, expected 'memory', 'redis' or 'none'.")
+
+
+# Shared by the repositories of cached models
+entity_cache = EntityCache(create_backend())
+
+
+def mark_written(session: AsyncSession, namespace: str) -> None:
+    """
+    Records that the session wrote to the namespace's table: the unit of work invalidates it after commit
+    (see src/utils/unit_of_work.py). Until then, the session's reads of it skip the cache,
+    they must see its uncommitted writes, which must not be cached in case of a rollback.
+    """
+    session.info.setdefault(WRITTEN_KEY, set()).add(namespace)
+
+
+def has_written(session: AsyncSession, namespace: str) -> bool:
+    return namespace in session.info.get(WRITTEN_KEY, ())
+
+
+def mark_replica(session: AsyncSession) -> None:
+    """
+    Records that the session reads from a replica: its reads are served from the cache, but what it loads
+    is not stored, since a lagging replica may return rows older than a write already invalidated from the cache.
+    """
+    session.info[REPLICA_KEY] = True
+
+
+def mark_pinned(session: AsyncSession) -> None:
+    """
+    Records that the session serves a client that wrote recently (see src/api/middlewares/read_your_writes.py):
+    its reads skip the cache, which may still hold what the client overwrote (e.g. the memory cache of another process).
+    """
+    session.info[PINNED_KEY] = True
+
+
+def is_replica(session: AsyncSession) -> bool:
+    return session.info.get(REPLICA_KEY, False)
+
+
+def is_pinned(session: AsyncSession) -> bool:
+    return session.info.get(PINNED_KEY, False)
+
+
+def pop_written(session: AsyncSession) -> Optional[set]:
+    """
+    Returns and forgets the namespaces written in the session's transaction, None if there are none.
+    """
+    return session.info.pop(WRITTEN_KEY, None)
@@ -0,0 +1,261 @@
+import asyncio
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Set, Tuple, Union
+from urllib.parse import unquote, urlparse
+
+
+class CacheBackendError(Exception):
+    """Raised when the cache backend can't be reached or rejects a command. Callers read the database instead."""
+
+
+class CacheBackend(ABC):
+    """
+    Storage of cached values as bytes. Keys are grouped in namespaces, a prefix shared by related keys
+    (e.g. every cached car and page of cars), which are invalidated all at once.
+
+    Each namespace has a version, bumped by every invalidation. A value is set as of the version read
+    before loading it, and is never returned if the namespace was invalidated since: it may have been
+    read from the database before the write that invalidated it, in this process or in another one.
+    """
+    name = None  # Reported in cache stats
+
+    @abstractmethod
+    async def get(self, namespace: str, key: str) -> Tuple[Optional[bytes], int]:
+        """Returns the value of the key (None if it is not cached or expired) and the version of its namespace."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def set(self, namespace: str, key: str, value: bytes, ttl_seconds: int, version: int) -> None:
+        """Caches the value for at most `ttl_seconds`, as of `version` of its namespace."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def invalidate(self, namespaces: Sequence[str]) -> None:
+        """Bumps the version of the namespaces, their keys are not returned anymore."""
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        """Backend-specific counters, merged into the cache stats."""
+        return {}
+
+    async def close(self) -> None:
+        pass
+
+
+class NullBackend(CacheBackend):
+    """
+    Stores nothing: every read is a miss, loaded from the database (concurrent misses still load once).
+    Replaces the memory backend when several worker processes serve the app, see gunicorn_conf.py.
+    """
+    name = "none"
+
+    async def get(self, namespace: str, key: str) -> Tuple[Optional[bytes], int]:
+        return None, 0
+
+    async def set(self, namespace: str, key: str, value: bytes, ttl_seconds: int, version: int) -> None:
+        pass
+
+    async def invalidate(self, namespaces: Sequence[str]) -> None:
+        pass
+
+
+class MemoryBackend(CacheBackend):
+    """
+    Cache in the memory of this process: at most `max_size` values, the least recently used evicted first.
+    """
+    name = "memory"
+
+    def __init__(self, max_size: int) -> None:
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, bytes]]" = OrderedDict()  # (expires at, value)
+        self._keys: Dict[str, Set[str]] = {}  # Keys of each namespace
+        self._versions: Dict[str, int] = {}
+        self.evictions = 0
+
+    async def get(self, namespace: str, key: str) -> Tuple[Optional[bytes], int]:
+        version = self._versions.get(namespace, 0)
+        entry = self._entries.get((namespace, key))
+        if entry is None:
+            return None, version
+        if entry[0] <= time.monotonic():
+            self._remove(namespace, key)
+            return None, version
+        self._entries.move_to_end((namespace, key))
+        return entry[1], version
+
+    async def set(self, namespace: str, key: str, value: bytes, ttl_seconds: int, version: int) -> None:
+        if self._versions.get(namespace, 0) != version:  # Invalidated since, the keys of older versions are dropped
+            return
+        self._entries[(namespace, key)] = (time.monotonic() + ttl_seconds, value)
+        self._entries.move_to_end((namespace, key))
+        self._keys.setdefault(namespace, set()).add(key)
+        while len(self._entries) > self.max_size:
+            self._remove(*next(iter(self._entries)))  # Least recently used
+            self.evictions += 1
+
+    async def invalidate(self, namespaces: Sequence[str]) -> None:
+        for namespace in namespaces:
+            self._versions[namespace] = self._versions.get(namespace, 0) + 1
+            for key in self._keys.pop(namespace, ()):
+                del self._entries[(namespace, key)]
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "max_size": self.max_size, "evictions": self.evictions}
+
+    def _remove(self, namespace: str, key: str) -> None:
+        del self._entries[(namespace, key)]
+        keys = self._keys[namespace]
+        keys.discard(key)
+        if not keys:
+            del self._keys[namespace]
+
+
+RespValue = Union[None, int, bytes, str, List["RespValue"]]
+
+
+class RedisConnection:
+    """
+    One connection speaking RESP2, the Redis serialization protocol. Commands are pipelined:
+    all of them are written at once, then all replies are read.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.reader = reader
+        self.writer = writer
+
+    @staticmethod
+    def encode(command: Sequence[Union[str, bytes, int]]) -> bytes:
+        parts = [b"*%d\r\n" % len(command)]
+        for argument in command:
+            if not isinstance(argument, bytes):
+                argument = str(argument).encode()
+            parts.append(b"$%d\r\n%s\r\n" % (len(argument), argument))
+        return b"".join(parts)
+
+    async def execute(self, *commands: Sequence[Union[str, bytes, int]]) -> List[RespValue]:
+        self.writer.write(b"".join(self.encode(command) for command in commands))
+        await self.writer.drain()
+        replies = [await self._read_reply() for _ in commands]
+        for reply in replies:
+            if isinstance(reply, CacheBackendError):
+                raise reply
+        return replies
+
+    async def _read_reply(self) -> Union[RespValue, CacheBackendError]:
+        line = await self.reader.readuntil(b"\r\n")
+        kind, payload = line[:1], line[1:-2]
+        if kind == b"+":
+            return payload.decode()
+        if kind == b"-":
+            return CacheBackendError(payload.decode())  # Raised after all replies are read, the stream stays in sync
+        if kind == b":":
+            return int(payload)
+        if kind == b"$":
+            length = int(payload)
+            if length == -1:
+                return None
+            return (await self.reader.readexactly(length + 2))[:-2]
+        if kind == b"*":
+            length = int(payload)
+            if length == -1:
+                return None
+            return [await self._read_reply() for _ in range(length)]
+        raise CacheBackendError(f"Unexpected reply from Redis: {line!r}")
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class RedisBackend(CacheBackend):
+    """
+    Cache shared by all app processes in a Redis server (or any server speaking its protocol), from a URL like
+    redis://[[username]:password@]host:port/db, with plain GET, SET ... EX and INCR (Redis 2.6.12 or later).
+
+    Each value is one key, cache:<namespace>:<key>, expiring `ttl_seconds` after it was set, which bounds
+    how long it is served. It is stored after the namespace version it was loaded as of, kept in cache:<namespace>
+    and read with the value in one pipeline. Invalidating a namespace is one INCR however many keys it holds:
+    values of older versions are not returned anymore, and are dropped when they expire.
+    """
+    name = "redis"
+
+    def __init__(self, url: str, pool_size: int = 10, timeout_seconds: float = 1.0) -> None:
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.username = unquote(parsed.username) if parsed.username else None
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout_seconds = timeout_seconds
+        self._idle: List[RedisConnection] = []
+        self._slots = asyncio.Semaphore(pool_size)
+
+    @staticmethod
+    def _version_key(namespace: str) -> str:
+        return f"cache:{namespace}"
+
+    @staticmethod
+    def _value_key(namespace: str, key: str) -> str:
+        return f"cache:{namespace}:{key}"
+
+    async def _connect(self) -> RedisConnection:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        connection = RedisConnection(reader, writer)
+        setup = []
+        if self.password is not None:  # With a username for Redis ACL users
+            setup.append(("AUTH", self.username, self.password) if self.username else ("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        if setup:
+            try:
+                await connection.execute(*setup)
+            except BaseException:
+                connection.close()
+                raise
+        return connection
+
+    async def _execute(self, *commands: Sequence[Union[str, bytes, int]]) -> List[RespValue]:
+        """
+        Runs the commands as one pipeline on a pooled connection. A connection that failed is closed,
+        its stream may be out of sync.
+        """
+        async with self._slots:
+            connection = self._idle.pop() if self._idle else None
+            try:
+                if connection is None:
+                    connection = await asyncio.wait_for(self._connect(), self.timeout_seconds)
+                replies = await asyncio.wait_for(connection.execute(*commands), self.timeout_seconds)
+            except (OSError, EOFError, asyncio.IncompleteReadError, asyncio.TimeoutError) as error:
+                if connection is not None:
+                    connection.close()
+                raise CacheBackendError(f"Redis is unavailable: {error!r}") from error
+            except BaseException:
+                if connection is not None:
+                    connection.close()
+                raise
+            self._idle.append(connection)
+            return replies
+
+    async def get(self, namespace: str, key: str) -> Tuple[Optional[bytes], int]:
+        stored, version = await self._execute(
+            ("GET", self._value_key(namespace, key)), ("GET", self._version_key(namespace))
+        )
+        version = int(version or 0)  # The namespace was never invalidated
+        if stored is None:
+            return None, version
+        stored_version, _, value = stored.partition(b":")
+        return (value if int(stored_version) == version else None), version
+
+    async def set(self, namespace: str, key: str, value: bytes, ttl_seconds: int, version: int) -> None:
+        if ttl_seconds > 0:  # EX must be positive, a value that expires at once is not stored
+            stored = b"%d:%s" % (version, value)
+            await self._execute(("SET", self._value_key(namespace, key), stored, "EX", ttl_seconds))
+
+    async def invalidate(self, namespaces: Sequence[str]) -> None:
+        if namespaces:
+            await self._execute(*(("INCR", self._version_key(namespace)) for namespace in namespaces))
+
+    async def close(self) -> None:
+        while self._idle:
+            self._idle.pop().close()
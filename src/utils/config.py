@@ -10,3 +10,52 @@ DB_NAME = os.getenv("DATABASE_NAME", "postgres")
 DB_USER = os.getenv("DATABASE_USER", "postgres")
 DB_PORT = os.getenv("DATABASE_PORT", "5432")
 
+# Connection pool of each engine (primary and replicas), per app process: connections kept open, extra ones
+# opened under load, seconds a request waits for a connection before failing, seconds before a connection
+# is replaced, and a ping on checkout so connections dropped by the server are replaced instead of failing a request
+DB_POOL_SIZE = int(os.getenv("DATABASE_POOL_SIZE", "10"))
+DB_MAX_OVERFLOW = int(os.getenv("DATABASE_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DATABASE_POOL_TIMEOUT", "10"))
+DB_POOL_RECYCLE = int(os.getenv("DATABASE_POOL_RECYCLE", "1800"))  # -1 keeps connections open indefinitely
+DB_POOL_PRE_PING = os.getenv("DATABASE_POOL_PRE_PING", "true").lower() == "true"
+# Prepared statements cached per connection, by asyncpg and by SQLAlchemy's asyncpg adapter.
+# Set both to 0 behind PgBouncer in transaction mode, which can't keep prepared statements across transactions
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DATABASE_STATEMENT_CACHE_SIZE", "100"))
+DB_PREPARED_STATEMENT_CACHE_SIZE = int(os.getenv("DATABASE_PREPARED_STATEMENT_CACHE_SIZE", "100"))
+
+# Optional read replicas: comma-separated SQLAlchemy URLs, reads go to the primary if empty
+DB_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+# How long a client's reads stay on the primary after it wrote something, so it reads its own writes
+READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", "5"))
+
+# Refresh of the /stats materialized views: checked every STATS_CHECK_SECONDS, refreshed when STATS_REFRESH_SECONDS
+# passed since the last refresh, or earlier once STATS_REFRESH_WRITES rows of cars and orders were written
+STATS_CHECK_SECONDS = int(os.getenv("STATS_CHECK_SECONDS", "30"))
+STATS_REFRESH_SECONDS = int(os.getenv("STATS_REFRESH_SECONDS", "900"))
+STATS_REFRESH_WRITES = int(os.getenv("STATS_REFRESH_WRITES", "1000"))
+
+# Cache of records and pages of records (src/utils/cache.py): where it is stored, maximum number of entries
+# in memory, and seconds an entry is served without reading it again, which bounds staleness if an invalidation fails
+# 'memory' (per process, turned off with several workers), 'redis' (shared by processes) or 'none'
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://localhost:6379/0")
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "10000"))  # Of the memory backend
+CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "60"))
+
+# Response compression (src/api/middlewares/compression.py): smallest body worth compressing,
+# and bytes of compressed bodies kept for reuse when the same body is served again
+COMPRESSION_MIN_SIZE = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+COMPRESSION_CACHE_BYTES = int(os.getenv("COMPRESSION_CACHE_BYTES", str(32 * 1024 * 1024)))
+
+# Production server (gunicorn_conf.py): worker processes, 0 for one per CPU available to the app. Each worker has
+# its own connection pools, so the database must accept workers * (DATABASE_POOL_SIZE + DATABASE_MAX_OVERFLOW)
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", "0"))
+SERVER_BIND = os.getenv("SERVER_BIND", "0.0.0.0:8000")
+# Seconds an idle keep-alive connection stays open, longer than the idle timeout of the load balancer in front
+SERVER_KEEPALIVE = int(os.getenv("SERVER_KEEPALIVE", "75"))
+SERVER_BACKLOG = int(os.getenv("SERVER_BACKLOG", "2048"))  # Connections queued by the kernel until accepted
+
+# Metrics of several workers (src/utils/metrics.py): directory where each worker writes its snapshot, merged by /metrics
+# (empty for a temporary one), and seconds between snapshots, how far behind the other workers' figures may be
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+METRICS_FLUSH_SECONDS = int(os.getenv("METRICS_FLUSH_SECONDS", "5"))
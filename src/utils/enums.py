@@ -26,3 +26,12 @@ class OrderStatus(enum.Enum):
     pending = 'pending'
     completed = 'completed'
     canceled = 'canceled'
+
+
+class CarSortField(enum.Enum):
+    """Fields cars can be sorted by in search."""
+    id = 'id'
+    price = 'price'
+    year = 'year'
+    mileage = 'mileage'
+    created_at = 'created_at'
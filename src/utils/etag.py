@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta
+from typing import List, Optional, Sequence, Union
+
+from fastapi import Response
+from pydantic import BaseModel
+
+from src.schemas.base_response import BaseResponse
+
+EPOCH = datetime(1970, 1, 1)  # updated_at columns are timestamps without time zone
+CONTENT_CODINGS = ("zstd", "br", "gzip")  # Of compressed responses, see src/api/middlewares/compression.py
+
+
+def make_etag(id: int, updated_at: datetime) -> str:
+    """
+    Strong ETag of the full representation of a record: its id and the microsecond of its last write
+    (updated_at is set by every UPDATE, see the models), e.g. "12-1718000000123456".
+    """
+    return f'"{id}-{(updated_at - EPOCH) // timedelta(microseconds=1)}"'
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """
+    ETag of a representation compressed with `encoding`: the ETag of the uncompressed one with the encoding
+    appended, e.g. "12-1718000000123456-gzip". It stays strong, the compressed bytes are as stable as the others.
+    """
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def _strip_encoding(tag: str) -> str:
+    """
+    Returns the ETag of the uncompressed representation the tag stands for (see encoded_etag).
+    """
+    for encoding in CONTENT_CODINGS:
+        suffix = f'-{encoding}"'
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)] + '"'
+    return tag
+
+
+def _etags(header: str) -> List[str]:
+    return [etag.strip() for etag in header.split(",") if etag.strip()]
+
+
+def not_modified(if_none_match: str, etag: str) -> bool:
+    """
+    Evaluates If-None-Match: true if it lists the current ETag, of any encoding, or is `*`.
+    Weak comparison, so W/ tags match too.
+    """
+    return any(tag == "*" or _strip_encoding(tag.removeprefix("W/")) == etag for tag in _etags(if_none_match))
+
+
+def if_match_versions(if_match: Optional[str], id: int) -> Optional[List[datetime]]:
+    """
+    Turns If-Match into the updated_at values the record may have for a write to proceed,
+    so the write itself checks them (UPDATE ... WHERE updated_at IN (...)) instead of reading the record first.
+    Returns None if there is no condition (no header, or `*`). ETags of compressed representations stand for
+    their record's version too. ETags of other records, weak or malformed ones match nothing (strong comparison),
+    so an empty list fails the write.
+    """
+    if if_match is None:
+        return None
+    versions = []
+    for tag in _etags(if_match):
+        if tag == "*":
+            return None
+        etag_id, _, microseconds = _strip_encoding(tag).strip('"').partition("-")
+        if tag.startswith('"') and etag_id == str(id) and microseconds.isdigit():
+            versions.append(EPOCH + timedelta(microseconds=int(microseconds)))
+    return versions
+
+
+def set_etag(response: Response, record: BaseModel) -> None:
+    """
+    Sets the ETag header of the record's full representation.
+    """
+    if getattr(record, "updated_at", None) is not None:
+        response.headers["ETag"] = make_etag(record.id, record.updated_at)
+
+
+def conditional_get(
+        result: BaseResponse,
+        response: Response,
+        if_none_match: Optional[str],
+        fields: Optional[Sequence[str]] = None
+) -> Union[BaseResponse, Response]:
+    """
+    Sets the ETag of a record read by a GET end-point, and replaces the response with an empty 304
+    if the client's copy (If-None-Match) is current. Sparse fieldsets have no ETag,
+    it identifies the full representation.
+    """
+    if fields is not None or getattr(result.data, "updated_at", None) is None:
+        return result
+    etag = make_etag(result.data.id, result.data.updated_at)
+    if if_none_match is not None and not_modified(if_none_match, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return result
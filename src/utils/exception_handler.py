@@ -1,6 +1,9 @@
 from fastapi import HTTPException
 from typing import Any
 from pydantic import BaseModel
+from sqlalchemy.exc import IntegrityError
+
+UNIQUE_VIOLATION = "23505"  # PostgreSQL SQLSTATE of a unique constraint violation
 
 
 def handle_exception(status_code: int, custom_message: str):
@@ -23,6 +26,13 @@ def handle_exception_default_500(error: Exception):
     )
 
 
+def is_unique_violation(error: IntegrityError) -> bool:
+    """
+    Checks if the IntegrityError raised by a write was caused by a unique constraint, e.g. a duplicate VIN number.
+    """
+    return getattr(error.orig, "sqlstate", None) == UNIQUE_VIOLATION
+
+
 def validate_payload(payload: Any) -> None:
     """
     Validates that the provided payload is not empty.
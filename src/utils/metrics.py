@@ -0,0 +1,302 @@
+import asyncio
+import fcntl
+import json
+import logging
+import os
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.db.pool_metrics import PoolMetrics
+from src.utils.config import METRICS_FLUSH_SECONDS
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"  # Prometheus text exposition format
+UNMATCHED_ROUTE = "unmatched"  # Route label of requests no route matched, so random paths don't add series
+
+# Upper bounds of the histogram buckets, +Inf is implied
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)  # Seconds
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)  # Bytes
+
+
+class Histogram:
+    """
+    Observations per bucket (not cumulative, they are summed when rendered), their sum and count.
+    """
+    __slots__ = ("bounds", "buckets", "sum", "count")
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)  # Last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.buckets[bisect_left(self.bounds, value)] += 1  # First bucket whose bound is >= value
+        self.sum += value
+        self.count += 1
+
+    def merge(self, buckets: List[int], total: float) -> None:
+        for i, observations in enumerate(buckets):
+            self.buckets[i] += observations
+        self.sum += total
+        self.count += sum(buckets)
+
+    def render(self, name: str, labels: str, lines: List[str]) -> None:
+        cumulative = 0
+        for bound, observations in zip((*self.bounds, "+Inf"), self.buckets):
+            cumulative += observations
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f"{name}_sum{{{labels}}} {self.sum}")
+        lines.append(f"{name}_count{{{labels}}} {self.count}")
+
+
+class RouteSeries:
+    """
+    Metrics of one route template, method and status, allocated on its first request.
+    """
+    __slots__ = ("latency", "size")
+
+    def __init__(self) -> None:
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.size = Histogram(SIZE_BUCKETS)
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class HttpMetrics:
+    """
+    Request counts, latency and response size histograms per route template, method and status,
+    and requests in flight, of this process. Updated by MetricsMiddleware (src/api/middlewares/metrics.py):
+    a request only increments counters of its series, rendering for /metrics does the rest.
+    With several workers, their snapshots are merged into one HttpMetrics for rendering (see MetricsFiles).
+    """
+
+    def __init__(self) -> None:
+        self.series: Dict[Tuple[str, str, int], RouteSeries] = {}
+        self.in_flight = 0
+
+    def _series(self, key: Tuple[str, str, int]) -> RouteSeries:
+        series = self.series.get(key)
+        if series is None:
+            series = self.series[key] = RouteSeries()
+        return series
+
+    def observe(self, route: str, method: str, status: int, seconds: float, size: int) -> None:
+        series = self._series((route, method, status))
+        series.latency.observe(seconds)
+        series.size.observe(size)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Returns the metrics as JSON-serializable data, for MetricsFiles.
+        """
+        return {
+            "in_flight": self.in_flight,
+            "series": [
+                [route, method, status, s.latency.buckets, s.latency.sum, s.size.buckets, s.size.sum]
+                for (route, method, status), s in self.series.items()
+            ],
+        }
+
+    def merge(self, snapshot: Dict[str, Any], live: bool = True) -> None:
+        """
+        Adds the metrics of a snapshot to these ones, requests in flight only if its process is still running.
+        """
+        if live:
+            self.in_flight += snapshot["in_flight"]
+        for route, method, status, latency_buckets, latency_sum, size_buckets, size_sum in snapshot["series"]:
+            series = self._series((route, method, status))
+            series.latency.merge(latency_buckets, latency_sum)
+            series.size.merge(size_buckets, size_sum)
+
+    def render(self, lines: List[str]) -> None:
+        lines.append("# HELP http_requests_in_flight Requests being served.")
+        lines.append("# TYPE http_requests_in_flight gauge")
+        lines.append(f"http_requests_in_flight {self.in_flight}")
+
+        series = sorted(self.series.items())
+        labels = [
+            f'route="{_label(route)}",method="{method}",status="{status}"' for (route, method, status), _ in series
+        ]
+        lines.append("# HELP http_requests_total Requests served.")
+        lines.append("# TYPE http_requests_total counter")
+        for label, (_, route_series) in zip(labels, series):
+            lines.append(f"http_requests_total{{{label}}} {route_series.latency.count}")
+        lines.append("# HELP http_request_duration_seconds Time from receiving a request to sending its last byte.")
+        lines.append("# TYPE http_request_duration_seconds histogram")
+        for label, (_, route_series) in zip(labels, series):
+            route_series.latency.render("http_request_duration_seconds", label, lines)
+        lines.append("# HELP http_response_size_bytes Bytes of response bodies, as sent (compressed or not).")
+        lines.append("# TYPE http_response_size_bytes histogram")
+        for label, (_, route_series) in zip(labels, series):
+            route_series.size.render("http_response_size_bytes", label, lines)
+
+    def reset(self) -> None:
+        self.series.clear()
+
+
+# Gauges and counters of PoolMetrics.stats(): name, stats key, type, help
+POOL_METRICS = (
+    ("db_pool_size", "pool_size", "gauge", "Connections kept open by the pool."),
+    ("db_pool_max_overflow", "max_overflow", "gauge", "Connections the pool may open beyond its size."),
+    ("db_pool_checked_out", "checked_out", "gauge", "Connections in use."),
+    ("db_pool_checked_out_peak", "checked_out_peak", "gauge", "Most connections in use at once."),
+    ("db_pool_overflow", "overflow", "gauge", "Connections open beyond the pool size."),
+    ("db_pool_idle", "idle", "gauge", "Open connections waiting in the pool."),
+    ("db_pool_checkouts_total", "checkouts", "counter", "Connections checked out of the pool."),
+    ("db_pool_connects_total", "connects", "counter", "Database connections opened."),
+    ("db_pool_invalidations_total", "invalidations", "counter", "Connections dropped as broken."),
+    ("db_pool_timeouts_total", "timeouts", "counter", "Checkouts that timed out waiting for a connection."),
+    ("db_pool_wait_seconds_total", "wait_seconds_total", "counter", "Time spent waiting for connections."),
+    ("db_pool_wait_seconds_max", "wait_seconds_max", "gauge", "Longest wait for a connection."),
+)
+PEAK_POOL_GAUGES = {"checked_out_peak", "wait_seconds_max"}  # Merged across processes by max, other gauges are summed
+
+
+def merge_pool_stats(merged: Dict[str, dict], stats: Dict[str, dict], live: bool = True) -> None:
+    """
+    Adds the pool stats of a process to `merged`, per engine: counters of every process,
+    gauges only of running ones.
+    """
+    for engine, engine_stats in stats.items():
+        merged_stats = merged.setdefault(engine, {})
+        for _, key, metric_type, _ in POOL_METRICS:
+            if metric_type == "counter":
+                merged_stats[key] = merged_stats.get(key, 0) + engine_stats[key]
+            elif live and key in PEAK_POOL_GAUGES:
+                merged_stats[key] = max(merged_stats.get(key, 0), engine_stats[key])
+            elif live:
+                merged_stats[key] = merged_stats.get(key, 0) + engine_stats[key]
+
+
+def render_pools(stats: Dict[str, dict], lines: List[str]) -> None:
+    for name, key, metric_type, description in POOL_METRICS:
+        lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {metric_type}")
+        for engine, engine_stats in stats.items():
+            if key in engine_stats:  # Gauges of engines of exited processes only are dropped
+                lines.append(f'{name}{{engine="{engine}"}} {engine_stats[key]}')
+
+
+class MetricsFiles:
+    """
+    Metrics of the worker processes of one server, shared through a directory (METRICS_DIR, see gunicorn_conf.py):
+    each worker writes a snapshot of its metrics to <pid>.json every `flush_seconds`, when it serves /metrics
+    and when it stops, and /metrics merges the snapshots, so the figures are of the server whichever worker
+    serves the scrape. When a worker exits, the master merges its counters into dead.json, so totals never go
+    backwards, and drops its gauges. A lock file keeps readers from seeing a snapshot both merged and not.
+    """
+    DEAD = "dead"
+
+    def __init__(self, directory: Optional[str] = None, flush_seconds: int = METRICS_FLUSH_SECONDS) -> None:
+        self.directory = directory  # None while metrics are of this process only
+        self.flush_seconds = flush_seconds
+
+    @property
+    def enabled(self) -> bool:
+        return self.directory is not None
+
+    def share(self, directory: str) -> None:
+        """
+        Shares the metrics of the processes forked from now on through `directory`, emptied of a previous run's files.
+        """
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.endswith(".json"):
+                os.remove(os.path.join(directory, name))
+        self.directory = directory
+
+    def _path(self, name: Any) -> str:
+        return os.path.join(self.directory, f"{name}.json")
+
+    @contextmanager
+    def _locked(self, operation: int) -> Iterator[None]:
+        with open(os.path.join(self.directory, ".lock"), "a") as lock:
+            fcntl.flock(lock, operation)
+            yield  # Released when the file is closed
+
+    def _load(self, path: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(path, "rb") as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return None
+
+    def write(self, http: HttpMetrics, pools: Dict[str, PoolMetrics], pid: Optional[int] = None) -> None:
+        """
+        Writes the snapshot of this process, replacing the previous one at once, so it is never read half written.
+        """
+        path = self._path(pid or os.getpid())
+        snapshot = {"http": http.snapshot(), "pools": {name: metrics.stats() for name, metrics in pools.items()}}
+        with open(f"{path}.tmp", "w") as file:
+            json.dump(snapshot, file)
+        os.replace(f"{path}.tmp", path)
+
+    def mark_dead(self, pid: int) -> None:
+        """
+        Merges the counters of an exited process into those of the processes that exited before it.
+        """
+        with self._locked(fcntl.LOCK_EX):
+            snapshot = self._load(self._path(pid))
+            if snapshot is None:  # The process exited before writing a snapshot
+                return
+            http = HttpMetrics()
+            pools: Dict[str, dict] = {}
+            for dead_snapshot in filter(None, (self._load(self._path(self.DEAD)), snapshot)):
+                http.merge(dead_snapshot["http"], live=False)
+                merge_pool_stats(pools, dead_snapshot["pools"], live=False)
+            with open(f"{self._path(self.DEAD)}.tmp", "w") as file:
+                json.dump({"http": http.snapshot(), "pools": pools}, file)
+            os.replace(f"{self._path(self.DEAD)}.tmp", self._path(self.DEAD))
+            os.remove(self._path(pid))
+
+    def read(self) -> Tuple[HttpMetrics, Dict[str, dict]]:
+        """
+        Merges the snapshots of every process, running or exited.
+        """
+        http = HttpMetrics()
+        pools: Dict[str, dict] = {}
+        with self._locked(fcntl.LOCK_SH):
+            for name in sorted(os.listdir(self.directory)):
+                if not name.endswith(".json"):
+                    continue
+                snapshot = self._load(os.path.join(self.directory, name))
+                if snapshot is not None:
+                    live = name != f"{self.DEAD}.json"
+                    http.merge(snapshot["http"], live)
+                    merge_pool_stats(pools, snapshot["pools"], live)
+        return http, pools
+
+    async def run(self, http: HttpMetrics, pools: Dict[str, PoolMetrics]) -> None:
+        """
+        Writes the snapshot of this process every `flush_seconds`, until the task is cancelled.
+        Failed writes are logged and retried on the next one.
+        """
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            try:
+                self.write(http, pools)
+            except OSError as error:
+                logging.warning(f"Metrics snapshot failed: {error}")
+
+
+def render_metrics(http: HttpMetrics, pools: Dict[str, PoolMetrics], files: Optional[MetricsFiles] = None) -> str:
+    """
+    Renders the HTTP and database pool metrics in the Prometheus text format: of this process,
+    or of every worker if they share their metrics through `files`.
+    """
+    if files is not None and files.enabled:
+        files.write(http, pools)  # The figures of this process are current, those of the others flushed
+        http, pool_stats = files.read()
+    else:
+        pool_stats = {name: metrics.stats() for name, metrics in pools.items()}
+    lines: List[str] = []
+    http.render(lines)
+    render_pools(pool_stats, lines)
+    return "\n".join(lines) + "\n"
+
+
+http_metrics = HttpMetrics()
+metrics_files = MetricsFiles()  # Shared by the workers of gunicorn_conf.py
@@ -0,0 +1,69 @@
+import base64
+import enum
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+
+DEFAULT_PAGE_LIMIT = 50  # Page size used when the client does not pass `limit`
+MAX_PAGE_LIMIT = 500  # Upper bound for `limit`, so a single page can't turn back into a full table scan
+
+
+class CountMode(enum.Enum):
+    """How list end-points count the total number of matching records."""
+    exact = 'exact'  # count(*), as expensive as reading every matching row
+    estimated = 'estimated'  # Planner's row estimate, costs no table reads but may be off
+
+
+@dataclass(frozen=True)
+class PageParams:
+    """
+    Keyset pagination parameters for list end-points.
+
+    `cursor` is the decoded (sort_value, id) pair of the last row of the previous page, or None for the first page.
+    `count` is how to count the total, or None to not count it.
+    """
+    limit: int = DEFAULT_PAGE_LIMIT
+    cursor: Optional[Tuple[Any, int]] = None
+    count: Optional[CountMode] = None
+
+
+def encode_cursor(sort_value: Any, last_id: int) -> str:
+    """
+    Encodes the keyset position of the last returned row into an opaque, URL-safe token.
+    """
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    elif isinstance(sort_value, enum.Enum):
+        sort_value = sort_value.value
+
+    raw = json.dumps([sort_value, last_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Any, int]:
+    """
+    Decodes a token created by `encode_cursor`. Raises ValueError if the token is malformed.
+    """
+    padded = cursor + "=" * (-len(cursor) % 4)  # Padding is stripped in encode_cursor
+    try:
+        sort_value, last_id = json.loads(base64.urlsafe_b64decode(padded))
+    except TypeError as e:  # For example, the decoded JSON is not a list
+        raise ValueError("Malformed cursor.") from e
+
+    if not isinstance(last_id, int) or isinstance(last_id, bool):
+        raise ValueError("Malformed cursor.")
+    return sort_value, last_id
+
+
+def paginate(items: List[Any], page: PageParams, order_by: str = "id") -> Tuple[List[Any], Optional[str]]:
+    """
+    Trims the extra row requested from the repository (services ask for `limit + 1` rows to know whether
+    there is a next page) and builds `next_cursor` from the last row of the page. `next_cursor` is None on the last page.
+    """
+    if len(items) <= page.limit:
+        return items, None
+
+    items = items[:page.limit]
+    last_item = items[-1]
+    return items, encode_cursor(getattr(last_item, order_by), last_item.id)
@@ -1,7 +1,65 @@
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, Sequence, Tuple
 
-from sqlalchemy import insert, select, delete, update
+from pydantic import TypeAdapter
+from sqlalchemy import ColumnElement, Integer, Row, Select, bindparam, func, insert, select, delete, text, update, tuple_
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ClauseElement, Executable
+from sqlalchemy.sql.visitors import InternalTraversal
+
+from src.utils.cache import entity_cache, has_written, is_pinned, is_replica, mark_written
+from src.utils.pagination import CountMode
+from src.utils.streaming import STREAM_YIELD_PER
+
+# Planner's row estimate of a whole table, kept up to date by autovacuum/ANALYZE (-1 if the table was never analyzed)
+RELTUPLES_STATEMENT = text("SELECT reltuples FROM pg_class WHERE oid = CAST(:table_name AS regclass)")
+
+
+# Prebuilt statements kept per repository. Shapes depend on the query string (sparse fieldsets, search filters),
+# so clients could otherwise add statements without limit. Same size as SQLAlchemy's compiled cache
+MAX_STATEMENTS = 500
+
+
+class StatementRegistry(OrderedDict):
+    """
+    Prebuilt statements by query shape, at most `max_size` of them (least recently used dropped first).
+    """
+
+    def __init__(self, max_size: int = MAX_STATEMENTS) -> None:
+        super().__init__()
+        self.max_size = max_size
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        statement = super().get(key, default)
+        if statement is not default:
+            self.move_to_end(key)
+        return statement
+
+    def __setitem__(self, key: Any, statement: Any) -> None:
+        super().__setitem__(key, statement)
+        while len(self) > self.max_size:
+            self.popitem(last=False)
+
+
+class Explain(Executable, ClauseElement):
+    """
+    EXPLAIN (FORMAT JSON) of a statement, executed with the statement's bound parameters.
+    Returns one row with the plan, the root node's "Plan Rows" is the planner's row estimate.
+    """
+    inherit_cache = True
+    _traverse_internals = [("statement", InternalTraversal.dp_clauseelement)]
+
+    def __init__(self, statement: Select):
+        self.statement = statement
+
+
+@compiles(Explain)
+def _compile_explain(element: Explain, compiler, **kwargs) -> str:
+    return "EXPLAIN (FORMAT JSON) " + compiler.process(element.statement, **kwargs)
 
 
 class AbstractRepository(ABC):
@@ -13,83 +71,477 @@ class AbstractRepository(ABC):
         raise NotImplementedError
 
     @abstractmethod
-    async def get_one(self, **filter_by):
-        """Fetches a single record based on provided filter criteria."""
+    async def create_one_or_none(self, data: dict, conflict_field: str):
+        """Creates a new record and returns it, or returns None if a record with the same unique `conflict_field` exists."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def create_many(self, data: List[dict]):
+        """Creates several records in one multi-row INSERT and returns them in the same order."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_one(self, fields: Optional[Sequence[str]] = None, **filter_by):
+        """Fetches a single record (or only its `fields`) based on provided filter criteria."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_many(
+            self,
+            limit: Optional[int] = None,
+            cursor: Optional[Tuple[Any, int]] = None,
+            order_by: str = "id",
+            fields: Optional[Sequence[str]] = None,
+            **filter_by
+    ):
+        """Fetches records based on provided filter criteria, optionally one keyset page at a time."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def stream_many(
+            self,
+            cursor: Optional[Tuple[Any, int]] = None,
+            order_by: str = "id",
+            fields: Optional[Sequence[str]] = None,
+            **filter_by
+    ) -> AsyncIterator[list]:
+        """Streams all records matching the filter criteria in partitions, without loading them all into memory."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def count(self, mode: CountMode = CountMode.exact, **filter_by) -> int:
+        """Counts records based on provided filter criteria, exactly or by the planner's estimate."""
         raise NotImplementedError
 
     @abstractmethod
-    async def get_many(self, **filter_by):
-        """Fetches all records based on provided filter criteria."""
+    async def get_many_in(self, field: str, values: list):
+        """Fetches all records whose `field` is one of `values`."""
         raise NotImplementedError
 
     @abstractmethod
-    async def edit_one(self, id: int, data: dict):
-        """Edits a record by ID and returns it."""
+    async def edit_one(self, id: int, data: dict, versions: Optional[Sequence[datetime]] = None):
+        """
+        Edits a record by ID and returns it, or returns None if no record has this ID
+        (or, if `versions` are passed, if its updated_at is none of them).
+        """
         raise NotImplementedError
 
     @abstractmethod
-    async def get_all(self):
-        """Fetches all records."""
+    async def edit_many(self, data: List[dict]):
+        """
+        Edits several records by the 'id' key of each dict and returns them in the order of `data`,
+        None in place of those no record has the ID of.
+        """
         raise NotImplementedError
 
     @abstractmethod
-    async def delete_one(self, id: int) -> int:
-        """Deletes a record by ID and returns its ID."""
+    async def get_all(
+            self,
+            limit: Optional[int] = None,
+            cursor: Optional[Tuple[Any, int]] = None,
+            order_by: str = "id",
+            fields: Optional[Sequence[str]] = None
+    ):
+        """Fetches all records, optionally one keyset page at a time."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_one(self, id: int) -> Optional[int]:
+        """Deletes a record by ID and returns its ID, or returns None if no record has this ID."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_many(self, ids: List[int]) -> List[int]:
+        """Deletes several records by ID and returns the IDs that existed."""
         raise NotImplementedError
 
 
 class SQLAlchemyRepository(AbstractRepository):
+    """
+    Repository on top of an AsyncSession. Write methods only execute statements: committing is up to
+    the unit of work that shares the session, see src/utils/unit_of_work.py.
+    """
     model = None
+    schema = None  # Read schema built from selected rows, see _select and _to_read_models
+    partial_schema = None  # Schema for sparse fieldsets
+    cached = False  # Serve get_one, get_many and get_all from the entity cache, see src/utils/cache.py
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._statements = StatementRegistry()  # Prebuilt read statements of this repository, see _read_statement
+        cls._adapters = {}  # Serializers of cached results, see _cache_adapter
 
     def __init__(self, session: AsyncSession):
         self.session = session
 
+    def _select(self, fields: Optional[Sequence[str]] = None) -> Select:
+        """
+        Selects the table columns of the read schema (or only the requested `fields`) with Core,
+        so read-only requests never build ORM instances or touch the session's identity map.
+        """
+        columns = self.model.__table__.c
+        return select(*(columns[field] for field in (fields or self.schema.model_fields)))
+
+    def _to_read_models(self, rows: Sequence[Row], fields: Optional[Sequence[str]] = None) -> list:
+        """
+        Converts rows selected by _select into read schemas. The values come from typed columns,
+        so they are trusted as is: model_construct skips per-field validation.
+        """
+        schema = self.schema if fields is None else self.partial_schema
+        return [schema.model_construct(**row._mapping) for row in rows]
+
+    def _normalize_fields(self, fields: Optional[Sequence[str]]) -> Optional[Tuple[str, ...]]:
+        """
+        Orders requested fields as in the read schema, so the same fields in any order share one statement.
+        """
+        if fields is None:
+            return None
+        return tuple(field for field in self.schema.model_fields if field in fields)
+
+    def _equality_conditions(self, filter_keys: Tuple[str, ...]) -> List[ColumnElement]:
+        """
+        `column = :filter_<column>` for every filter key, values are bound by _read_params.
+        """
+        columns = self.model.__table__.c
+        return [columns[column] == bindparam(f"filter_{column}") for column in filter_keys]
+
+    def _read_statement(
+            self,
+            filter_keys: Tuple[str, ...] = (),
+            fields: Optional[Sequence[str]] = None,
+            order_by: Optional[str] = None,
+            limited: bool = False,
+            after_cursor: bool = False
+    ) -> Select:
+        """
+        Returns the prebuilt statement for a query shape, building it on first use. Values are bound
+        at execution time (see _read_params), so every call of the same shape reuses one statement object
+        with its memoized cache key, and SQLAlchemy takes the compiled SQL from its cache.
+        """
+        fields = self._normalize_fields(fields)
+        key = (filter_keys, fields, order_by, limited, after_cursor)
+        statement = self._statements.get(key)
+        if statement is None:
+            statement = self._select(fields).where(*self._equality_conditions(filter_keys))
+            if order_by is not None:
+                statement = self._apply_keyset(statement, order_by, limited, after_cursor)
+            self._statements[key] = statement
+        return statement
+
+    def _read_params(
+            self,
+            filter_by: dict,
+            limit: Optional[int] = None,
+            cursor: Optional[Tuple[Any, int]] = None,
+            order_by: str = "id"
+    ) -> dict:
+        """
+        Builds the parameters bound to a statement returned by _read_statement.
+        Raises ValueError if the sort value of the cursor does not fit `order_by` (e.g. a cursor of another sort).
+        """
+        params = {f"filter_{key}": value for key, value in filter_by.items()}
+        if limit is not None:
+            params["limit"] = limit
+        if cursor is not None:
+            sort_value, params["cursor_id"] = cursor
+            if order_by != "id":
+                python_type = getattr(self.model, order_by).type.python_type
+                if python_type is datetime:  # Cursor stores datetimes as ISO strings
+                    try:
+                        sort_value = datetime.fromisoformat(sort_value)
+                    except TypeError as e:
+                        raise ValueError("Malformed cursor.") from e
+                elif python_type in (int, str) and type(sort_value) is not python_type:
+                    raise ValueError("Malformed cursor.")
+                params["cursor_value"] = sort_value
+        return params
+
+    def _apply_keyset(self, statement: Select, order_by: str, limited: bool, after_cursor: bool) -> Select:
+        """
+        Orders the statement by (order_by, id) and continues after the cursor with
+        `WHERE (sort_key, id) > (...) LIMIT n`, so every page costs the same index range scan.
+        """
+        sort_column = getattr(self.model, order_by)
+
+        if after_cursor:
+            if order_by == "id":
+                statement = statement.where(self.model.id > bindparam("cursor_id"))
+            else:
+                statement = statement.where(
+                    tuple_(sort_column, self.model.id)
+                    > tuple_(bindparam("cursor_value", type_=sort_column.type), bindparam("cursor_id"))
+                )
+
+        # id is the tie-breaker, so rows with equal sort keys are neither skipped nor repeated between pages
+        order_columns = (sort_column,) if order_by == "id" else (sort_column, self.model.id)
+        statement = statement.order_by(*order_columns)
+        if limited:
+            statement = statement.limit(bindparam("limit", type_=Integer))
+        return statement
+
+    def _written(self) -> None:
+        """
+        Marks the table as written by this session: its cached results are invalidated when the unit of work commits,
+        and until then the session's reads skip the cache.
+        """
+        if self.cached:
+            mark_written(self.session, self.model.__tablename__)
+
+    def _cache_adapter(self, fields: Optional[Sequence[str]], many: bool) -> TypeAdapter:
+        """
+        Returns the adapter converting a cached result (a read schema, or a list of them) to and from JSON bytes.
+        """
+        key = (fields is not None, many)
+        adapter = self._adapters.get(key)
+        if adapter is None:
+            schema = self.schema if fields is None else self.partial_schema
+            adapter = TypeAdapter(List[schema] if many else schema)
+            self._adapters[key] = adapter
+        return adapter
+
+    async def _cached_read(
+            self,
+            key: str,
+            fields: Optional[Sequence[str]],
+            many: bool,
+            loader: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Serves the read from the entity cache under the table's namespace, unless the repository is not cached,
+        this session wrote to the table (its reads must see its uncommitted writes) or serves a client pinned
+        to the primary. Reads of replica sessions are not stored in the cache (see mark_replica).
+        """
+        if not self.cached or has_written(self.session, self.model.__tablename__) or is_pinned(self.session):
+            return await loader()
+        adapter = self._cache_adapter(fields, many)
+        return await entity_cache.get_or_load(
+            self.model.__tablename__, key, adapter, loader, store=not is_replica(self.session)
+        )
+
     async def create_one(self, data: dict):
         statement = insert(self.model).values(**data).returning(self.model)
         result = await self.session.execute(statement)
-        await self.session.commit()
 
         created_entity = result.scalars().first()
         entity = created_entity.to_read_model()
+        self._written()
         return entity
 
-    async def get_one(self, **filter_by):
+    async def create_one_or_none(self, data: dict, conflict_field: str):
+        # INSERT ... ON CONFLICT DO NOTHING RETURNING: the uniqueness check and the insert are one atomic statement,
+        # so concurrent creates of the same value can't both pass a separate existence check
+        columns = self.model.__table__.c
+        statement = (
+            postgresql.insert(self.model)
+            .values(**data)
+            .on_conflict_do_nothing(index_elements=[conflict_field])
+            .returning(*(columns[field] for field in self.schema.model_fields))
+        )
+        result = await self.session.execute(statement)
+        instances = self._to_read_models(result.all())
+        if not instances:
+            return None  # Return None if the value of conflict_field is taken
+        self._written()
+        return instances[0]
+
+    async def create_many(self, data: List[dict]):
+        # ORM bulk INSERT: rows are sent as batched multi-row VALUES with RETURNING ("insertmanyvalues"),
+        # and sort_by_parameter_order keeps returned rows in the order of `data`
+        statement = insert(self.model).returning(self.model, sort_by_parameter_order=True)
+        result = await self.session.execute(statement, data)
+
+        entities = [entity.to_read_model() for entity in result.scalars().all()]
+        self._written()
+        return entities
+
+    async def get_one(self, fields: Optional[Sequence[str]] = None, **filter_by):
         # Filter by is used for different get functions in services, for example: get by vin_number
         # in src/services/cars.py, get by email in src/services/users.py
-        statement = select(self.model).filter_by(**filter_by)
-        result = await self.session.execute(statement)
-        instance = result.scalar_one_or_none()
-        if not instance:
+        fields = self._normalize_fields(fields)
+        key = f"one:{sorted(filter_by.items())!r}:{fields!r}"
+        return await self._cached_read(key, fields, False, lambda: self._get_one(fields, **filter_by))
+
+    async def _get_one(self, fields: Optional[Sequence[str]] = None, **filter_by):
+        statement = self._read_statement(tuple(sorted(filter_by)), fields)
+        result = await self.session.execute(statement, self._read_params(filter_by))
+        instances = self._to_read_models(result.all(), fields)
+        if not instances:
             return None  # Return None if no record is found
-        return instance.to_read_model()
+        return instances[0]
 
-    async def get_many(self, **filter_by):
-        statement = select(self.model).filter_by(**filter_by)
-        result = await self.session.execute(statement)
+    async def get_many(
+            self,
+            limit: Optional[int] = None,
+            cursor: Optional[Tuple[Any, int]] = None,
+            order_by: str = "id",
+            fields: Optional[Sequence[str]] = None,
+            **filter_by
+    ):
+        fields = self._normalize_fields(fields)
+        key = f"many:{sorted(filter_by.items())!r}:{order_by}:{cursor!r}:{limit!r}:{fields!r}"
+        return await self._cached_read(
+            key, fields, True, lambda: self._get_many(limit, cursor, order_by, fields, **filter_by)
+        )
+
+    async def _get_many(
+            self,
+            limit: Optional[int],
+            cursor: Optional[Tuple[Any, int]],
+            order_by: str,
+            fields: Optional[Sequence[str]],
+            **filter_by
+    ) -> list:
+        statement = self._read_statement(tuple(sorted(filter_by)), fields, order_by, limit is not None, cursor is not None)
+        result = await self.session.execute(statement, self._read_params(filter_by, limit, cursor, order_by))
 
-        instances = [instance.to_read_model() for instance in result.scalars().all()]
+        instances = self._to_read_models(result.all(), fields)
         return instances
 
-    async def edit_one(self, id: int, data: dict):
+    async def stream_many(
+            self,
+            cursor: Optional[Tuple[Any, int]] = None,
+            order_by: str = "id",
+            fields: Optional[Sequence[str]] = None,
+            **filter_by
+    ) -> AsyncIterator[list]:
+        statement = self._read_statement(tuple(sorted(filter_by)), fields, order_by, after_cursor=cursor is not None)
+        params = self._read_params(filter_by, cursor=cursor, order_by=order_by)
+        # yield_per makes asyncpg read through a server-side cursor, STREAM_YIELD_PER rows at a time
+        statement = statement.execution_options(yield_per=STREAM_YIELD_PER)
+
+        # The query runs on the first iteration, when the response body is sent. By then FastAPI has already
+        # exited the session dependency, so the session is reopened here and closed when the stream ends
+        try:
+            result = await self.session.stream(statement, params)
+            async for partition in result.partitions():
+                yield self._to_read_models(partition, fields)
+        finally:
+            await self.session.close()
+
+    async def count(self, mode: CountMode = CountMode.exact, **filter_by) -> int:
+        filter_keys = tuple(sorted(filter_by))
+        return await self._count(
+            mode, ("count", filter_keys), lambda: self._equality_conditions(filter_keys), self._read_params(filter_by)
+        )
+
+    async def _count(
+            self,
+            mode: CountMode,
+            key: tuple,
+            conditions: Callable[[], List[ColumnElement]],
+            params: dict
+    ) -> int:
+        """
+        Counts the rows matching `conditions` (built only on first use of `key`) with bound `params`.
+        """
+        if mode is CountMode.estimated:
+            if not params:  # Whole table: the statistics already hold the estimate, no planning needed
+                result = await self.session.execute(RELTUPLES_STATEMENT, {"table_name": self.model.__tablename__})
+                reltuples = result.scalar_one()
+                if reltuples >= 0:
+                    return int(reltuples)
+            # Filtered (or never analyzed) table: the planner's estimate for the same query shape as the list
+            statement = self._statements.get(("estimate", key))
+            if statement is None:
+                statement = Explain(self._select(("id",)).where(*conditions()))
+                self._statements[("estimate", key)] = statement
+            result = await self.session.execute(statement, params)
+            return int(result.scalar_one()[0]["Plan"]["Plan Rows"])
+
+        statement = self._statements.get(key)
+        if statement is None:
+            statement = select(func.count()).select_from(self.model.__table__).where(*conditions())
+            self._statements[key] = statement
+        result = await self.session.execute(statement, params)
+        return result.scalar_one()
+
+    async def get_many_in(self, field: str, values: list):
+        statement = self._statements.get(("in", field))
+        if statement is None:  # Expanding IN, so lists of any length share one statement
+            statement = self._select().where(getattr(self.model, field).in_(bindparam("values", expanding=True)))
+            self._statements[("in", field)] = statement
+        result = await self.session.execute(statement, {"values": values})
+        return self._to_read_models(result.all())
+
+    async def edit_one(self, id: int, data: dict, versions: Optional[Sequence[datetime]] = None):
         # Filter data to exclude None values, because all attributes in db are not nullable
         filtered_data = {key: value for key, value in data.items() if value is not None}
 
-        statement = update(self.model).values(**filtered_data).filter_by(id=id).returning(self.model)
+        # UPDATE ... RETURNING on the table: the existence check and the update are one statement,
+        # so a record deleted in between is reported as missing instead of failing
+        table = self.model.__table__
+        statement = (
+            update(table)
+            .where(table.c.id == id)
+            .values(**filtered_data)
+            .returning(*(table.c[field] for field in self.schema.model_fields))
+        )
+        if versions is not None:
+            # Conditional write (If-Match): the condition is on the updated row itself, so it is checked again
+            # against a concurrent update that committed first, and only one of them writes
+            statement = statement.where(table.c.updated_at.in_(versions))
         result = await self.session.execute(statement)
-        await self.session.commit()
+        instances = self._to_read_models(result.all())
+        if not instances:
+            return None  # Return None if there is no record with this id (or its version does not match)
+        self._written()
+        return instances[0]
 
-        updated_entity = result.scalars().first()
-        entity = updated_entity.to_read_model()
-        return entity
+    async def edit_many(self, data: List[dict]):
+        # Same rule as in edit_one: None values are skipped, because all attributes in db are not nullable
+        rows = [{key: value for key, value in row.items() if value is not None} for row in data]
+
+        # Rows that change the same set of columns share one UPDATE statement, sent as one executemany batch.
+        # Core is used instead of ORM bulk UPDATE, because the ORM raises on single rows that match nothing
+        rows_by_columns = {}
+        for row in rows:
+            columns = tuple(sorted(key for key in row if key != "id"))
+            rows_by_columns.setdefault(columns, []).append(row)
 
-    async def get_all(self):
-        statement = select(self.model)
+        table = self.model.__table__
+        for columns, grouped_rows in rows_by_columns.items():
+            if not columns:  # Nothing to update
+                continue
+            statement = (
+                update(table)
+                .where(table.c.id == bindparam("row_id"))
+                .values({column: bindparam(f"new_{column}") for column in columns})
+            )
+            parameters = [
+                {"row_id": row["id"], **{f"new_{column}": row[column] for column in columns}} for row in grouped_rows
+            ]
+            await self.session.execute(statement, parameters)
+
+        # Updated rows are read back with Core like any other read (executemany can't return rows)
+        statement = self._select().where(table.c.id.in_([row["id"] for row in rows]))
         result = await self.session.execute(statement)
-        instances = [instance.to_read_model() for instance in result.scalars().all()]  # Can be []
-        return instances
+        entities_by_id = {entity.id: entity for entity in self._to_read_models(result.all())}
+        if entities_by_id:
+            self._written()
+        return [entities_by_id.get(row["id"]) for row in rows]
 
-    async def delete_one(self, id: int) -> int:
+    async def get_all(
+            self,
+            limit: Optional[int] = None,
+            cursor: Optional[Tuple[Any, int]] = None,
+            order_by: str = "id",
+            fields: Optional[Sequence[str]] = None
+    ):
+        # Same as get_many without filters, so both share cached pages
+        return await self.get_many(limit, cursor, order_by, fields)
+
+    async def delete_one(self, id: int) -> Optional[int]:
         statement = delete(self.model).where(self.model.id == id).returning(self.model.id)
         result = await self.session.execute(statement)
-        await self.session.commit()
-        return result.scalar_one()
+        deleted_id = result.scalar_one_or_none()
+        if deleted_id is not None:
+            self._written()
+        return deleted_id
+
+    async def delete_many(self, ids: List[int]) -> List[int]:
+        statement = delete(self.model).where(self.model.id.in_(ids)).returning(self.model.id)
+        result = await self.session.execute(statement)
+        deleted_ids = list(result.scalars().all())
+        if deleted_ids:
+            self._written()
+        return deleted_ids
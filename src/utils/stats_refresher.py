@@ -0,0 +1,63 @@
+import asyncio
+import logging
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from src.repositories.stats import StatsRepository
+from src.utils.config import STATS_CHECK_SECONDS, STATS_REFRESH_SECONDS, STATS_REFRESH_WRITES
+
+
+class StatsRefresher:
+    """
+    Keeps the /stats materialized views fresh: every `check_seconds` it refreshes them if `refresh_seconds`
+    passed since the last refresh, or earlier if `refresh_writes` rows of cars and orders were written since.
+    Started with the app, see lifespan in main.py. The last refresh is read from the database (stats_refreshes),
+    under the refresh lock, so all app instances and workers refresh the views once between them.
+    """
+
+    def __init__(
+            self,
+            session_maker: async_sessionmaker,
+            check_seconds: int = STATS_CHECK_SECONDS,
+            refresh_seconds: int = STATS_REFRESH_SECONDS,
+            refresh_writes: int = STATS_REFRESH_WRITES
+    ) -> None:
+        self.session_maker = session_maker
+        self.check_seconds = check_seconds
+        self.refresh_seconds = refresh_seconds
+        self.refresh_writes = refresh_writes
+
+    def _is_due(self, seconds_since: Optional[float], writes: int, writes_at_refresh: int) -> bool:
+        if seconds_since is None or seconds_since >= self.refresh_seconds:
+            return True
+        # Fewer writes than at the last refresh means the statistics were reset
+        return writes - writes_at_refresh >= self.refresh_writes or writes < writes_at_refresh
+
+    async def refresh_if_due(self) -> bool:
+        """
+        Refreshes the views if they are due, returns True if this call refreshed them.
+        """
+        async with self.session_maker() as session:
+            stats_repo = StatsRepository(session)
+            if not await stats_repo.try_lock_refresh():
+                return False  # Another instance is refreshing them right now
+            seconds_since, writes_at_refresh = await stats_repo.last_refresh()
+            if not self._is_due(seconds_since, await stats_repo.write_count(), writes_at_refresh):
+                return False  # The lock is released with the transaction, when the session closes
+
+            await stats_repo.refresh()
+            await session.commit()
+        return True
+
+    async def run(self) -> None:
+        """
+        Checks forever, until the task is cancelled. Failed checks are logged and retried on the next one.
+        """
+        while True:
+            try:
+                if await self.refresh_if_due():
+                    logging.info("Stats views refreshed")
+            except Exception:
+                logging.exception("Stats views refresh failed")
+            await asyncio.sleep(self.check_seconds)
@@ -0,0 +1,22 @@
+from typing import AsyncIterator, List
+
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"  # Send it in the Accept header to get a list end-point as a stream
+STREAM_YIELD_PER = 1000  # Rows fetched from the server-side cursor per round trip, and written per response chunk
+
+
+def ndjson_response(partitions: AsyncIterator[List[BaseModel]]) -> StreamingResponse:
+    """
+    Streams records as newline-delimited JSON, one record per line, one response chunk per partition,
+    so memory use does not depend on how many records there are.
+    """
+    async def _lines():
+        try:
+            async for partition in partitions:
+                yield "".join(item.model_dump_json() + "\n" for item in partition)
+        finally:
+            await partitions.aclose()  # Releases the cursor if the client disconnects mid-stream
+
+    return StreamingResponse(_lines(), media_type=NDJSON_MEDIA_TYPE)
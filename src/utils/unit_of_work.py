@@ -0,0 +1,41 @@
+from abc import ABC, abstractmethod
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.utils.cache import entity_cache, pop_written
+
+
+class AbstractUnitOfWork(ABC):
+    """Abstract base class defining the contract for units of work."""
+
+    @abstractmethod
+    async def commit(self) -> None:
+        """Commits everything written through the repositories since the last commit."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def rollback(self) -> None:
+        """Discards everything written through the repositories since the last commit."""
+        raise NotImplementedError
+
+
+class UnitOfWork(AbstractUnitOfWork):
+    """
+    Owns the transaction of a request. Repositories share its session and only execute statements,
+    services commit once per request (or once per chunk in bulk flows), so multi-step writes are atomic.
+    Writes that are not committed are rolled back when the session closes.
+    Committed writes invalidate the cached results of the tables they touched, see src/utils/cache.py.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def commit(self) -> None:
+        await self.session.commit()
+        written = pop_written(self.session)
+        if written:
+            await entity_cache.invalidate(written)
+
+    async def rollback(self) -> None:
+        await self.session.rollback()
+        pop_written(self.session)  # Nothing was written
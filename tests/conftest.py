@@ -7,9 +7,13 @@ from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.exc import SQLAlchemyError
 
 from main import app
+from src.db import db
 from src.db.db import Base, get_async_session
+from src.utils.cache import entity_cache
+from src.utils.cache_backends import RedisBackend
 
 from tests.utils.config import TEST_DB_USER, TEST_DB_PASSWORD, TEST_DB_HOST, TEST_DB_NAME, TEST_DB_PORT
+from tests.utils.fake_redis import FakeRedisServer
 
 # --- Configuration ---
 DATABASE_URL = f"postgresql+asyncpg://{TEST_DB_USER}:{TEST_DB_PASSWORD}@{TEST_DB_HOST}:{TEST_DB_PORT}/{TEST_DB_NAME}"
@@ -52,7 +56,10 @@ async def prepare_database():
     """
     Sets up the test database before each test (drops all tables, then creates them).
     After each test, it drops all tables again to ensure a clean state.
+    The entity cache is cleared too, ids of the recreated tables start over.
     """
+    await entity_cache.invalidate(Base.metadata.tables)
+    entity_cache.reset_stats()
     async with engine_test.begin() as conn:
         await conn.run_sync(Base.metadata.drop_all)
         await conn.run_sync(Base.metadata.create_all)
@@ -85,6 +92,47 @@ async def override_get_async_session():
     app.dependency_overrides.pop(get_async_session, None)
 
 
+@pytest_asyncio.fixture
+async def fake_replica(monkeypatch):
+    """
+    Configures one read replica that is the test database itself, and counts the sessions opened on it,
+    so tests can check which requests were routed to the replica.
+    """
+
+    class FakeReplica:
+        sessions_opened = 0
+
+        def __call__(self):
+            self.sessions_opened += 1
+            return TestSession()
+
+    replica = FakeReplica()
+    monkeypatch.setattr(db, "replica_session_makers", [replica])
+    yield replica
+
+
+@pytest_asyncio.fixture
+async def fake_redis():
+    """
+    Starts an in-process server speaking the Redis protocol (see tests/utils/fake_redis.py), stopped after the test.
+    """
+    server = FakeRedisServer(password="test")
+    await server.start()
+    yield server
+    await server.stop()
+
+
+@pytest_asyncio.fixture
+async def redis_cache(fake_redis, monkeypatch):
+    """
+    Stores the entity cache in the fake Redis server for the duration of the test.
+    """
+    backend = RedisBackend(fake_redis.url)
+    monkeypatch.setattr(entity_cache, "backend", backend)
+    yield fake_redis
+    await backend.close()
+
+
 # --- HTTP client fixture ---
 @pytest_asyncio.fixture
 async def client(override_get_async_session):
@@ -0,0 +1,144 @@
+import json
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from src.api.middlewares import compression
+from main import app
+from src.api.middlewares.compression import LEVELS, CompressionLevel, CompressionMiddleware, negotiate
+from tests.utils.config import CAR_CREATE_VALID
+
+
+async def create_cars(client, count: int) -> None:
+    payload = []
+    for i in range(count):
+        car_data = CAR_CREATE_VALID.copy()
+        car_data["vin_number"] = f"VINZIP{i:011d}"
+        payload.append(car_data)
+    resp = await client.post("/cars/bulk", json=payload)
+    assert resp.status_code == 200, f"Error creating cars: {resp.text}"
+
+
+def test_negotiate():
+    """
+    Test the choice of encoding from Accept-Encoding.
+    Expects the highest q-value to win, ties to go to the preferred encoding, and None if nothing offered is accepted.
+    """
+    encodings = ["zstd", "br", "gzip"]
+    assert negotiate("gzip, br", encodings) == "br", "Tie was not won by the preferred encoding."
+    assert negotiate("br;q=0.5, gzip", encodings) == "gzip", "Higher q-value was not chosen."
+    assert negotiate("*", encodings) == "zstd", "Wildcard did not accept the preferred encoding."
+    assert negotiate("gzip;q=0, identity", encodings) is None, "Refused encoding was chosen."
+    assert negotiate("", encodings) is None, "Encoding chosen without Accept-Encoding."
+
+
+@pytest.mark.asyncio
+async def test_large_page_compressed_once(client, monkeypatch):
+    """
+    Test compression of a large page of cars, requested twice.
+    Expects a gzip body at the best level of the route with Vary set, compressed once and reused the second time.
+    """
+    await create_cars(client, 10)
+    calls = []
+    compress = compression.compress
+
+    def counting_compress(body, encoding, level):
+        calls.append((encoding, level))
+        return compress(body, encoding, level)
+
+    monkeypatch.setattr(compression, "compress", counting_compress)
+
+    for _ in range(2):
+        response = await client.get("/cars/", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200, f"Error retrieving cars: {response.text}"
+        assert response.headers["content-encoding"] == "gzip", "Large page was not compressed."
+        assert response.headers["vary"] == "Accept-Encoding", "Compressed response does not vary on encoding."
+        assert int(response.headers["content-length"]) < len(response.content), "Body did not get smaller."
+        assert len(response.json()["data"]) == 10, "Unexpected page after decompression."
+    assert calls == [("gzip", LEVELS["gzip"][CompressionLevel.best])], f"Unexpected compressions: {calls}"
+
+
+@pytest.mark.asyncio
+async def test_small_response_not_compressed(client):
+    """
+    Test a response below COMPRESSION_MIN_SIZE and a client that accepts no offered encoding.
+    Expects both uncompressed.
+    """
+    await create_cars(client, 10)
+
+    small_resp = await client.get("/cars/", params={"fields": "id", "limit": 1}, headers={"Accept-Encoding": "gzip"})
+    assert small_resp.status_code == 200, f"Error retrieving cars: {small_resp.text}"
+    assert "content-encoding" not in small_resp.headers, "Small response was compressed."
+    assert small_resp.headers["vary"] == "Accept-Encoding", "Response does not vary on encoding."
+
+    identity_resp = await client.get("/cars/", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity_resp.headers, "Response compressed for a client refusing it."
+
+
+@pytest.mark.asyncio
+async def test_stream_compressed(client):
+    """
+    Test compression of an NDJSON stream of cars.
+    Expects a gzip body without Content-Length, decoding to every car.
+    """
+    await create_cars(client, 10)
+
+    response = await client.get(
+        "/cars/", params={"limit": 3}, headers={"Accept": "application/x-ndjson", "Accept-Encoding": "gzip"}
+    )
+    assert response.status_code == 200, f"Error streaming cars: {response.text}"
+    assert response.headers["content-encoding"] == "gzip", "Stream was not compressed."
+    assert "content-length" not in response.headers, "Compressed stream kept the uncompressed length."
+    cars = [json.loads(line) for line in response.text.splitlines()]
+    assert len(cars) == 10, f"Expected 10 streamed cars, got {len(cars)}"
+
+
+@pytest.mark.asyncio
+async def test_compressed_etag_encoded():
+    """
+    Test the ETag of a response compressed by the middleware, and of one it leaves as is.
+    Expects a strong ETag of the encoding on the compressed response only,
+    since its bytes are not the ones the ETag was computed for.
+    """
+    async def endpoint(scope, receive, send):
+        body = json.dumps({"data": "x" * int(scope["query_string"])}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [(b"content-type", b"application/json"), (b"etag", b'"1-1"')],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+    app = CompressionMiddleware(endpoint, min_size=100)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        large_resp = await client.get("/?200", headers={"Accept-Encoding": "gzip"})
+        assert large_resp.headers["content-encoding"] == "gzip", "Large response was not compressed."
+        assert large_resp.headers["etag"] == '"1-1-gzip"', f"ETag of the encoding not set: {large_resp.headers['etag']}"
+        assert large_resp.json() == {"data": "x" * 200}, "Unexpected body after decompression."
+
+        small_resp = await client.get("/?10", headers={"Accept-Encoding": "gzip"})
+        assert small_resp.headers["etag"] == '"1-1"', "ETag of an uncompressed response was changed."
+
+
+@pytest.mark.asyncio
+async def test_compressed_etag_accepted_by_if_match(client, monkeypatch):
+    """
+    Test a PATCH of a car with the ETag of its compressed representation, read above COMPRESSION_MIN_SIZE.
+    Expects the compressed GET to carry the gzip ETag, the PATCH to accept it, and a 304 for it in If-None-Match.
+    """
+    car_id = (await client.post("/cars/add", json=CAR_CREATE_VALID)).json()["data"]["id"]
+    middleware = app.middleware_stack
+    while not isinstance(middleware, CompressionMiddleware):
+        middleware = middleware.app
+    monkeypatch.setattr(middleware, "min_size", 10)
+
+    get_resp = await client.get(f"/cars/{car_id}", headers={"Accept-Encoding": "gzip"})
+    assert get_resp.headers["content-encoding"] == "gzip", "Car was not compressed."
+    etag = get_resp.headers["etag"]
+    assert etag.startswith('"') and etag.endswith('-gzip"'), f"Unexpected ETag of the compressed car: {etag}"
+
+    cached_resp = await client.get(f"/cars/{car_id}", headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert cached_resp.status_code == 304, f"Expected 304 for the compressed ETag, got {cached_resp.status_code}"
+
+    patch_resp = await client.patch(f"/cars/patch/{car_id}", json={"price": 1}, headers={"If-Match": etag})
+    assert patch_resp.status_code == 200, f"ETag of the compressed car was rejected: {patch_resp.text}"
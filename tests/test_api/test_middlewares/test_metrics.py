@@ -0,0 +1,118 @@
+import os
+
+import pytest
+
+from src.api.routes import metrics as metrics_route
+from src.db.db import pool_metrics
+from src.utils.metrics import CONTENT_TYPE, LATENCY_BUCKETS, HttpMetrics, MetricsFiles, http_metrics
+from tests.utils.config import CAR_CREATE_VALID
+
+
+def parse_metrics(text: str) -> dict:
+    samples = {}
+    for line in text.splitlines():
+        if line and not line.startswith("#"):
+            name, _, value = line.rpartition(" ")
+            samples[name] = float(value)
+    return samples
+
+
+@pytest.mark.asyncio
+async def test_metrics_per_route_template(client):
+    """
+    Test the request metrics after reading a car, a missing car and a path no route matches.
+    Expects counts and histograms labelled by route template, method and status, unmatched paths in one series,
+    and the pool metrics of the primary engine.
+    """
+    car_id = (await client.post("/cars/add", json=CAR_CREATE_VALID)).json()["data"]["id"]
+    http_metrics.reset()
+
+    for path in (f"/cars/{car_id}", f"/cars/{car_id}", "/cars/9999999", "/no/such/path"):
+        await client.get(path)
+
+    response = await client.get("/metrics")
+    assert response.status_code == 200, f"Error retrieving metrics: {response.text}"
+    assert response.headers["content-type"] == CONTENT_TYPE, "Unexpected content type."
+    samples = parse_metrics(response.text)
+
+    car_labels = 'route="/cars/{car_id}",method="GET",status="200"'
+    assert samples[f"http_requests_total{{{car_labels}}}"] == 2, "Reads of the car were not counted per template."
+    assert samples['http_requests_total{route="/cars/{car_id}",method="GET",status="404"}'] == 1, \
+        "Missing car was not counted with its status."
+    assert samples['http_requests_total{route="unmatched",method="GET",status="404"}'] == 1, \
+        "Unmatched path was not counted in the unmatched series."
+    assert samples[f'http_request_duration_seconds_bucket{{{car_labels},le="+Inf"}}'] == 2, \
+        "Latency histogram does not hold both reads."
+    assert samples[f'http_request_duration_seconds_bucket{{{car_labels},le="{LATENCY_BUCKETS[-1]}"}}'] <= 2, \
+        "Latency buckets are not cumulative."
+    assert samples[f"http_response_size_bytes_sum{{{car_labels}}}"] > 0, "Response sizes were not recorded."
+    assert samples["http_requests_in_flight"] == 1, "Request for the metrics should be the only one in flight."
+    assert 'db_pool_checked_out{engine="primary"}' in samples, "Pool metrics are missing."
+
+
+def test_metrics_files_merged(tmp_path):
+    """
+    Test the merge of the metrics of two worker processes, before and after each of them exits.
+    Expects counters and histograms summed over both workers, then kept when they exit,
+    and gauges of running workers only.
+    """
+    files = MetricsFiles()
+    files.share(str(tmp_path))
+    for pid, requests in ((1, 2), (2, 3)):
+        http = HttpMetrics()
+        http.in_flight = 1
+        for _ in range(requests):
+            http.observe("/cars/{car_id}", "GET", 200, 0.01, 100)
+        files.write(http, pool_metrics, pid=pid)
+    pool_stats = pool_metrics["primary"].stats()
+    labels = ("/cars/{car_id}", "GET", 200)
+
+    http, pools = files.read()
+    assert http.series[labels].latency.count == 5, "Requests of the workers were not summed."
+    assert http.series[labels].size.sum == 500, "Response sizes of the workers were not summed."
+    assert http.in_flight == 2, "Requests in flight of the workers were not summed."
+    assert pools["primary"]["checkouts"] == 2 * pool_stats["checkouts"], "Pool counters were not summed."
+    assert pools["primary"]["pool_size"] == 2 * pool_stats["pool_size"], "Pool gauges were not summed."
+
+    files.mark_dead(1)
+    http, pools = files.read()
+    assert http.series[labels].latency.count == 5, "Requests of the exited worker were dropped."
+    assert http.in_flight == 1, "Requests in flight of the exited worker were kept."
+    assert pools["primary"]["checkouts"] == 2 * pool_stats["checkouts"], \
+        "Pool counters of the exited worker were dropped."
+    assert pools["primary"]["pool_size"] == pool_stats["pool_size"], "Pool gauges of the exited worker were kept."
+
+    files.mark_dead(2)
+    http, pools = files.read()
+    assert http.series[labels].latency.count == 5, "Requests of the exited workers were dropped."
+    assert "pool_size" not in pools["primary"], "Pool gauges of exited workers were kept."
+    assert sorted(os.listdir(tmp_path)) == [".lock", "dead.json"], "Snapshots of exited workers were not merged."
+
+
+@pytest.mark.asyncio
+async def test_metrics_of_all_workers(client, tmp_path, monkeypatch):
+    """
+    Test /metrics when the workers share their metrics, with another worker that read a car three times.
+    Expects the reads of both workers in the totals, and the in-flight requests of both.
+    """
+    files = MetricsFiles()
+    files.share(str(tmp_path))
+    monkeypatch.setattr(metrics_route, "metrics_files", files)
+    car_id = (await client.post("/cars/add", json=CAR_CREATE_VALID)).json()["data"]["id"]
+    http_metrics.reset()
+
+    other_worker = HttpMetrics()
+    for _ in range(3):
+        other_worker.observe("/cars/{car_id}", "GET", 200, 0.01, 100)
+    files.write(other_worker, pool_metrics, pid=1)
+
+    for _ in range(2):
+        await client.get(f"/cars/{car_id}")
+    response = await client.get("/metrics")
+    assert response.status_code == 200, f"Error retrieving metrics: {response.text}"
+    samples = parse_metrics(response.text)
+    assert samples['http_requests_total{route="/cars/{car_id}",method="GET",status="200"}'] == 5, \
+        "Reads of the other worker were not merged."
+    assert samples["http_requests_in_flight"] == 1, "Unexpected requests in flight."
+    assert sorted(os.listdir(tmp_path)) == [".lock", "1.json", f"{os.getpid()}.json"], \
+        "Worker serving the metrics did not write its snapshot."
@@ -0,0 +1,83 @@
+import time
+
+import pytest
+
+from src.api.middlewares.read_your_writes import PIN_COOKIE
+from src.utils.cache import entity_cache
+from tests.utils.config import CAR_CREATE_VALID
+
+
+@pytest.mark.asyncio
+async def test_reads_go_to_replica(client, fake_replica):
+    """
+    Test routing of a read-only request when a read replica is configured.
+    Expects the request to be served by the replica, without a pin cookie.
+    """
+    response = await client.get("/cars/")
+    assert response.status_code == 200, f"Error retrieving cars: {response.text}"
+    assert fake_replica.sessions_opened == 1, "Read was not routed to the replica."
+    assert PIN_COOKIE not in response.cookies, "Read should not pin the client to the primary."
+
+
+@pytest.mark.asyncio
+async def test_reads_after_write_go_to_primary(client, fake_replica):
+    """
+    Test read-your-writes consistency after a write.
+    Expects the write to set the pin cookie, and the next read to be served by the primary.
+    """
+    create_resp = await client.post("/cars/add", json=CAR_CREATE_VALID)
+    assert create_resp.status_code == 200, f"Error creating car: {create_resp.text}"
+    assert PIN_COOKIE in create_resp.cookies, "Write did not pin the client to the primary."
+    assert fake_replica.sessions_opened == 0, "Write was routed to the replica."
+
+    get_resp = await client.get(f"/cars/{create_resp.json()['data']['id']}")
+    assert get_resp.status_code == 200, f"Error retrieving car: {get_resp.text}"
+    assert fake_replica.sessions_opened == 0, "Read after write was routed to the replica."
+
+
+@pytest.mark.asyncio
+async def test_reads_go_to_replica_after_pin_expires(client, fake_replica):
+    """
+    Test routing of reads once the read-your-writes window is over, even if the client keeps the cookie.
+    Expects reads to be served by the replica again.
+    """
+    client.cookies.set(PIN_COOKIE, str(time.time() - 1))
+
+    response = await client.get("/cars/")
+    assert response.status_code == 200, f"Error retrieving cars: {response.text}"
+    assert fake_replica.sessions_opened == 1, "Read after the pin expired was not routed to the replica."
+
+
+@pytest.mark.asyncio
+async def test_failed_write_does_not_pin(client, fake_replica):
+    """
+    Test that a rejected write does not pin the client to the primary.
+    Expects no pin cookie on a 404 response.
+    """
+    response = await client.delete("/cars/delete/9999999")
+    assert response.status_code == 404, f"Expected 404, got {response.status_code}"
+    assert PIN_COOKIE not in response.cookies, "Failed write should not pin the client to the primary."
+
+
+@pytest.mark.asyncio
+async def test_replica_reads_not_cached(client, fake_replica):
+    """
+    Test the entity cache for reads served by a replica, and for reads of a client pinned to the primary.
+    Expects replica reads to load the car each time without caching it, and pinned reads to skip the cache.
+    """
+    create_resp = await client.post("/cars/add", json=CAR_CREATE_VALID)
+    assert create_resp.status_code == 200, f"Error creating car: {create_resp.text}"
+    car_id = create_resp.json()["data"]["id"]
+    pin = client.cookies.pop(PIN_COOKIE)
+
+    for _ in range(2):
+        get_resp = await client.get(f"/cars/{car_id}")
+        assert get_resp.status_code == 200, f"Error retrieving car: {get_resp.text}"
+    assert fake_replica.sessions_opened == 2, "Reads were not routed to the replica."
+    assert (entity_cache.hits, entity_cache.misses) == (0, 2), "Car read from the replica was cached."
+
+    client.cookies.set(PIN_COOKIE, pin)
+    get_resp = await client.get(f"/cars/{car_id}")
+    assert get_resp.status_code == 200, f"Error retrieving car: {get_resp.text}"
+    assert fake_replica.sessions_opened == 2, "Pinned read was routed to the replica."
+    assert (entity_cache.hits, entity_cache.misses) == (0, 2), "Pinned read went through the cache."
@@ -1,10 +1,19 @@
+import asyncio
+import json
+
 import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
 from tests.utils.config import (
     CAR_CREATE_VALID,
     CAR_CREATE_ANOTHER,
     CAR_UPDATE_VALID,
     NON_EXISTENT_ID
 )
+from src.repositories.cars import CarsRepository
+from src.utils.bulk import BULK_CHUNK_SIZE
+from tests.conftest import TestSession
 
 
 @pytest.mark.asyncio
@@ -43,6 +52,136 @@ async def test_add_car_conflict_vin(client):
     assert expected_detail in detail, f"Unexpected conflict message: {detail}"
 
 
+@pytest.mark.asyncio
+async def test_add_car_concurrent_same_vin(client):
+    """
+    Test concurrent creation of cars with the same VIN number.
+    Expects exactly one car to be created and the other requests to get 409, not 500.
+    """
+    responses = await asyncio.gather(*(client.post("/cars/add", json=CAR_CREATE_VALID) for _ in range(5)))
+    status_codes = sorted(response.status_code for response in responses)
+    assert status_codes == [200, 409, 409, 409, 409], f"Unexpected status codes: {status_codes}"
+
+    all_resp = await client.get("/cars/")
+    assert len(all_resp.json()["data"]) == 1, "Expected exactly one car to be created."
+
+
+@pytest.mark.asyncio
+async def test_add_cars_bulk(client):
+    """
+    Test bulk creation of cars with an already existing VIN and a VIN repeated in the payload.
+    Expects per-item results in payload order: created cars and conflicts for the duplicate VINs.
+    """
+    existing_resp = await client.post("/cars/add", json=CAR_CREATE_VALID)
+    assert existing_resp.status_code == 200, f"Error creating car: {existing_resp.text}"
+
+    payload = [CAR_CREATE_ANOTHER, CAR_CREATE_VALID, CAR_CREATE_ANOTHER]
+    response = await client.post("/cars/bulk", json=payload)
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+    data = response.json()
+    assert data["status"] == "error", f"Unexpected status: {data['status']}"
+    assert data["message"] == "1 of 3 cars created.", f"Unexpected message: {data['message']}"
+
+    results = data["data"]
+    assert [result["index"] for result in results] == [0, 1, 2], "Results are not in payload order."
+    assert results[0]["status"] == "success", f"First car was not created: {results[0]}"
+    assert results[0]["data"]["vin_number"] == CAR_CREATE_ANOTHER["vin_number"], "Unexpected created car."
+    for result, car in zip(results[1:], payload[1:]):
+        assert result["status"] == "error", f"Duplicate VIN was created: {result}"
+        assert result["message"] == f"Car with vin_number: '{car['vin_number']}' already exists.", \
+            f"Unexpected conflict message: {result['message']}"
+        assert result["data"] is None, "Conflicting item should not have data."
+
+
+@pytest.mark.asyncio
+async def test_add_cars_bulk_commits_once_per_chunk(client):
+    """
+    Test that bulk creation commits once per chunk of cars, not once per car.
+    Expects two commits for one more car than fits into a chunk.
+    """
+    commits = []
+
+    def listener(session):
+        commits.append(session)
+
+    event.listen(Session, "after_commit", listener)
+    try:
+        payload = [{**CAR_CREATE_VALID, "vin_number": f"VINCOMMIT{i:08d}"} for i in range(BULK_CHUNK_SIZE + 1)]
+        response = await client.post("/cars/bulk", json=payload)
+    finally:
+        event.remove(Session, "after_commit", listener)
+
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+    assert response.json()["message"] == f"{BULK_CHUNK_SIZE + 1} of {BULK_CHUNK_SIZE + 1} cars created.", \
+        f"Unexpected message: {response.json()['message']}"
+    assert len(commits) == 2, f"Expected 2 commits, got {len(commits)}"
+
+
+@pytest.mark.asyncio
+async def test_add_cars_bulk_empty_payload(client):
+    """
+    Test bulk creation of cars with an empty list.
+    Expects a 400 status code.
+    """
+    response = await client.post("/cars/bulk", json=[])
+    assert response.status_code == 400, f"Expected 400, got {response.status_code}"
+    assert response.json()["detail"] == "Payload cannot be empty.", "Unexpected detail message."
+
+
+@pytest.mark.asyncio
+async def test_update_cars_bulk(client):
+    """
+    Test bulk update of cars: one valid update, one non-existent car and one VIN conflict.
+    Expects per-item results and only the valid update to be applied.
+    """
+    car1_resp = await client.post("/cars/add", json=CAR_CREATE_VALID)
+    car2_resp = await client.post("/cars/add", json=CAR_CREATE_ANOTHER)
+    assert car1_resp.status_code == 200, f"Error creating first car: {car1_resp.text}"
+    assert car2_resp.status_code == 200, f"Error creating second car: {car2_resp.text}"
+    car1_id = car1_resp.json()["data"]["id"]
+    car2_id = car2_resp.json()["data"]["id"]
+
+    payload = [
+        {"id": car1_id, **CAR_UPDATE_VALID},
+        {"id": NON_EXISTENT_ID, "color": "Green"},
+        {"id": car2_id, "vin_number": CAR_CREATE_VALID["vin_number"]}
+    ]
+    response = await client.patch("/cars/bulk", json=payload)
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+    data = response.json()
+    assert data["message"] == "1 of 3 cars updated.", f"Unexpected message: {data['message']}"
+
+    updated, not_found, conflict = data["data"]
+    assert updated["status"] == "success", f"Valid update failed: {updated}"
+    for key, value in CAR_UPDATE_VALID.items():
+        assert updated["data"][key] == value, f"Field '{key}' was not updated."
+    assert not_found["message"] == f"Car with id: '{NON_EXISTENT_ID}' does not exist.", \
+        f"Unexpected message: {not_found['message']}"
+    assert "already exists" in conflict["message"], f"Unexpected message: {conflict['message']}"
+
+    get_resp = await client.get(f"/cars/{car2_id}")
+    assert get_resp.json()["data"]["vin_number"] == CAR_CREATE_ANOTHER["vin_number"], "Conflicting VIN was applied."
+
+
+@pytest.mark.asyncio
+async def test_edit_many_cars_in_order(client):
+    """
+    Test CarsRepository.edit_many with an existing and a non-existent car.
+    Expects the updated car and None in the order of the data, without loading ORM instances into the session.
+    """
+    car_id = (await client.post("/cars/add", json=CAR_CREATE_VALID)).json()["data"]["id"]
+
+    async with TestSession() as session:
+        updated_cars = await CarsRepository(session).edit_many([
+            {"id": NON_EXISTENT_ID, "color": "Green"},
+            {"id": car_id, "color": "Green"},
+        ])
+        assert len(session.identity_map) == 0, "Updated cars were loaded as ORM instances."
+    missing_car, updated_car = updated_cars
+    assert missing_car is None, f"Non-existent car was returned: {missing_car}"
+    assert (updated_car.id, updated_car.color) == (car_id, "Green"), f"Unexpected updated car: {updated_car}"
+
+
 @pytest.mark.asyncio
 async def test_get_car_by_id_success(client):
     """
@@ -196,6 +335,239 @@ async def test_get_all_cars(client):
         pytest.fail(f"Expected success status, got {data['status']}: {data}")
 
 
+@pytest.mark.asyncio
+async def test_get_all_cars_pagination(client):
+    """
+    Test keyset pagination of all cars.
+    Expects pages of the requested size, ordered by ID, linked by next_cursor.
+    """
+    created_ids = []
+    for i in range(3):
+        car_data = CAR_CREATE_VALID.copy()
+        car_data["vin_number"] = f"VINPAGE{i:010d}"
+        resp = await client.post("/cars/add", json=car_data)
+        assert resp.status_code == 200, f"Error creating car: {resp.text}"
+        created_ids.append(resp.json()["data"]["id"])
+
+    first_resp = await client.get("/cars/", params={"limit": 2})
+    assert first_resp.status_code == 200, f"Error retrieving first page: {first_resp.text}"
+    first_page = first_resp.json()
+    assert [car["id"] for car in first_page["data"]] == created_ids[:2], "Unexpected cars on the first page."
+    assert first_page["next_cursor"], "First page should have next_cursor."
+
+    second_resp = await client.get("/cars/", params={"limit": 2, "cursor": first_page["next_cursor"]})
+    assert second_resp.status_code == 200, f"Error retrieving second page: {second_resp.text}"
+    second_page = second_resp.json()
+    assert [car["id"] for car in second_page["data"]] == created_ids[2:], "Unexpected cars on the second page."
+    assert second_page["next_cursor"] is None, "Last page should not have next_cursor."
+
+
+@pytest.mark.asyncio
+async def test_get_cars_total_count(client):
+    """
+    Test the total number of matching cars on a filtered page.
+    Expects the exact count of all matching cars with `count=exact`, an integer with `count=estimated`
+    and no total without `count`.
+    """
+    for i in range(2):
+        car_data = CAR_CREATE_VALID.copy()
+        car_data["vin_number"] = f"VINCOUNT{i:09d}"
+        resp = await client.post("/cars/add", json=car_data)
+        assert resp.status_code == 200, f"Error creating car: {resp.text}"
+    resp = await client.post("/cars/add", json=CAR_CREATE_ANOTHER)  # Manual transmission, not counted
+    assert resp.status_code == 200, f"Error creating car: {resp.text}"
+
+    exact_resp = await client.get("/cars/transmission/automatic", params={"limit": 1, "count": "exact"})
+    assert exact_resp.status_code == 200, f"Error retrieving cars: {exact_resp.text}"
+    exact_page = exact_resp.json()
+    assert len(exact_page["data"]) == 1, "Page size should not depend on the count."
+    assert exact_page["total"] == 2, f"Unexpected exact total: {exact_page['total']}"
+
+    for url in ("/cars/transmission/automatic", "/cars/"):
+        estimated_resp = await client.get(url, params={"count": "estimated"})
+        assert estimated_resp.status_code == 200, f"Error retrieving cars: {estimated_resp.text}"
+        total = estimated_resp.json()["total"]
+        assert isinstance(total, int) and total >= 0, f"Unexpected estimated total: {total}"
+
+    plain_resp = await client.get("/cars/")
+    assert plain_resp.json()["total"] is None, "Total should not be counted unless requested."
+
+
+@pytest.mark.asyncio
+async def test_get_all_cars_invalid_cursor(client):
+    """
+    Test retrieval of all cars with a malformed cursor.
+    Expects a 400 status code with "Invalid cursor." message.
+    """
+    response = await client.get("/cars/", params={"cursor": "not-a-cursor"})
+    assert response.status_code == 400, f"Expected 400, got {response.status_code}"
+    detail = response.json()["detail"]
+    assert detail == "Invalid cursor.", f"Unexpected detail message: {detail}"
+
+
+@pytest.mark.asyncio
+async def test_get_all_cars_stream(client):
+    """
+    Test streaming of all cars as NDJSON.
+    Expects every car on its own line, ordered by ID, regardless of the page limit.
+    """
+    created_ids = []
+    for i in range(3):
+        car_data = CAR_CREATE_VALID.copy()
+        car_data["vin_number"] = f"VINSTREAM{i:08d}"
+        resp = await client.post("/cars/add", json=car_data)
+        assert resp.status_code == 200, f"Error creating car: {resp.text}"
+        created_ids.append(resp.json()["data"]["id"])
+
+    response = await client.get("/cars/", params={"limit": 1}, headers={"Accept": "application/x-ndjson"})
+    assert response.status_code == 200, f"Error streaming cars: {response.text}"
+    assert response.headers["content-type"] == "application/x-ndjson", "Unexpected content type of the stream."
+    cars = [json.loads(line) for line in response.text.splitlines()]
+    assert [car["id"] for car in cars] == created_ids, "Unexpected cars in the stream."
+    assert cars[0]["vin_number"] == "VINSTREAM00000000", "Streamed car does not match the created car."
+
+
+@pytest.mark.asyncio
+async def test_get_all_cars_sparse_fields(client):
+    """
+    Test retrieval of all cars with a sparse fieldset.
+    Expects only the requested fields and the ID in every car.
+    """
+    create_resp = await client.post("/cars/add", json=CAR_CREATE_VALID)
+    assert create_resp.status_code == 200, f"Error creating car: {create_resp.text}"
+
+    response = await client.get("/cars/", params={"fields": "brand,price"})
+    assert response.status_code == 200, f"Error retrieving cars: {response.text}"
+    car = response.json()["data"][0]
+    assert set(car) == {"id", "brand", "price"}, f"Unexpected fields returned: {set(car)}"
+    assert car["brand"] == CAR_CREATE_VALID["brand"], "Returned brand does not match the created car."
+
+
+@pytest.mark.asyncio
+async def test_get_car_by_id_sparse_fields(client):
+    """
+    Test retrieval of a car by its ID with a sparse fieldset.
+    Expects only the requested field and the ID.
+    """
+    create_resp = await client.post("/cars/add", json=CAR_CREATE_VALID)
+    assert create_resp.status_code == 200, f"Error creating car: {create_resp.text}"
+    car_id = create_resp.json()["data"]["id"]
+
+    response = await client.get(f"/cars/{car_id}", params={"fields": "vin_number"})
+    assert response.status_code == 200, f"Error retrieving car: {response.text}"
+    car = response.json()["data"]
+    assert car == {"id": car_id, "vin_number": CAR_CREATE_VALID["vin_number"]}, f"Unexpected car data: {car}"
+
+
+@pytest.mark.asyncio
+async def test_get_all_cars_unknown_fields(client):
+    """
+    Test retrieval of all cars with a field that does not exist.
+    Expects a 400 status code with "Unknown fields: ..." message.
+    """
+    response = await client.get("/cars/", params={"fields": "brand,horsepower"})
+    assert response.status_code == 400, f"Expected 400, got {response.status_code}"
+    detail = response.json()["detail"]
+    assert detail == "Unknown fields: horsepower.", f"Unexpected detail message: {detail}"
+
+
+@pytest.mark.asyncio
+async def test_search_cars(client):
+    """
+    Test car search with combined filters, sorted by price across pages.
+    Expects only matching cars, in price order, linked by next_cursor, with the exact total.
+    """
+    cars = [  # (brand, price, year, engine)
+        ("Toyota", 30000, 2020, "gasoline"),
+        ("Honda", 20000, 2021, "gasoline"),
+        ("Toyota", 25000, 2022, "gasoline"),
+        ("Toyota", 27000, 2018, "gasoline"),  # Too old
+        ("BMW", 26000, 2021, "electric"),  # Other engine
+        ("Audi", 22000, 2021, "gasoline"),  # Other brand
+    ]
+    for i, (brand, price, year, engine) in enumerate(cars):
+        car_data = {**CAR_CREATE_VALID, "brand": brand, "price": price, "year": year, "engine": engine}
+        car_data["vin_number"] = f"VINSEARCH{i:08d}"
+        resp = await client.post("/cars/add", json=car_data)
+        assert resp.status_code == 200, f"Error creating car: {resp.text}"
+
+    params = {
+        "brand": ["Toyota", "Honda", "BMW"],
+        "year_min": 2019,
+        "engine": "gasoline",
+        "sort": "price",
+        "limit": 2,
+        "count": "exact",
+        "fields": "brand"
+    }
+    first_resp = await client.get("/cars/search", params=params)
+    assert first_resp.status_code == 200, f"Error searching cars: {first_resp.text}"
+    first_page = first_resp.json()
+    assert [car["price"] for car in first_page["data"]] == [20000, 25000], "Unexpected cars on the first page."
+    assert first_page["total"] == 3, f"Unexpected total: {first_page['total']}"
+    assert first_page["next_cursor"], "First page should have next_cursor."
+
+    second_resp = await client.get("/cars/search", params={**params, "cursor": first_page["next_cursor"]})
+    assert second_resp.status_code == 200, f"Error searching cars: {second_resp.text}"
+    second_page = second_resp.json()
+    assert [car["price"] for car in second_page["data"]] == [30000], "Unexpected cars on the second page."
+    assert second_page["next_cursor"] is None, "Last page should not have next_cursor."
+
+
+@pytest.mark.asyncio
+async def test_search_cars_invalid_params(client):
+    """
+    Test car search with an inverted range and with a cursor of a page sorted by another field.
+    Expects 400 with a message for each.
+    """
+    range_resp = await client.get("/cars/search", params={"price_min": 30000, "price_max": 20000})
+    assert range_resp.status_code == 400, f"Expected 400, got {range_resp.status_code}"
+    detail = range_resp.json()["detail"]
+    assert detail == "price_min can't be greater than price_max.", f"Unexpected detail message: {detail}"
+
+    for i in range(2):
+        resp = await client.post("/cars/add", json={**CAR_CREATE_VALID, "vin_number": f"VINSORT{i:010d}"})
+        assert resp.status_code == 200, f"Error creating car: {resp.text}"
+    by_date_resp = await client.get("/cars/search", params={"sort": "created_at", "limit": 1})
+    assert by_date_resp.status_code == 200, f"Error searching cars: {by_date_resp.text}"
+    cursor = by_date_resp.json()["next_cursor"]
+
+    by_price_resp = await client.get("/cars/search", params={"sort": "price", "cursor": cursor})
+    assert by_price_resp.status_code == 400, f"Expected 400, got {by_price_resp.status_code}"
+    detail = by_price_resp.json()["detail"]
+    assert detail == "Invalid cursor.", f"Unexpected detail message: {detail}"
+
+
+@pytest.mark.asyncio
+async def test_text_search_cars(client):
+    """
+    Test car search by free text.
+    Expects only cars matching every word (as a prefix) of the query, and 400 for a query without words.
+    """
+    cars = [("BMW", "X5", "Black"), ("BMW", "X3", "White"), ("Toyota", "Camry", "Black")]
+    created_ids = {}
+    for i, (brand, model, color) in enumerate(cars):
+        car_data = {**CAR_CREATE_VALID, "brand": brand, "model": model, "color": color}
+        car_data["vin_number"] = f"VINTEXT{i:010d}"
+        resp = await client.post("/cars/add", json=car_data)
+        assert resp.status_code == 200, f"Error creating car: {resp.text}"
+        created_ids[model] = resp.json()["data"]["id"]
+
+    x5_resp = await client.get("/cars/search/text", params={"q": "bmw x5"})
+    assert x5_resp.status_code == 200, f"Error searching cars: {x5_resp.text}"
+    assert [car["id"] for car in x5_resp.json()["data"]] == [created_ids["X5"]], "Unexpected cars for 'bmw x5'."
+
+    prefix_resp = await client.get("/cars/search/text", params={"q": "bm", "fields": "model"})
+    assert prefix_resp.status_code == 200, f"Error searching cars: {prefix_resp.text}"
+    found_models = sorted(car["model"] for car in prefix_resp.json()["data"])
+    assert found_models == ["X3", "X5"], f"Unexpected cars for 'bm': {found_models}"
+
+    empty_resp = await client.get("/cars/search/text", params={"q": "!!!"})
+    assert empty_resp.status_code == 400, f"Expected 400, got {empty_resp.status_code}"
+    detail = empty_resp.json()["detail"]
+    assert detail == "Search query must contain letters or digits.", f"Unexpected detail message: {detail}"
+
+
 @pytest.mark.asyncio
 async def test_update_car_success(client):
     """
@@ -236,6 +608,139 @@ async def test_update_car_conflict_vin(client):
     assert expected_detail in detail, f"Unexpected conflict message: {detail}"
 
 
+@pytest.mark.asyncio
+async def test_update_car_single_statement(client):
+    """
+    Test that updating a car does not read it first.
+    Expects exactly one SQL statement to be executed, and the car's own VIN to be accepted.
+    """
+    create_resp = await client.post("/cars/add", json=CAR_CREATE_VALID)
+    assert create_resp.status_code == 200, f"Error creating car: {create_resp.text}"
+    car_id = create_resp.json()["data"]["id"]
+    statements = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", listener)
+    try:
+        patch_resp = await client.patch(
+            f"/cars/patch/{car_id}", json={**CAR_UPDATE_VALID, "vin_number": CAR_CREATE_VALID["vin_number"]}
+        )
+    finally:
+        event.remove(Engine, "before_cursor_execute", listener)
+
+    assert patch_resp.status_code == 200, f"Error updating car: {patch_resp.text}"
+    assert len(statements) == 1, f"Expected 1 statement, got {len(statements)}: {statements}"
+
+
+@pytest.mark.asyncio
+async def test_get_car_cached(client):
+    """
+    Test that cars read by id and VIN number are served from the entity cache until they are written.
+    Expects no SQL statement for repeated reads, and the updated car (or 404 for its old VIN) after an update.
+    """
+    create_resp = await client.post("/cars/add", json=CAR_CREATE_VALID)
+    assert create_resp.status_code == 200, f"Error creating car: {create_resp.text}"
+    car_id = create_resp.json()["data"]["id"]
+    await client.get(f"/cars/{car_id}")
+    await client.get(f"/cars/vin/{CAR_CREATE_VALID['vin_number']}")
+    statements = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", listener)
+    try:
+        get_resp = await client.get(f"/cars/{car_id}")
+        vin_resp = await client.get(f"/cars/vin/{CAR_CREATE_VALID['vin_number']}")
+    finally:
+        event.remove(Engine, "before_cursor_execute", listener)
+    assert get_resp.status_code == 200 and vin_resp.status_code == 200, "Failed to get the cached car."
+    assert statements == [], f"Cached car was read from the database: {statements}"
+
+    new_vin = "VIN5555555555"
+    patch_resp = await client.patch(f"/cars/patch/{car_id}", json={"price": 1, "vin_number": new_vin})
+    assert patch_resp.status_code == 200, f"Error updating car: {patch_resp.text}"
+    get_resp = await client.get(f"/cars/{car_id}")
+    assert get_resp.json()["data"]["price"] == 1, "Cache served the car as it was before the update."
+    vin_resp = await client.get(f"/cars/vin/{CAR_CREATE_VALID['vin_number']}")
+    assert vin_resp.status_code == 404, "Cache served the car by its old VIN number."
+
+    stats = (await client.get("/stats/cache")).json()["data"]
+    assert stats["hits"] == 2, f"Unexpected cache hits: {stats}"
+    assert stats["misses"] == 4, f"Unexpected cache misses: {stats}"
+
+
+@pytest.mark.asyncio
+async def test_cars_cached_in_redis(client, redis_cache):
+    """
+    Test that cars and pages of cars are cached in Redis (the fake server) and invalidated by writes.
+    Expects the cached car and page under 'cache:cars:' after reads, the version of the cars to be bumped
+    by an update, and the updated car in the next page.
+    """
+    car_id = (await client.post("/cars/add", json=CAR_CREATE_VALID)).json()["data"]["id"]
+    await client.get(f"/cars/{car_id}")
+    await client.get("/cars/", params={"limit": 10})
+    cached_keys = sorted(key.decode().split(":")[2] for key in redis_cache.values if key.startswith(b"cache:cars:"))
+    assert cached_keys == ["many", "one"], f"Unexpected cached keys: {cached_keys}"
+
+    list_resp = await client.get("/cars/", params={"limit": 10})
+    assert list_resp.json()["data"][0]["id"] == car_id, f"Unexpected cached page: {list_resp.text}"
+    stats = (await client.get("/stats/cache")).json()["data"]
+    assert (stats["backend"], stats["hits"]) == ("redis", 1), f"Unexpected cache stats: {stats}"
+
+    version = int(redis_cache.values[b"cache:cars"][0])
+    patch_resp = await client.patch(f"/cars/patch/{car_id}", json={"price": 1})
+    assert patch_resp.status_code == 200, f"Error updating car: {patch_resp.text}"
+    assert int(redis_cache.values[b"cache:cars"][0]) == version + 1, "Cached cars were not invalidated by the update."
+    list_resp = await client.get("/cars/", params={"limit": 10})
+    assert list_resp.json()["data"][0]["price"] == 1, "Cache served the page as it was before the update."
+
+
+@pytest.mark.asyncio
+async def test_get_car_etag(client):
+    """
+    Test conditional GET of a car with If-None-Match.
+    Expects an ETag on the full car, a 304 without body for it (or `*`), and none for a sparse fieldset.
+    """
+    car_id = (await client.post("/cars/add", json=CAR_CREATE_VALID)).json()["data"]["id"]
+    get_resp = await client.get(f"/cars/{car_id}")
+    etag = get_resp.headers["etag"]
+    assert etag.startswith(f'"{car_id}-'), f"Unexpected ETag: {etag}"
+
+    for if_none_match in (etag, f'"other", W/{etag}', "*"):
+        response = await client.get(f"/cars/{car_id}", headers={"If-None-Match": if_none_match})
+        assert response.status_code == 304, f"Expected 304 for {if_none_match}, got {response.status_code}"
+        assert response.content == b"" and response.headers["etag"] == etag, "Unexpected 304 response."
+
+    response = await client.get(f"/cars/{car_id}", params={"fields": "id,price"}, headers={"If-None-Match": etag})
+    assert response.status_code == 200, f"Expected 200 for a sparse fieldset, got {response.status_code}"
+    assert "etag" not in response.headers, "Sparse fieldsets must not have the ETag of the full car."
+
+
+@pytest.mark.asyncio
+async def test_update_car_if_match(client):
+    """
+    Test PATCH of a car with If-Match.
+    Expects a 412 for an ETag of an older version or of another car, which leaves the car unchanged,
+    and the update with the new ETag for the current one.
+    """
+    car_id = (await client.post("/cars/add", json=CAR_CREATE_VALID)).json()["data"]["id"]
+    etag = (await client.get(f"/cars/{car_id}")).headers["etag"]
+
+    patch_resp = await client.patch(f"/cars/patch/{car_id}", json={"price": 1}, headers={"If-Match": etag})
+    assert patch_resp.status_code == 200, f"Error updating car: {patch_resp.text}"
+    assert patch_resp.headers["etag"] != etag, "ETag did not change after the update."
+
+    other_car_etag = etag.replace(f'"{car_id}-', f'"{car_id + 1}-')
+    for stale_etag in (etag, other_car_etag, 'W/' + patch_resp.headers["etag"]):
+        response = await client.patch(f"/cars/patch/{car_id}", json={"price": 2}, headers={"If-Match": stale_etag})
+        assert response.status_code == 412, f"Expected 412 for {stale_etag}, got {response.status_code}"
+    car = (await client.get(f"/cars/{car_id}")).json()["data"]
+    assert car["price"] == 1, "Car was updated despite a failed If-Match."
+
+
 @pytest.mark.asyncio
 async def test_update_car_not_found(client):
     """
@@ -281,3 +786,22 @@ async def test_delete_car_not_found(client):
     detail = delete_resp.json()["detail"]
     expected_detail = f"No car with id: '{NON_EXISTENT_ID}' found."
     assert expected_detail in detail, f"Unexpected detail message: {detail}"
+
+
+@pytest.mark.asyncio
+async def test_statement_registry_bounded(client, monkeypatch):
+    """
+    Test reads with many different sparse fieldsets, each a new statement shape.
+    Expects the registry of prebuilt statements to keep only the most recently used shapes.
+    """
+    await client.post("/cars/add", json=CAR_CREATE_VALID)
+    monkeypatch.setattr(CarsRepository._statements, "max_size", 3)
+    fieldsets = ["brand", "model", "price", "year", "color", "brand,model"]
+    for fields in fieldsets:
+        response = await client.get("/cars/", params={"fields": fields})
+        assert response.status_code == 200, f"Error retrieving cars: {response.text}"
+
+    assert len(CarsRepository._statements) == 3, f"Registry grew to {len(CarsRepository._statements)} statements."
+    kept_fields = [key[1] for key in CarsRepository._statements]
+    assert kept_fields == [("id", "year"), ("id", "color"), ("id", "brand", "model")], \
+        f"Unexpected statements kept: {kept_fields}"
@@ -1,8 +1,20 @@
+import asyncio
+import json
+
 import pytest
+from sqlalchemy import delete, event
+from sqlalchemy.engine import Engine
+
+from src.models.models import Orders
+from src.repositories.orders import OrdersRepository
+from src.repositories.sales_rollups import SalesRollupsRepository
+from src.utils.cache import has_written
+from tests.conftest import TestSession
 from tests.utils.config import (
     USER_CUSTOMER,
     USER_MANAGER,
     CAR_CREATE_VALID,
+    CAR_CREATE_ANOTHER,
     NON_EXISTENT_ID
 )
 
@@ -69,6 +81,29 @@ async def test_create_order_success(client, order_payload):
     assert "created_at" in order, "Created order is missing 'created_at'."
 
 
+@pytest.mark.asyncio
+async def test_create_order_statements(client, order_payload):
+    """
+    Test that creating an order checks the customer, salesperson and car in the same statement as the insert.
+    Expects exactly two SQL statements to be executed: the checked insert and the update of the sales rollup.
+    """
+    statements = []
+
+    def listener(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(Engine, "before_cursor_execute", listener)
+    try:
+        response = await client.post("/orders/create", json=order_payload)
+    finally:
+        event.remove(Engine, "before_cursor_execute", listener)
+
+    assert response.status_code == 200, f"Error creating order: {response.text}"
+    assert len(statements) == 2, f"Expected 2 statements, got {len(statements)}: {statements}"
+    assert "INSERT INTO orders" in statements[0], f"Order was not inserted first: {statements[0]}"
+    assert "INSERT INTO sales_rollups" in statements[1], f"Sales rollup was not updated: {statements[1]}"
+
+
 @pytest.mark.asyncio
 async def test_create_order_nonexistent_customer(client, order_payload):
     """
@@ -194,6 +229,28 @@ async def test_get_orders_by_status_success(client, order_payload):
         pytest.fail(f"Expected success status, got {data['status']}: {data}")
 
 
+@pytest.mark.asyncio
+async def test_get_orders_by_status_stream(client, order_payload):
+    """
+    Test streaming of orders by status as NDJSON with a sparse fieldset.
+    Expects only the orders with the specified status, with the requested fields.
+    """
+    pending_resp = await client.post("/orders/create", json=order_payload)
+    assert pending_resp.status_code == 200, f"Error creating order: {pending_resp.text}"
+    completed_resp = await client.post("/orders/create", json={**order_payload, "status": "completed"})
+    assert completed_resp.status_code == 200, f"Error creating order: {completed_resp.text}"
+
+    response = await client.get(
+        "/orders/status/pending",
+        params={"fields": "status"},
+        headers={"Accept": "application/x-ndjson"}
+    )
+    assert response.status_code == 200, f"Error streaming orders: {response.text}"
+    orders = [json.loads(line) for line in response.text.splitlines()]
+    expected = [{"id": pending_resp.json()["data"]["id"], "status": "pending"}]
+    assert orders == expected, f"Unexpected orders in the stream: {orders}"
+
+
 @pytest.mark.asyncio
 async def test_get_orders_by_status_empty(client):
     """
@@ -390,6 +447,38 @@ async def test_update_order_success(client, order_payload):
         assert updated_order[key] == value, f"Field '{key}' was not updated correctly."
 
 
+@pytest.mark.asyncio
+async def test_order_etag_conditional_requests(client, order_payload):
+    """
+    Test conditional requests on an order: GET with If-None-Match and PATCH with If-Match.
+    Expects a 304 without body while the ETag is current, a 412 for a PATCH with a stale ETag
+    that leaves the order unchanged, and a new ETag after a PATCH with the current one.
+    """
+    order_id = (await client.post("/orders/create", json=order_payload)).json()["data"]["id"]
+    get_resp = await client.get(f"/orders/{order_id}")
+    etag = get_resp.headers["etag"]
+
+    not_modified = await client.get(f"/orders/{order_id}", headers={"If-None-Match": etag})
+    assert not_modified.status_code == 304, f"Expected 304, got {not_modified.status_code}"
+    assert not_modified.content == b"", "304 must have no body."
+
+    patch_resp = await client.patch(
+        f"/orders/patch/{order_id}", json={"status": "completed"}, headers={"If-Match": etag}
+    )
+    assert patch_resp.status_code == 200, f"Error updating order: {patch_resp.text}"
+    new_etag = patch_resp.headers["etag"]
+    assert new_etag != etag, "ETag did not change after the update."
+
+    stale_resp = await client.patch(
+        f"/orders/patch/{order_id}", json={"status": "canceled"}, headers={"If-Match": etag}
+    )
+    assert stale_resp.status_code == 412, f"Expected 412, got {stale_resp.status_code}"
+    get_resp = await client.get(f"/orders/{order_id}", headers={"If-None-Match": etag})
+    assert get_resp.status_code == 200, f"Expected 200 for a stale ETag, got {get_resp.status_code}"
+    assert get_resp.json()["data"]["status"] == "completed", "Order was updated despite the stale ETag."
+    assert get_resp.headers["etag"] == new_etag, "GET and PATCH returned different ETags."
+
+
 @pytest.mark.asyncio
 async def test_update_order_nonexistent(client):
     """
@@ -404,6 +493,24 @@ async def test_update_order_nonexistent(client):
     assert expected_detail in detail, f"Unexpected detail message: {detail}"
 
 
+@pytest.mark.asyncio
+async def test_update_order_deleted_concurrently(client, order_payload):
+    """
+    Test a PATCH without If-Match of an order deleted by another transaction while the update waits for its lock.
+    Expects a 404, not the 412 of a failed If-Match, although the order existed when the update started.
+    """
+    order_id = (await client.post("/orders/create", json=order_payload)).json()["data"]["id"]
+
+    async with TestSession() as session:
+        await session.execute(delete(Orders).where(Orders.id == order_id))  # Holds the row lock until the commit
+        patch_task = asyncio.create_task(client.patch(f"/orders/patch/{order_id}", json={"status": "completed"}))
+        await asyncio.sleep(0.5)  # The update is waiting for the lock
+        assert not patch_task.done(), "Update did not wait for the row lock."
+        await session.commit()
+    patch_resp = await asyncio.wait_for(patch_task, 10)
+    assert patch_resp.status_code == 404, f"Expected 404, got {patch_resp.status_code}: {patch_resp.text}"
+
+
 @pytest.mark.asyncio
 async def test_update_order_invalid_payload(client, order_payload):
     """
@@ -436,6 +543,30 @@ async def test_update_order_invalid_related_entity(client, order_payload):
     assert expected_detail in detail, f"Unexpected detail message: {detail}"
 
 
+@pytest.mark.asyncio
+async def test_failed_order_writes_not_marked(client, order_payload):
+    """
+    Test the session after a create and an update of orders rejected by their checks, and after a successful update.
+    Expects only the successful update to mark the session as having written orders,
+    so failed writes neither skip the cache for the rest of the request nor invalidate it on commit.
+    """
+    order_id = (await client.post("/orders/create", json=order_payload)).json()["data"]["id"]
+
+    async with TestSession() as session:
+        orders_repo = OrdersRepository(session)
+        result = await orders_repo.create_checked({**order_payload, "car_id": NON_EXISTENT_ID})
+        assert result.order is None, "Order with a missing car was created."
+        result = await orders_repo.edit_checked(order_id, {"user_id": NON_EXISTENT_ID})
+        assert result.order is None, "Order was updated with a missing customer."
+        result = await orders_repo.edit_checked(NON_EXISTENT_ID, {"status": "completed"})
+        assert result.order is None, "Missing order was updated."
+        assert not has_written(session, "orders"), "Failed writes marked the session as having written orders."
+
+        result = await orders_repo.edit_checked(order_id, {"status": "completed"})
+        assert result.order is not None, "Order was not updated."
+        assert has_written(session, "orders"), "Update did not mark the session as having written orders."
+
+
 @pytest.mark.asyncio
 async def test_delete_order_success(client, order_payload):
     """
@@ -468,3 +599,83 @@ async def test_delete_order_not_found(client):
     detail = delete_resp.json()["detail"]
     expected_detail = f"No order with id: '{NON_EXISTENT_ID} found."
     assert expected_detail in detail, f"Unexpected detail message: {detail}"
+
+
+@pytest.mark.asyncio
+async def test_sales_rollups_follow_order_writes(client, order_payload, manager):
+    """
+    Test that sales rollups are updated by order creation, updates and deletion, and match a rebuild from orders.
+    Expects the leaderboard and daily sales to count only the remaining orders, with the prices of their cars.
+    """
+    other_car = (await client.post("/cars/add", json=CAR_CREATE_ANOTHER)).json()["data"]
+    order_ids = []
+    for _ in range(3):
+        response = await client.post("/orders/create", json=order_payload)
+        assert response.status_code == 200, f"Error creating order: {response.text}"
+        order_ids.append(response.json()["data"]["id"])
+
+    await client.patch(f"/orders/patch/{order_ids[0]}", json={"status": "completed", "car_id": other_car["id"]})
+    await client.patch(f"/orders/patch/{order_ids[1]}", json={"comments": "Not a rollup change."})
+    await client.delete(f"/orders/delete/{order_ids[2]}")
+
+    response = await client.get("/orders/sales/leaderboard")
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+    expected_revenue = CAR_CREATE_VALID["price"] + CAR_CREATE_ANOTHER["price"]
+    assert response.json()["data"] == [
+        {"salesperson_id": manager["id"], "orders": 2, "revenue": expected_revenue}
+    ], f"Unexpected leaderboard: {response.json()['data']}"
+
+    response = await client.get(f"/orders/sales/salesperson_id/{manager['id']}", params={"status": "completed"})
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+    daily_sales = response.json()["data"]
+    assert len(daily_sales) == 1, f"Expected one day of completed orders, got {daily_sales}"
+    assert daily_sales[0]["orders"] == 1, f"Unexpected number of orders: {daily_sales[0]['orders']}"
+    assert daily_sales[0]["revenue"] == CAR_CREATE_ANOTHER["price"], f"Unexpected revenue: {daily_sales[0]['revenue']}"
+
+    async with TestSession() as session:
+        incremental = await SalesRollupsRepository(session).daily_sales(manager["id"])
+        await SalesRollupsRepository(session).rebuild()
+        rebuilt = await SalesRollupsRepository(session).daily_sales(manager["id"])
+    assert incremental == rebuilt, f"Incremental rollups {incremental} differ from rebuilt {rebuilt}"
+
+
+@pytest.mark.asyncio
+async def test_sales_rollups_keep_order_prices(client, order_payload, manager):
+    """
+    Test sales rollups when the car's price changes between order writes.
+    Expects orders to count for the price at creation, a deletion and a status change to subtract exactly that,
+    and the rollups to match a rebuild from orders.
+    """
+    order_ids = []
+    for _ in range(2):
+        response = await client.post("/orders/create", json=order_payload)
+        order_ids.append(response.json()["data"]["id"])
+    response = await client.patch(f"/cars/patch/{order_payload['car_id']}", json={"price": 99999})
+    assert response.status_code == 200, f"Error updating car: {response.text}"
+
+    await client.delete(f"/orders/delete/{order_ids[0]}")
+    await client.patch(f"/orders/patch/{order_ids[1]}", json={"status": "completed"})
+
+    response = await client.get(f"/orders/sales/salesperson_id/{manager['id']}")
+    daily_sales = response.json()["data"]
+    assert [(sales["status"], sales["orders"], sales["revenue"]) for sales in daily_sales] == [
+        ("completed", 1, CAR_CREATE_VALID["price"])
+    ], f"Unexpected daily sales: {daily_sales}"
+
+    async with TestSession() as session:
+        incremental = await SalesRollupsRepository(session).daily_sales(manager["id"])
+        await SalesRollupsRepository(session).rebuild()
+        rebuilt = await SalesRollupsRepository(session).daily_sales(manager["id"])
+    assert incremental == rebuilt, f"Incremental rollups {incremental} differ from rebuilt {rebuilt}"
+
+
+@pytest.mark.asyncio
+async def test_sales_invalid_period(client):
+    """
+    Test sales end-points with date_from later than date_to.
+    Expects a 400 error with an appropriate message.
+    """
+    response = await client.get("/orders/sales/leaderboard", params={"date_from": "2025-02-01", "date_to": "2025-01-01"})
+    assert response.status_code == 400, f"Expected 400, got {response.status_code}"
+    detail = response.json()["detail"]
+    assert detail == "date_from can't be later than date_to.", f"Unexpected detail message: {detail}"
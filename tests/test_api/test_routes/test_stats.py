@@ -0,0 +1,105 @@
+import pytest
+
+from src.utils.config import DB_POOL_SIZE
+from src.utils.stats_refresher import StatsRefresher
+from tests.conftest import TestSession
+from tests.utils.config import USER_CUSTOMER, USER_MANAGER, CAR_CREATE_VALID, CAR_CREATE_ANOTHER
+
+
+@pytest.mark.asyncio
+async def test_car_stats(client):
+    """
+    Test that car counts and average prices are served from the views once they are refreshed.
+    Expects no stats before the refresh, then one row per brand, engine and transmission
+    and per brand, model and year, filtered by `brand` if it is passed.
+    """
+    another_camry = {**CAR_CREATE_VALID, "price": 32001, "vin_number": "VIN1111111111"}
+    for car in (CAR_CREATE_VALID, another_camry, CAR_CREATE_ANOTHER):
+        response = await client.post("/cars/add", json=car)
+        assert response.status_code == 200, f"Failed to create car: {response.text}"
+
+    response = await client.get("/stats/cars/counts")
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+    assert response.json()["data"] == [], "Stats must not change before the views are refreshed."
+
+    response = await client.post("/stats/refresh")
+    assert response.status_code == 200, f"Failed to refresh stats: {response.text}"
+    assert response.json()["message"] == "Stats refreshed.", f"Unexpected message: {response.json()['message']}"
+
+    response = await client.get("/stats/cars/counts")
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+    assert response.json()["data"] == [
+        {"brand": "Honda", "engine": "gasoline", "transmission": "manual", "cars": 1},
+        {"brand": "Toyota", "engine": "gasoline", "transmission": "automatic", "cars": 2},
+    ], f"Unexpected car counts: {response.json()['data']}"
+
+    response = await client.get("/stats/cars/prices", params={"brand": "Toyota"})
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+    assert response.json()["data"] == [
+        {"brand": "Toyota", "model": "Camry", "year": 2020, "average_price": 31001, "cars": 2},
+    ], f"Unexpected car prices: {response.json()['data']}"
+
+
+@pytest.mark.asyncio
+async def test_monthly_orders(client):
+    """
+    Test that orders are counted per month of creation and status after a refresh.
+    Expects one row for the current month with both pending orders.
+    """
+    customer = (await client.post("/users/create", json=USER_CUSTOMER)).json()["data"]
+    manager = (await client.post("/users/create", json=USER_MANAGER)).json()["data"]
+    car = (await client.post("/cars/add", json=CAR_CREATE_VALID)).json()["data"]
+    order = {
+        "user_id": customer["id"],
+        "car_id": car["id"],
+        "salesperson_id": manager["id"],
+        "status": "pending",
+        "comments": "Test order for stats."
+    }
+    for _ in range(2):
+        response = await client.post("/orders/create", json=order)
+        assert response.status_code == 200, f"Failed to create order: {response.text}"
+
+    await client.post("/stats/refresh")
+    response = await client.get("/stats/orders/monthly")
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+    monthly_orders = response.json()["data"]
+    assert len(monthly_orders) == 1, f"Expected one month and status, got {monthly_orders}"
+    assert monthly_orders[0]["status"] == "pending", f"Unexpected status: {monthly_orders[0]['status']}"
+    assert monthly_orders[0]["orders"] == 2, f"Unexpected number of orders: {monthly_orders[0]['orders']}"
+    assert monthly_orders[0]["month"].endswith("-01"), f"Month must be its first day: {monthly_orders[0]['month']}"
+
+
+@pytest.mark.asyncio
+async def test_stats_refresher_schedule():
+    """
+    Test when background refreshers of two app instances refresh the views.
+    Expects a refresh on the first check, none by either instance until the interval passes or enough rows
+    are written, and a refresh once the interval passed.
+    """
+    refresher = StatsRefresher(TestSession, check_seconds=1, refresh_seconds=3600, refresh_writes=100)
+    other_refresher = StatsRefresher(TestSession, check_seconds=1, refresh_seconds=3600, refresh_writes=100)
+    assert await refresher.refresh_if_due(), "The first check must refresh the views."
+    assert not await refresher.refresh_if_due(), "Views were refreshed again without writes or time passing."
+    assert not await other_refresher.refresh_if_due(), "Another instance refreshed the views again."
+
+    assert not refresher._is_due(0.0, 1099, 1000), "Views are due before enough rows were written."
+    assert refresher._is_due(0.0, 1100, 1000), "Views are not due after enough rows were written."
+    assert refresher._is_due(0.0, 10, 1000), "Views are not due after the statistics were reset."
+
+    other_refresher.refresh_seconds = 0
+    assert await other_refresher.refresh_if_due(), "Views were not refreshed after the interval passed."
+
+
+@pytest.mark.asyncio
+async def test_pool_stats(client):
+    """
+    Test retrieval of the database pool stats.
+    Expects the primary pool with the configured size and its counters.
+    """
+    response = await client.get("/stats/pools")
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+    pools = response.json()["data"]
+    assert [pool["engine"] for pool in pools] == ["primary"], f"Unexpected pools: {pools}"
+    assert pools[0]["pool_size"] == DB_POOL_SIZE, f"Pool size is not the configured one: {pools[0]['pool_size']}"
+    assert pools[0]["timeouts"] == 0, f"Unexpected timeouts: {pools[0]['timeouts']}"
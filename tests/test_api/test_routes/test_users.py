@@ -1,3 +1,5 @@
+import asyncio
+
 import pytest
 from tests.utils.config import (
     USER_CUSTOMER,
@@ -38,6 +40,17 @@ async def test_create_user_conflict_email(client):
     assert "already exists" in detail, "Conflict message does not mention that the email already exists."
 
 
+@pytest.mark.asyncio
+async def test_create_user_concurrent_same_email(client):
+    """
+    Test concurrent creation of users with the same email.
+    Expects exactly one user to be created and the other requests to get 409, not 500.
+    """
+    responses = await asyncio.gather(*(client.post("/users/create", json=USER_CUSTOMER) for _ in range(5)))
+    status_codes = sorted(response.status_code for response in responses)
+    assert status_codes == [200, 409, 409, 409, 409], f"Unexpected status codes: {status_codes}"
+
+
 @pytest.mark.asyncio
 async def test_create_user_invalid_role(client):
     """
@@ -60,6 +73,28 @@ async def test_create_user_missing_fields(client):
     assert "name" in str(errors), "Validation errors do not mention the missing 'name' field."
 
 
+@pytest.mark.asyncio
+async def test_create_users_bulk(client):
+    """
+    Create several users at once, one of them with an email that already exists.
+    Expects the other users to be created and a conflict result for the duplicate email.
+    """
+    existing_resp = await client.post("/users/create", json=USER_CUSTOMER)
+    assert existing_resp.status_code == 200, "Error creating user."
+
+    response = await client.post("/users/bulk", json=[USER_MANAGER, USER_CUSTOMER])
+    assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+    data = response.json()
+    assert data["message"] == "1 of 2 users created.", f"Unexpected message: {data['message']}"
+
+    created, conflict = data["data"]
+    assert created["status"] == "success", f"Manager was not created: {created}"
+    assert created["data"]["email"] == USER_MANAGER["email"], "Unexpected created user."
+    assert conflict["status"] == "error", f"Duplicate email was created: {conflict}"
+    assert conflict["message"] == f"User with email: '{USER_CUSTOMER['email']}' already exists.", \
+        f"Unexpected conflict message: {conflict['message']}"
+
+
 @pytest.mark.asyncio
 async def test_get_user_by_id_success(client):
     """
@@ -175,6 +210,33 @@ async def test_get_all_users(client):
         pytest.fail(f"Expected success but got {data_all['status']}: {data_all}")
 
 
+@pytest.mark.asyncio
+async def test_get_users_by_role_pagination(client):
+    """
+    Create two customers and page through them one user at a time.
+    Expects every customer exactly once and no next_cursor on the last page.
+    """
+    second_customer = USER_CUSTOMER.copy()
+    second_customer["email"] = "second-customer@example.com"
+    for user_data in (USER_CUSTOMER, second_customer):
+        resp = await client.post("/users/create", json=user_data)
+        assert resp.status_code == 200, f"Error creating user: {resp.text}"
+
+    seen_emails = []
+    params = {"limit": 1}
+    for _ in range(2):
+        page_resp = await client.get("/users/role/customer", params=params)
+        assert page_resp.status_code == 200, f"Error retrieving users page: {page_resp.text}"
+        page = page_resp.json()
+        assert len(page["data"]) == 1, "Expected exactly one user per page."
+        seen_emails.append(page["data"][0]["email"])
+        params["cursor"] = page["next_cursor"]
+
+    assert params["cursor"] is None, "Last page should not have next_cursor."
+    assert sorted(seen_emails) == sorted([USER_CUSTOMER["email"], second_customer["email"]]), \
+        "Pagination did not return every customer exactly once."
+
+
 @pytest.mark.asyncio
 async def test_update_user_success(client):
     """
@@ -0,0 +1,33 @@
+import fastapi.routing
+import pytest
+
+from tests.utils.config import CAR_CREATE_VALID, CAR_CREATE_ANOTHER
+
+
+@pytest.mark.asyncio
+async def test_envelopes_encoded_without_revalidation(client, monkeypatch):
+    """
+    Test that envelopes returned by services are encoded by ModelResponseRoute, not validated again by FastAPI.
+    Expects FastAPI's serialize_response never to run, and the same JSON, status codes and headers as before.
+    """
+    car_id = (await client.post("/cars/add", json=CAR_CREATE_VALID)).json()["data"]["id"]
+    await client.post("/cars/add", json=CAR_CREATE_ANOTHER)
+
+    def serialize_response(**kwargs):
+        raise AssertionError("Response was serialized by FastAPI.")
+
+    monkeypatch.setattr(fastapi.routing, "serialize_response", serialize_response)
+
+    list_resp = await client.get("/cars/", params={"fields": "id,brand", "limit": 1})
+    assert list_resp.status_code == 200, f"Error retrieving cars: {list_resp.text}"
+    assert list_resp.headers["content-type"] == "application/json", "Unexpected content type."
+    body = list_resp.json()
+    assert body["data"] == [{"id": car_id, "brand": "Toyota"}], f"Unexpected page: {body['data']}"
+    assert body["next_cursor"] is not None, "Page lost its cursor."
+
+    get_resp = await client.get(f"/cars/{car_id}")
+    assert get_resp.json()["data"]["vin_number"] == CAR_CREATE_VALID["vin_number"], "Unexpected car."
+    assert "etag" in get_resp.headers, "Headers set by the end-point were lost."
+
+    missing_resp = await client.get("/cars/999999")
+    assert missing_resp.status_code == 404, f"Expected 404, got {missing_resp.status_code}"
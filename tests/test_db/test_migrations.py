@@ -0,0 +1,111 @@
+import asyncio
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+
+from src.db.db import Base
+from src.db.migrations import run_migrations
+from src.db.migrations.versions import MIGRATIONS, v0005_car_trigram_search
+from src.models.views import VIEWS
+from tests.conftest import engine_test
+
+ALL_VERSIONS = [migration.VERSION for migration in MIGRATIONS]
+TABLES = ", ".join(f"'{name}'" for name in Base.metadata.tables)
+RELATIONS = ", ".join(f"'{name}'" for name in (*Base.metadata.tables, *(view[0] for view in VIEWS)))
+SCHEMA_QUERIES = {
+    "columns": f"""
+        SELECT table_name, column_name, data_type, is_nullable, column_default
+        FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name IN ({TABLES})
+    """,
+    "constraints": f"""
+        SELECT conrelid::regclass::text, conname, pg_get_constraintdef(oid)
+        FROM pg_constraint
+        WHERE conrelid::regclass::text IN ({TABLES})
+    """,
+    "indexes": f"""
+        SELECT indexname, indexdef
+        FROM pg_indexes
+        WHERE schemaname = 'public' AND tablename IN ({RELATIONS})
+          AND indexname <> '{v0005_car_trigram_search.INDEX_NAME}'  -- Optional, created only by migrations
+    """,
+    "views": "SELECT matviewname, definition FROM pg_matviews WHERE schemaname = 'public'",
+}
+
+
+async def schema_snapshot() -> dict:
+    """
+    Reads the columns, constraints and indexes of the application tables, and the materialized views.
+    """
+    async with engine_test.connect() as conn:
+        return {
+            name: sorted(tuple(row) for row in await conn.execute(text(query)))
+            for name, query in SCHEMA_QUERIES.items()
+        }
+
+
+@pytest_asyncio.fixture
+async def drop_versions_table():
+    """
+    Drops the schema_migrations table after the test, tables of the models are dropped by prepare_database.
+    """
+    yield
+    async with engine_test.begin() as conn:
+        await conn.execute(text("DROP TABLE IF EXISTS schema_migrations"))
+
+
+@pytest.mark.asyncio
+async def test_migrations_match_models(drop_versions_table):
+    """
+    Test that migrations on an empty database create the same schema as the models.
+    Expects equal columns, constraints, indexes and views, and nothing to apply on a second run.
+    """
+    models_schema = await schema_snapshot()
+    async with engine_test.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+
+    applied = await run_migrations(engine_test)
+    assert applied == ALL_VERSIONS, f"Unexpected migrations applied: {applied}"
+    migrated_schema = await schema_snapshot()
+    for name in SCHEMA_QUERIES:
+        assert migrated_schema[name] == models_schema[name], f"Migrated {name} differ from the models."
+
+    applied_again = await run_migrations(engine_test)
+    assert applied_again == [], f"Migrations were applied twice: {applied_again}"
+
+
+@pytest.mark.asyncio
+async def test_migrations_adopt_existing_schema(drop_versions_table):
+    """
+    Test migrating a database created by create_all without the filter indexes, as before migrations.
+    Expects the baseline to be adopted as is and the missing indexes to be built.
+    """
+    async with engine_test.begin() as conn:
+        await conn.execute(text("DROP INDEX ix_orders_user_id_id, ix_cars_engine_id, ix_users_role_id"))
+
+    applied = await run_migrations(engine_test)
+    assert applied == ALL_VERSIONS, f"Unexpected migrations applied: {applied}"
+
+    async with engine_test.connect() as conn:
+        valid_indexes = set((await conn.execute(text(
+            "SELECT indexrelid::regclass::text FROM pg_index WHERE indisvalid"
+        ))).scalars())
+    for index in ("ix_orders_user_id_id", "ix_cars_engine_id", "ix_users_role_id"):
+        assert index in valid_indexes, f"Index {index} was not built."
+
+
+@pytest.mark.asyncio
+async def test_concurrent_migrations(drop_versions_table):
+    """
+    Test two instances migrating an empty database at the same time, as app instances starting together.
+    Expects both to finish (the waiting one holds no snapshot that CREATE INDEX CONCURRENTLY would wait for),
+    and every migration to be applied once.
+    """
+    async with engine_test.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+
+    applied = await asyncio.wait_for(
+        asyncio.gather(run_migrations(engine_test), run_migrations(engine_test)), timeout=60
+    )
+    assert sorted(applied[0] + applied[1]) == ALL_VERSIONS, f"Unexpected migrations applied: {applied}"
@@ -0,0 +1,43 @@
+import asyncio
+
+import pytest
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.db.pool_metrics import MeteredPool, PoolMetrics
+from tests.conftest import DATABASE_URL
+
+
+@pytest.mark.asyncio
+async def test_pool_metrics_count_waits_and_timeouts():
+    """
+    Test the metrics of a pool of one connection, checked out by a second request while in use and by a third
+    that gives up. Expects the second checkout to wait until the first one is returned, the third to time out,
+    and the gauges to reflect the connection in use.
+    """
+    engine = create_async_engine(
+        DATABASE_URL, poolclass=MeteredPool, pool_size=1, max_overflow=0, pool_timeout=0.2, pool_pre_ping=True
+    )
+    metrics = PoolMetrics.watch(engine)
+    try:
+        first = await engine.connect()
+        waiting = asyncio.create_task(engine.connect().start())
+        await asyncio.sleep(0.1)
+        assert metrics.stats()["checked_out"] == 1, "Second checkout did not wait for the connection."
+        await first.close()
+        second = await waiting
+
+        with pytest.raises(exc.TimeoutError):
+            await engine.connect()
+        assert (await second.execute(text("SELECT 1"))).scalar() == 1, "Connection handed over is not usable."
+
+        stats = metrics.stats()
+        assert stats["checkouts"] == 2, f"Expected 2 checkouts, got {stats['checkouts']}"
+        assert stats["connects"] == 1, f"Connection was not reused: {stats['connects']} connects"
+        assert stats["timeouts"] == 1, f"Expected 1 timeout, got {stats['timeouts']}"
+        assert stats["wait_seconds_max"] >= 0.1, f"Wait for the connection not measured: {stats['wait_seconds_max']}"
+        assert stats["checked_out"] == 1 and stats["idle"] == 0, f"Unexpected gauges: {stats}"
+        assert stats["checked_out_peak"] == 1 and stats["overflow"] == 0, f"Unexpected peaks: {stats}"
+        await second.close()
+    finally:
+        await engine.dispose()
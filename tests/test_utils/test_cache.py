@@ -0,0 +1,117 @@
+import asyncio
+
+import pytest
+
+from pydantic import TypeAdapter
+
+from src.utils.cache import EntityCache
+from src.utils.cache_backends import MemoryBackend, NullBackend
+from src.schemas.users import UserPartialSchema
+
+ADAPTER = TypeAdapter(UserPartialSchema)
+
+
+def user(id: int) -> UserPartialSchema:
+    return UserPartialSchema(id=id)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_misses_load_once():
+    """
+    Test that concurrent reads of a missing key run one load and share its result.
+    Expects one load, one miss and the other reads counted as hits.
+    """
+    cache = EntityCache(MemoryBackend(max_size=10), ttl_seconds=60)
+    loads = 0
+
+    async def loader():
+        nonlocal loads
+        loads += 1
+        await asyncio.sleep(0.01)
+        return user(1)
+
+    results = await asyncio.gather(*(cache.get_or_load("users", "1", ADAPTER, loader) for _ in range(10)))
+    assert loads == 1, f"Expected one load, got {loads}"
+    assert all(result.id == 1 for result in results), f"Unexpected results: {results}"
+    assert (cache.hits, cache.misses) == (9, 1), f"Unexpected counters: {cache.stats()}"
+
+
+@pytest.mark.asyncio
+async def test_eviction_expiry_and_invalidation():
+    """
+    Test that the cache keeps at most max_size entries, evicting the least recently used one,
+    that entries expire after ttl_seconds, and that invalidation drops every key of a namespace.
+    Expects the evicted, expired and invalidated entries to be loaded again.
+    """
+    cache = EntityCache(MemoryBackend(max_size=2), ttl_seconds=60)
+    loads = []
+
+    def loader(id):
+        async def load():
+            loads.append(id)
+            return user(id)
+        return load
+
+    await cache.get_or_load("users", "1", ADAPTER, loader(1))
+    await cache.get_or_load("users", "2", ADAPTER, loader(2))
+    await cache.get_or_load("users", "1", ADAPTER, loader(1))  # 2 is the least recently used now
+    await cache.get_or_load("users", "3", ADAPTER, loader(3))
+    stats = cache.stats()
+    assert (stats["size"], stats["evictions"]) == (2, 1), f"Unexpected size: {stats}"
+    await cache.get_or_load("users", "2", ADAPTER, loader(2))
+    assert loads == [1, 2, 3, 2], f"Evicted entry was not loaded again: {loads}"
+
+    await cache.get_or_load("users", "email:2", ADAPTER, loader(2))
+    await cache.invalidate(["users"])
+    await cache.get_or_load("users", "2", ADAPTER, loader(2))
+    await cache.get_or_load("users", "email:2", ADAPTER, loader(2))
+    assert loads[-2:] == [2, 2], f"Invalidated keys were not loaded again: {loads}"
+
+    cache.ttl_seconds = 0
+    await cache.get_or_load("users", "9", ADAPTER, loader(9))
+    await cache.get_or_load("users", "9", ADAPTER, loader(9))
+    assert loads[-2:] == [9, 9], f"Expired entry was not loaded again: {loads}"
+
+
+@pytest.mark.asyncio
+async def test_load_racing_invalidation_not_stored():
+    """
+    Test that a value loaded while its namespace was invalidated is returned but not cached,
+    it may have been read before the write.
+    Expects the next read to load again.
+    """
+    cache = EntityCache(MemoryBackend(max_size=10), ttl_seconds=60)
+    loads = 0
+
+    async def loader():
+        nonlocal loads
+        loads += 1
+        await cache.invalidate(["users"])  # A write commits while the row is being read
+        return user(1)
+
+    await cache.get_or_load("users", "1", ADAPTER, loader)
+    await cache.get_or_load("users", "1", ADAPTER, loader)
+    assert loads == 2, f"Value that raced with an invalidation was cached: {loads} loads"
+
+
+@pytest.mark.asyncio
+async def test_null_backend_loads_every_read():
+    """
+    Test the cache over the backend used when caching is off (e.g. memory cache with several workers).
+    Expects sequential reads to be loaded each time, and concurrent ones to still share one load.
+    """
+    cache = EntityCache(NullBackend(), ttl_seconds=60)
+    loads = 0
+
+    async def loader():
+        nonlocal loads
+        loads += 1
+        await asyncio.sleep(0.01)
+        return user(1)
+
+    for _ in range(2):
+        await cache.get_or_load("users", "1", ADAPTER, loader)
+    assert loads == 2, f"Value was served without a load: {loads} loads"
+
+    await asyncio.gather(*(cache.get_or_load("users", "1", ADAPTER, loader) for _ in range(5)))
+    assert loads == 3, f"Concurrent reads did not share one load: {loads} loads"
@@ -0,0 +1,133 @@
+from datetime import datetime, timezone
+
+import pytest
+import pytest_asyncio
+from pydantic import TypeAdapter
+
+from src.schemas.cars import CarSchema
+from src.utils.cache import EntityCache
+from src.utils.cache_backends import CacheBackendError, MemoryBackend, RedisBackend
+from tests.utils.config import CAR_CREATE_VALID
+from tests.utils.fake_redis import FakeRedisServer
+
+
+@pytest_asyncio.fixture(params=["memory", "redis"])
+async def backend(request, fake_redis):
+    """
+    Each backend in turn, the Redis one connected to the fake server.
+    """
+    if request.param == "memory":
+        yield MemoryBackend(max_size=100)
+    else:
+        redis_backend = RedisBackend(fake_redis.url)
+        yield redis_backend
+        await redis_backend.close()
+
+
+@pytest.mark.asyncio
+async def test_backend_get_set_invalidate(backend):
+    """
+    Test the contract shared by the backends: values are returned as they were set,
+    invalidation drops every key of the namespaces passed and no other, values set as of a version
+    older than the namespace's are not returned, and values expire.
+    Expects the same results from the memory and the Redis backend.
+    """
+    assert await backend.get("cars", "one:1") == (None, 0), "Unexpected value before it was set."
+    await backend.set("cars", "one:1", b'{"id":1}', 60, 0)
+    await backend.set("cars", "many:[]", b'[{"id":1}]', 60, 0)
+    await backend.set("users", "one:1", b'{"id":1}', 60, 0)
+    assert await backend.get("cars", "one:1") == (b'{"id":1}', 0), "Value was not returned as it was set."
+
+    await backend.invalidate(["cars"])
+    assert await backend.get("cars", "one:1") == (None, 1), "Invalidated key was returned."
+    assert await backend.get("cars", "many:[]") == (None, 1), "Invalidated key was returned."
+    assert await backend.get("users", "one:1") == (b'{"id":1}', 0), "Key of another namespace was invalidated."
+
+    await backend.set("cars", "one:1", b'{"id":0}', 60, 0)  # Loaded before the invalidation
+    assert await backend.get("cars", "one:1") == (None, 1), "Value of an older version was returned."
+    await backend.set("cars", "one:1", b'{"id":1}', 60, 1)
+    assert await backend.get("cars", "one:1") == (b'{"id":1}', 1), "Value of the current version was not returned."
+
+    await backend.set("orders", "one:1", b'{"id":1}', 0, 0)
+    assert await backend.get("orders", "one:1") == (None, 0), "Expired value was returned."
+
+
+@pytest.mark.asyncio
+async def test_redis_backend_pipelines_and_reuses_connections(fake_redis):
+    """
+    Test that the Redis backend authenticates and selects the database once per connection,
+    reads a value with its namespace's version in one pipeline, and reuses its connection.
+    Expects one connection and the commands in order.
+    """
+    backend = RedisBackend(fake_redis.url)
+    await backend.set("cars", "one:1", b"car", 60, 0)
+    await backend.get("cars", "one:1")
+    await backend.invalidate(["cars", "users"])
+    await backend.close()
+
+    assert fake_redis.connections == 1, f"Expected one connection, got {fake_redis.connections}"
+    assert fake_redis.commands == [
+        (b"AUTH", b"test"),
+        (b"SELECT", b"1"),
+        (b"SET", b"cache:cars:one:1", b"0:car", b"EX", b"60"),
+        (b"GET", b"cache:cars:one:1"),
+        (b"GET", b"cache:cars"),
+        (b"INCR", b"cache:cars"),
+        (b"INCR", b"cache:users"),
+    ], f"Unexpected commands: {fake_redis.commands}"
+
+
+@pytest.mark.asyncio
+async def test_redis_unavailable_falls_back_to_loader():
+    """
+    Test that the entity cache loads values from the database when Redis can't be reached or rejects commands.
+    Expects the backend to raise CacheBackendError and the cache to return the loaded value anyway.
+    """
+    server = FakeRedisServer(password="test")
+    await server.start()
+    wrong_password = RedisBackend(server.url.replace(":test@", ":wrong@"))
+    with pytest.raises(CacheBackendError):
+        await wrong_password.get("cars", "one:1")
+    unreachable_url = server.url
+    await server.stop()
+
+    adapter = TypeAdapter(CarSchema)
+    car = adapter.validate_python({**CAR_CREATE_VALID, "id": 1, "created_at": datetime.now(timezone.utc)})
+
+    async def loader():
+        return car
+
+    for backend in (wrong_password, RedisBackend(unreachable_url)):
+        cache = EntityCache(backend, ttl_seconds=60)
+        assert await cache.get_or_load("cars", "one:1", adapter, loader) == car, "Value was not loaded."
+
+
+@pytest.mark.asyncio
+async def test_redis_load_racing_invalidation_of_another_process(fake_redis):
+    """
+    Test a car loaded by one process while another one commits a write to it and invalidates the cars,
+    each process with its own entity cache over the shared Redis server.
+    Expects the value loaded before the write to be returned to its request, but served by neither process.
+    """
+    adapter = TypeAdapter(CarSchema)
+    created_at = datetime.now(timezone.utc)
+    old_car, new_car = (
+        adapter.validate_python({**CAR_CREATE_VALID, "id": 1, "price": price, "created_at": created_at})
+        for price in (1, 2)
+    )
+    backends = [RedisBackend(fake_redis.url), RedisBackend(fake_redis.url)]
+    reader, writer = (EntityCache(backend, ttl_seconds=60) for backend in backends)
+
+    async def load_before_write():
+        await writer.invalidate(["cars"])  # The other process commits while this one reads the row
+        return old_car
+
+    async def load_after_write():
+        return new_car
+
+    assert await reader.get_or_load("cars", "one:1", adapter, load_before_write) == old_car, "Load was not returned."
+    for cache in (reader, writer):
+        car = await cache.get_or_load("cars", "one:1", adapter, load_after_write)
+        assert car == new_car, "Value loaded before the write was served."
+    for backend in backends:
+        await backend.close()
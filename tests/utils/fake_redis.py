@@ -0,0 +1,95 @@
+import asyncio
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+
+class FakeRedisServer:
+    """
+    In-process server speaking RESP2 with the commands used by RedisBackend (src/utils/cache_backends.py),
+    so its tests need no live Redis. Values are kept in memory, expiry is checked when a key is read.
+    """
+
+    def __init__(self, password: Optional[str] = None) -> None:
+        self.password = password
+        self.values: Dict[bytes, Tuple[bytes, Optional[float]]] = {}  # key: (value, expires at)
+        self.commands: List[Tuple[bytes, ...]] = []  # Every command received, for assertions
+        self.connections = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._handlers: Set[asyncio.Task] = set()
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.sockets[0].getsockname()[:2]
+        credentials = f":{self.password}@" if self.password else ""
+        return f"redis://{credentials}{host}:{port}/1"
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._serve, "127.0.0.1", 0)
+
+    async def stop(self) -> None:
+        """Stops listening and drops the open connections."""
+        self._server.close()
+        for handler in self._handlers:
+            handler.cancel()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        await self._server.wait_closed()
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        self._handlers.add(asyncio.current_task())
+        authenticated = self.password is None
+        try:
+            while True:
+                command = await self._read_command(reader)
+                self.commands.append(command)
+                name = command[0].upper()
+                if name == b"AUTH":
+                    authenticated = command[-1].decode() == self.password
+                    writer.write(b"+OK\r\n" if authenticated else b"-WRONGPASS invalid password\r\n")
+                elif not authenticated:
+                    writer.write(b"-NOAUTH Authentication required.\r\n")
+                else:
+                    writer.write(self._execute(name, command[1:]))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._handlers.discard(asyncio.current_task())
+            writer.close()
+
+    @staticmethod
+    async def _read_command(reader: asyncio.StreamReader) -> Tuple[bytes, ...]:
+        header = await reader.readuntil(b"\r\n")
+        arguments = []
+        for _ in range(int(header[1:-2])):
+            length = int((await reader.readuntil(b"\r\n"))[1:-2])
+            arguments.append((await reader.readexactly(length + 2))[:-2])
+        return tuple(arguments)
+
+    def _get(self, key: bytes) -> Optional[bytes]:
+        entry = self.values.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self.values[key]
+            return None
+        return value
+
+    def _execute(self, name: bytes, arguments: Tuple[bytes, ...]) -> bytes:
+        if name in (b"PING", b"SELECT"):
+            return b"+OK\r\n"
+        if name == b"GET":
+            value = self._get(arguments[0])
+            return b"$-1\r\n" if value is None else b"$%d\r\n%s\r\n" % (len(value), value)
+        if name == b"SET":
+            options = [argument.upper() for argument in arguments[2:]]
+            if options[:1] != [b"EX"] or len(options) != 2 or int(options[1]) <= 0:
+                return b"-ERR syntax error\r\n"  # Only the options RedisBackend sends are supported
+            self.values[arguments[0]] = (arguments[1], time.monotonic() + int(options[1]))
+            return b"+OK\r\n"
+        if name == b"INCR":
+            value = int(self._get(arguments[0]) or 0) + 1
+            self.values[arguments[0]] = (b"%d" % value, None)
+            return b":%d\r\n" % value
+        return b"-ERR unknown command '%s'\r\n" % name.lower()